@@ -0,0 +1,252 @@
+"""
+Неблокирующая очередь воспроизведения звука на манипуляторе.
+
+play_audio() ждёт окончания клипа, и цикл управления стоит, пока звучит
+предупреждение. AudioPlayer отдаёт клипы контроллеру из фонового потока:
+
+    audio = AudioPlayer(manipulator)              # или manipulator.audio_player (hehe.Manipulator)
+    audio.play("warning.wav", repeat=3)           # вернётся сразу
+    audio.play("alarm.wav", priority=10, interrupt=True)
+    audio.stats()                                 # глубина очереди, задержки, счётчики
+
+    - одинаковый клип, уже ждущий в очереди, не добавляется второй раз (coalescing):
+      у ожидающего берутся максимальные приоритет и число повторов;
+    - очередь упорядочена по приоритету, при равном — по времени постановки;
+    - interrupt=True выбрасывает ожидающие клипы с меньшим приоритетом и перестаёт
+      ждать текущий менее важный клип (сам контроллер решает, прервать ли звук).
+
+Поток воспроизведения использует тот же слот команды манипулятора, что и play_audio,
+поэтому параллельно с ним не стоит вызывать play_audio напрямую. На время клипа
+поток берёт command_slot(manip): фоновые опросы (PixyTracker) его не перебивают.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from command_slot import command_slot
+
+DEFAULT_TIMEOUT = 5.0      # таймаут одного клипа, с
+MAX_QUEUE = 16
+POLL_INTERVAL = 0.02       # период проверки завершения клипа, с
+LATENCY_HISTORY = 256
+
+
+class _Clip:
+    def __init__(self, file_name: str, priority: int, repeat: int, sequence: int):
+        self.file_name = file_name
+        self.priority = priority
+        self.repeat = repeat
+        self.sequence = sequence
+        self.enqueued_at = time.monotonic()
+        self.removed = False
+
+    def key(self):
+        return -self.priority, self.sequence
+
+
+class AudioPlayer:
+    """Фоновое воспроизведение клипов с приоритетами, слиянием дубликатов и прерыванием"""
+
+    def __init__(self, manip: Any, timeout_seconds: float = DEFAULT_TIMEOUT, max_queue: int = MAX_QUEUE):
+        self.manip = manip
+        self.timeout_seconds = timeout_seconds
+        self.max_queue = max_queue
+
+        self._heap: List[tuple] = []
+        self._pending: Dict[str, _Clip] = {}
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._interrupt = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self.current: Optional[_Clip] = None
+
+        self.enqueued = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.played = 0
+        self.failed = 0
+        self.interrupted = 0
+        self._queue_latency: Deque[float] = deque(maxlen=LATENCY_HISTORY)
+        self._play_time: Deque[float] = deque(maxlen=LATENCY_HISTORY)
+
+    # --- Очередь ---
+
+    def play(self, file_name: str, priority: int = 0, repeat: int = 1, interrupt: bool = False) -> bool:
+        """
+        Поставить клип в очередь, не дожидаясь воспроизведения.
+        :return: False, если клип отброшен (очередь полна клипами не ниже приоритетом)
+        """
+        if repeat < 1:
+            return True
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("AudioPlayer закрыт")
+            if interrupt:
+                self._drop_below(priority)
+                current = self.current
+                if current is not None and current.priority < priority:
+                    self._interrupt.set()
+
+            pending = self._pending.get(file_name)
+            if pending is not None:
+                # Такой клип уже ждёт — объединяем
+                self.coalesced += 1
+                pending.repeat = max(pending.repeat, repeat)
+                if priority > pending.priority:
+                    pending.removed = True
+                    self._push(_Clip(file_name, priority, pending.repeat, pending.sequence))
+                return True
+
+            if len(self._pending) >= self.max_queue and not self._drop_lowest(priority):
+                self.dropped += 1
+                return False
+            self._push(_Clip(file_name, priority, repeat, next(self._sequence)))
+            self.enqueued += 1
+            self._ensure_thread()
+            self._condition.notify_all()
+            return True
+
+    def _push(self, clip: _Clip) -> None:
+        self._pending[clip.file_name] = clip
+        heapq.heappush(self._heap, (clip.key(), id(clip), clip))
+
+    def _drop_below(self, priority: int) -> None:
+        for clip in list(self._pending.values()):
+            if clip.priority < priority:
+                clip.removed = True
+                del self._pending[clip.file_name]
+                self.dropped += 1
+
+    def _drop_lowest(self, priority: int) -> bool:
+        """Освободить место, выбросив самый неважный ожидающий клип с меньшим приоритетом"""
+        lowest = min(self._pending.values(), key=lambda clip: (clip.priority, -clip.sequence))
+        if lowest.priority >= priority:
+            return False
+        lowest.removed = True
+        del self._pending[lowest.file_name]
+        self.dropped += 1
+        return True
+
+    def clear(self) -> None:
+        """Выбросить все ожидающие клипы (текущий доигрывает)"""
+        with self._condition:
+            self.dropped += len(self._pending)
+            for clip in self._pending.values():
+                clip.removed = True
+            self._pending.clear()
+            self._heap.clear()
+            self._condition.notify_all()
+
+    @property
+    def depth(self) -> int:
+        """Число ожидающих клипов"""
+        with self._condition:
+            return len(self._pending)
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Дождаться, пока очередь опустеет и текущий клип доиграет"""
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._pending and self.current is None, timeout)
+
+    def close(self, wait: bool = False, timeout: Optional[float] = None) -> None:
+        if wait:
+            self.wait_idle(timeout)
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._interrupt.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.timeout_seconds)
+        self._thread = None
+
+    # --- Поток воспроизведения ---
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="audio-player", daemon=True)
+            self._thread.start()
+
+    def _next_clip(self) -> Optional[_Clip]:
+        with self._condition:
+            while True:
+                if self._closed:
+                    self.current = None
+                    self._condition.notify_all()
+                    return None
+                while self._heap and self._heap[0][2].removed:
+                    heapq.heappop(self._heap)
+                if self._heap:
+                    _, _, clip = heapq.heappop(self._heap)
+                    del self._pending[clip.file_name]
+                    self.current = clip
+                    self._interrupt.clear()
+                    return clip
+                self.current = None
+                self._condition.notify_all()
+                self._condition.wait()
+
+    def _run(self) -> None:
+        while True:
+            clip = self._next_clip()
+            if clip is None:
+                return
+            self._queue_latency.append(time.monotonic() - clip.enqueued_at)
+            for _ in range(clip.repeat):
+                if self._interrupt.is_set() or self._closed:
+                    break
+                self._play_once(clip.file_name)
+
+    def _play_once(self, file_name: str) -> None:
+        with command_slot(self.manip):
+            self._play_locked(file_name)
+
+    def _play_locked(self, file_name: str) -> None:
+        started = time.monotonic()
+        try:
+            if not hasattr(self.manip, "play_audio_async"):
+                self.manip.play_audio(file_name=file_name, timeout_seconds=self.timeout_seconds)
+            else:
+                command = self.manip.play_audio_async(file_name, self.timeout_seconds, True)
+                deadline = started + self.timeout_seconds
+                # Ждём окончания клипа, но выходим сразу по прерыванию
+                while command.promise.is_active and time.monotonic() < deadline:
+                    if self._interrupt.wait(POLL_INTERVAL):
+                        self.interrupted += 1
+                        return
+                command.result()
+                if getattr(self.manip, "specific_command", None) is command:
+                    self.manip.specific_command = None
+            self.played += 1
+        except Exception as e:
+            self.failed += 1
+            print(f"[AUDIO] Ошибка воспроизведения {file_name}: {e}")
+        finally:
+            self._play_time.append(time.monotonic() - started)
+
+    # --- Статистика ---
+
+    def stats(self) -> Dict[str, Any]:
+        def summary(values: Deque[float]) -> Dict[str, float]:
+            ordered = sorted(values)
+            if not ordered:
+                return {"p50_ms": 0.0, "max_ms": 0.0}
+            return {"p50_ms": ordered[len(ordered) // 2] * 1000.0, "max_ms": ordered[-1] * 1000.0}
+
+        with self._condition:
+            return {
+                "depth": len(self._pending),
+                "playing": self.current.file_name if self.current is not None else None,
+                "enqueued": self.enqueued,
+                "coalesced": self.coalesced,
+                "dropped": self.dropped,
+                "played": self.played,
+                "failed": self.failed,
+                "interrupted": self.interrupted,
+                "queue_latency": summary(self._queue_latency),
+                "play_time": summary(self._play_time),
+            }
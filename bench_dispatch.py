@@ -0,0 +1,181 @@
+"""
+Микробенчмарк пути сообщений Manipulator.process_message.
+
+Синтетические /joint_states, /coordinates, COMMAND_RESULT и MGBOT подаются
+в hehe.Manipulator поверх OfflineConnection (telemetry_replay) с нарастающей
+частотой при 0, 1, 10 и 100 активных командах — с обработчиками топиков и без.
+Для каждого сценария считаются пропускная способность, p50/p99 задержки
+и память на сообщение (tracemalloc, отдельный проход, чтобы не искажать время).
+
+Вывод обработчиков подавляется. Результаты сохраняются в JSON для сравнения
+между версиями:
+
+    python bench_dispatch.py                       # bench_results/dispatch_<время>.json
+    python bench_dispatch.py results.json
+"""
+
+import contextlib
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from sdk.utils.constants import COMMAND_RESULT_TOPIC, MGBOT_TOPIC
+
+from telemetry_replay import make_offline_manipulator, replay
+
+# ===================== ПАРАМЕТРЫ =====================
+
+RATES_HZ: List[Optional[float]] = [500.0, 2000.0, 10000.0, None]   # None — без пауз
+ACTIVE_COMMANDS = [0, 1, 10, 100]
+MESSAGES_PER_RUN = 2000
+ALLOCATION_SAMPLES = 500
+RESULTS_DIR = Path("bench_results")
+
+MIX = ("/joint_states", "/coordinates", COMMAND_RESULT_TOPIC, MGBOT_TOPIC)
+
+
+# ===================== СИНТЕТИЧЕСКИЕ ДАННЫЕ =====================
+
+class _FakePromise:
+    is_active = True
+
+
+class FakeCommand:
+    """Активная команда: принимает сообщения и ничего не делает"""
+
+    def __init__(self, command_id: int):
+        self.command_id = command_id
+        self.promise = _FakePromise()
+        self.messages = 0
+
+    def process_message(self, topic: str, payload: str) -> None:
+        self.messages += 1
+
+
+def synthetic_payload(topic: str, i: int, command_ids: List[int]) -> str:
+    if topic == "/joint_states":
+        return json.dumps({
+            "header": {"stamp": {"sec": i // 100, "nanosec": (i % 100) * 10_000_000}, "frame_id": ""},
+            "name": ["povorot_osnovaniya", "privod_plecha", "privod_strely"],
+            "position": [0.001 * i, -0.35, -0.75], "velocity": [0.1, 0.0, 0.0], "effort": [0.0, 0.0, 0.0],
+        })
+    if topic == "/coordinates":
+        return json.dumps({
+            "tool0": {"position": {"x": 0.25, "y": 0.0001 * i, "z": 0.12},
+                      "orientation": {"x": 0.0, "y": 0.0, "z": 0.0, "w": 1.0}},
+            "tool1": {"position": {"x": 0.25, "y": 0.0001 * i, "z": 0.07},
+                      "orientation": {"x": 0.0, "y": 0.0, "z": 0.0, "w": 1.0}},
+        })
+    if topic == COMMAND_RESULT_TOPIC:
+        # Ответ адресован одной из активных команд (или никому, если их нет)
+        command_id = command_ids[i % len(command_ids)] if command_ids else 10_000_000 + i
+        return json.dumps({"id": command_id, "result": "SUCCESS"})
+    return json.dumps({"data": {"DistanceSensor": 300 - i % 200,
+                                "ColorSensor": {"R": 20, "G": 20, "B": 20, "Prox": 5}, "Prox": 5}})
+
+
+def build_messages(count: int, rate: Optional[float], command_ids: List[int]) -> List[Tuple[float, str, str]]:
+    interval = 1.0 / rate if rate else 0.0
+    return [(i * interval, MIX[i % len(MIX)], synthetic_payload(MIX[i % len(MIX)], i, command_ids))
+            for i in range(count)]
+
+
+# ===================== ПРОГОН =====================
+
+def prepare_manipulator(active_commands: int, with_handlers: bool) -> Tuple[Any, List[int]]:
+    manipulator = make_offline_manipulator()
+    command_ids = list(range(1, active_commands + 1))
+    for command_id in command_ids:
+        manipulator.active_commands[command_id] = FakeCommand(command_id)
+    if with_handlers:
+        manipulator.set_joint_states_handler(lambda data: None)
+        manipulator.set_coordinates_handler(lambda data: None)
+    return manipulator, command_ids
+
+
+def measure_allocations(manipulator: Any, messages: List[Tuple[float, str, str]]) -> Dict[str, float]:
+    """
+    Память на сообщение: пик выделений во время обработки и остаток после неё (байт).
+    tracemalloc замедляет обработку, поэтому это отдельный проход.
+    """
+    sample = messages[:ALLOCATION_SAMPLES]
+    peaks = 0
+    with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+        tracemalloc.start()
+        try:
+            baseline, _ = tracemalloc.get_traced_memory()
+            for _, topic, payload in sample:
+                before, _ = tracemalloc.get_traced_memory()
+                tracemalloc.reset_peak()
+                manipulator.process_message(topic, payload)
+                _, peak = tracemalloc.get_traced_memory()
+                peaks += peak - before
+            retained, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    count = max(1, len(sample))
+    return {"peak_bytes_per_msg": peaks / count, "retained_bytes_per_msg": (retained - baseline) / count}
+
+
+def run_case(active_commands: int, with_handlers: bool, rate: Optional[float]) -> Dict[str, Any]:
+    manipulator, command_ids = prepare_manipulator(active_commands, with_handlers)
+    messages = build_messages(MESSAGES_PER_RUN, rate, command_ids)
+    # Прогрев: первый вызов подтягивает ленивые импорты внутри process_message
+    replay(manipulator.process_message, messages[:len(MIX) * 10], speed=None)
+    report = replay(manipulator.process_message, messages, speed=None if rate is None else 1.0)
+    allocations = measure_allocations(manipulator, messages)
+    manipulator.disconnect()
+    return {
+        "active_commands": active_commands,
+        "handlers": with_handlers,
+        "offered_rate_hz": rate if rate is not None else "max",
+        "messages": report["messages"],
+        "errors": report["errors"],
+        "throughput_msgs_per_s": report["throughput_msgs_per_s"],
+        "handler_capacity_msgs_per_s": report["handler_capacity_msgs_per_s"],
+        "latency_us": report["latency_us"],
+        "max_lag_ms": report["max_lag_ms"],
+        **allocations,
+    }
+
+
+def run_suite() -> Dict[str, Any]:
+    results = []
+    for active_commands in ACTIVE_COMMANDS:
+        for with_handlers in (False, True):
+            for rate in RATES_HZ:
+                result = run_case(active_commands, with_handlers, rate)
+                results.append(result)
+                latency = result["latency_us"]
+                print(f"[BENCH] cmds={active_commands:<3} handlers={'да ' if with_handlers else 'нет'} "
+                      f"rate={str(result['offered_rate_hz']):>7}: "
+                      f"{result['throughput_msgs_per_s']:>8.0f} сообщ/с, "
+                      f"p50={latency['p50']:.1f} мкс, p99={latency['p99']:.1f} мкс, "
+                      f"пик {result['peak_bytes_per_msg']:.0f} Б/сообщ")
+    return {
+        "benchmark": "dispatch",
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "messages_per_run": MESSAGES_PER_RUN,
+        "mix": list(MIX),
+        "results": results,
+    }
+
+
+def main() -> None:
+    output = Path(sys.argv[1]) if len(sys.argv) > 1 else \
+        RESULTS_DIR / f"dispatch_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    suite = run_suite()
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(suite, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"[BENCH] Результаты сохранены в {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Бенчмарк фильтра PixyTracker на синтетических кадрах: как шум ускорения
+(process_noise) влияет на точность скорости, прогноза и реакцию на разгон блока.
+
+Кадры подаются прямо в PixyTracker.observe (без камеры и без времени ожидания):
+    - равномерное движение: блок едет с постоянной скоростью SPEED_PX_S;
+      оценка vx (5-й и 95-й перцентили, СКО) и ошибка прогноза на LEAD_S вперёд
+      (95-й перцентиль) в сравнении с экстраполяцией по двум последним кадрам;
+    - разгон: блок стоит, затем сразу едет со скоростью SPEED_PX_S;
+      через сколько секунд средняя оценка vx доходит до STEP_FRACTION скорости.
+
+    python bench_pixy_tracker.py                     # bench_results/pixy_tracker_<время>.json
+    python bench_pixy_tracker.py results.json
+"""
+
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from pixy_tracker import MEASUREMENT_NOISE, PixyBlock, PixyTracker
+
+# ===================== ПАРАМЕТРЫ =====================
+
+PROCESS_NOISES = (300.0, 100.0, 50.0, 30.0, 20.0, 10.0, 5.0)   # пиксели/с²
+SPEED_PX_S = 50.0
+RATE_HZ = 10.0
+SECONDS = 60.0
+WARMUP_S = 2.0
+LEAD_S = 0.3
+STEP_FRACTION = 0.9
+SEEDS = (1, 2, 3, 4, 5)
+RESULTS_DIR = Path("bench_results")
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def constant_velocity(process_noise: float, seed: int) -> Dict[str, Any]:
+    rnd = random.Random(seed)
+    tracker = PixyTracker(None, (1,), process_noise=process_noise)
+    vx: List[float] = []
+    predicted_error: List[float] = []
+    differenced_error: List[float] = []
+    previous = None
+    for i in range(int(SECONDS * RATE_HZ)):
+        t = i / RATE_HZ
+        z = 20.0 + SPEED_PX_S * t + rnd.gauss(0.0, MEASUREMENT_NOISE)
+        tracker.observe(1, [PixyBlock(1, z, 100.0 + rnd.gauss(0.0, MEASUREMENT_NOISE))], t)
+        truth_ahead = 20.0 + SPEED_PX_S * (t + LEAD_S)
+        if t >= WARMUP_S:
+            vx.append(tracker.best(1, at=t).vx)
+            predicted_error.append(abs(tracker.best(1, at=t + LEAD_S).x - truth_ahead))
+            differenced_error.append(abs(z + (z - previous) * RATE_HZ * LEAD_S - truth_ahead))
+        previous = z
+    return {
+        "vx_p5": _percentile(vx, 0.05),
+        "vx_p95": _percentile(vx, 0.95),
+        "vx_std": statistics.pstdev(vx),
+        "lead_error_p95": _percentile(predicted_error, 0.95),
+        "differencing_error_p95": _percentile(differenced_error, 0.95),
+    }
+
+
+def step_response(process_noise: float) -> float:
+    """
+    Запаздывание реакции на разгон: секунды от начала движения до момента, когда
+    средняя по SEEDS оценка vx достигает STEP_FRACTION скорости (шум усредняется).
+    """
+    start = 5.0
+    steps = int((start + 10.0) * RATE_HZ)
+    mean_vx = [0.0] * steps
+    for seed in SEEDS:
+        rnd = random.Random(seed)
+        tracker = PixyTracker(None, (1,), process_noise=process_noise)
+        for i in range(steps):
+            t = i / RATE_HZ
+            x = 100.0 + SPEED_PX_S * max(0.0, t - start)
+            tracker.observe(1, [PixyBlock(1, x + rnd.gauss(0.0, MEASUREMENT_NOISE), 100.0)], t)
+            estimate = tracker.best(1, at=t)       # первый кадр — трек ещё не подтверждён
+            mean_vx[i] += (estimate.vx if estimate is not None else 0.0) / len(SEEDS)
+    for i in range(int(start * RATE_HZ), steps):
+        if mean_vx[i] >= STEP_FRACTION * SPEED_PX_S:
+            return i / RATE_HZ - start
+    return float("inf")
+
+
+def run_suite() -> Dict[str, Any]:
+    results = []
+    for process_noise in PROCESS_NOISES:
+        runs = [constant_velocity(process_noise, seed) for seed in SEEDS]
+        result = {"process_noise": process_noise}
+        for key in runs[0]:
+            result[key] = statistics.median(run[key] for run in runs)
+        result["step_lag_s"] = step_response(process_noise)
+        results.append(result)
+        print(f"[BENCH] q={process_noise:5.0f} px/s²: vx {result['vx_p5']:5.1f}..{result['vx_p95']:5.1f} px/s "
+              f"(СКО {result['vx_std']:4.1f}), прогноз +{LEAD_S:.1f} с p95 {result['lead_error_p95']:5.1f} px "
+              f"(по двум кадрам {result['differencing_error_p95']:5.1f} px), "
+              f"разгон до {STEP_FRACTION:.0%} скорости за {result['step_lag_s']:.1f} с")
+    return {
+        "benchmark": "pixy_tracker",
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "speed_px_s": SPEED_PX_S,
+        "rate_hz": RATE_HZ,
+        "measurement_noise_px": MEASUREMENT_NOISE,
+        "results": results,
+    }
+
+
+def main() -> None:
+    output = Path(sys.argv[1]) if len(sys.argv) > 1 else \
+        RESULTS_DIR / f"pixy_tracker_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    suite = run_suite()
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(suite, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"[BENCH] Результаты сохранены в {output}")
+
+
+if __name__ == "__main__":
+    main()
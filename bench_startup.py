@@ -0,0 +1,168 @@
+"""
+Бенчмарк запуска: время импорта hehe и время до первой команды.
+
+Каждый замер — отдельный процесс python (иначе модули уже в sys.modules).
+Сравниваются два режима:
+    lazy  — как сейчас: команды и навесные модули SDK грузятся при первом использовании;
+    eager — как раньше: все модули из EAGER_MODULES импортируются сразу, а pixy_cam_*,
+            mgbot_conveyer и info создаются при создании Manipulator.
+
+Соединения — без сети: SimulatedConnection (medu_sim, подтверждение без задержки)
+и OfflineConnection (telemetry_replay, первая команда — до публикации, ответа никто не шлёт).
+
+    python bench_startup.py                      # bench_results/startup_<время>.json
+    python bench_startup.py results.json
+"""
+
+import importlib
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+# ===================== ПАРАМЕТРЫ =====================
+
+RUNS = 15
+CONNECTIONS = ("sim", "offline")
+MODES = ("lazy", "eager")
+RESULTS_DIR = Path("bench_results")
+
+# Модули, которые hehe.py раньше импортировал при загрузке
+EAGER_MODULES = (
+    "sdk.commands.data",
+    "sdk.commands.move_group",
+    "sdk.commands.get_manage_command",
+    "sdk.commands.play_audio_command",
+    "sdk.commands.move_angles_command",
+    "sdk.commands.set_conveyor_velocity_command",
+    "sdk.commands.calibration_linear_module_command",
+    "sdk.commands.move_linear_module_command",
+    "sdk.manipulators.extern_devices.pixy_cam.pixy_cam_uart_module",
+    "sdk.manipulators.extern_devices.pixy_cam.pixy_cam_usb_module",
+    "sdk.manipulators.extern_devices.mgbot.mgbot_conveyer",
+    "sdk.commands.pixy_cam_get_coordinates_command",
+    "sdk.commands.manipulator_commands",
+    "sdk.manipulators.manipulator_info",
+    "sdk.commands.arc_motion",
+    "sdk.manipulators.manipulator_connection",
+    "sdk.commands",
+    "sdk.commands.servo_control_type_command",
+)
+ATTACHMENTS = ("pixy_cam_uart_control", "pixy_cam_usb_control", "mgbot_conveyer", "info")
+
+
+# ===================== ЗАМЕР В ДОЧЕРНЕМ ПРОЦЕССЕ =====================
+
+def measure(connection: str, mode: str) -> Dict[str, Any]:
+    # Обвязка соединения грузится до замера: она не часть hehe
+    if connection == "sim":
+        from medu_sim import SimConfig, simulated_connection_factory
+        factory = simulated_connection_factory(SimConfig(ack_latency=0.0, ack_jitter=0.0,
+                                                         joint_rate_hz=0.0, coordinates_rate_hz=0.0,
+                                                         gpio_rate_hz=0.0, mgbot_rate_hz=0.0))
+    else:
+        from telemetry_replay import OfflineConnection as factory
+
+    started = time.perf_counter()
+    hehe = importlib.import_module("hehe")
+    if mode == "eager":
+        for name in EAGER_MODULES:
+            importlib.import_module(name)
+    imported = time.perf_counter()
+
+    manipulator = hehe.Manipulator("bench", "bench-client", "user", "pass", connection_factory=factory)
+    if mode == "eager":
+        for name in ATTACHMENTS:
+            getattr(manipulator, name)
+    constructed = time.perf_counter()
+
+    manipulator.connect()
+    if connection == "sim":
+        manipulator.get_control(timeout_seconds=5.0)
+    else:
+        manipulator.get_control_async(timeout_seconds=5.0).make_command_action()
+    first_command = time.perf_counter()
+    manipulator.disconnect()
+
+    return {
+        "import_ms": (imported - started) * 1000.0,
+        "construct_ms": (constructed - imported) * 1000.0,
+        "first_command_ms": (first_command - started) * 1000.0,
+        "sdk_modules": sum(1 for name in sys.modules if name == "sdk" or name.startswith("sdk.")),
+    }
+
+
+def child_main(connection: str, mode: str) -> None:
+    import contextlib
+    import os
+
+    with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+        result = measure(connection, mode)
+    print(json.dumps(result))
+
+
+# ===================== СЕРИЯ ЗАМЕРОВ =====================
+
+def run_case(connection: str, mode: str) -> Dict[str, Any]:
+    samples: List[Dict[str, Any]] = []
+    for _ in range(RUNS):
+        output = subprocess.run([sys.executable, __file__, "--child", connection, mode],
+                                capture_output=True, text=True, check=True)
+        samples.append(json.loads(output.stdout.strip().splitlines()[-1]))
+
+    def median(key: str) -> float:
+        return statistics.median(sample[key] for sample in samples)
+
+    return {
+        "connection": connection,
+        "mode": mode,
+        "runs": RUNS,
+        "import_ms": median("import_ms"),
+        "construct_ms": median("construct_ms"),
+        "first_command_ms": median("first_command_ms"),
+        "sdk_modules": samples[-1]["sdk_modules"],
+    }
+
+
+def run_suite() -> Dict[str, Any]:
+    results = []
+    for connection in CONNECTIONS:
+        by_mode = {}
+        for mode in MODES:
+            result = run_case(connection, mode)
+            by_mode[mode] = result
+            results.append(result)
+            print(f"[BENCH] {connection:<7} {mode:<5}: импорт {result['import_ms']:7.1f} мс, "
+                  f"создание {result['construct_ms']:6.2f} мс, "
+                  f"до первой команды {result['first_command_ms']:7.1f} мс, "
+                  f"модулей sdk: {result['sdk_modules']}")
+        lazy, eager = by_mode["lazy"], by_mode["eager"]
+        print(f"[BENCH] {connection:<7} выигрыш: импорт {eager['import_ms'] - lazy['import_ms']:+.1f} мс, "
+              f"до первой команды {eager['first_command_ms'] - lazy['first_command_ms']:+.1f} мс")
+    return {
+        "benchmark": "startup",
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def main() -> None:
+    if len(sys.argv) >= 4 and sys.argv[1] == "--child":
+        child_main(sys.argv[2], sys.argv[3])
+        return
+    output = Path(sys.argv[1]) if len(sys.argv) > 1 else \
+        RESULTS_DIR / f"startup_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    suite = run_suite()
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(suite, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"[BENCH] Результаты сохранены в {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+Журнал калибровки точек: append-only JSONL рядом с coords3.json.
+
+Каждая сохранённая точка — одна строка в coords3.json.journal, после записи
+делается flush + fsync, поэтому сохранение стоит O(1), а сбой посреди записи
+портит максимум последнюю (недописанную) строку, но не весь файл координат.
+
+Канонический coords3.json (снимок) периодически пересобирается в фоне:
+    1) журнал переименовывается в .journal.old, новые точки пишутся в свежий журнал;
+    2) снимок + .journal.old применяются и пишутся во временный файл + fsync;
+    3) os.replace() атомарно подменяет coords3.json;
+    4) .journal.old удаляется.
+Загрузка = снимок + .journal.old + .journal. Записи идемпотентны (полная поза
+точки или удаление), поэтому повторное применение после сбоя безопасно.
+
+    journal = CalibrationJournal(Path("coords3.json"))
+    points = journal.load()
+    journal.record("CELL_1", pose)
+    journal.close()           # дождаться фона и свернуть журнал в снимок
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+JOURNAL_SUFFIX = ".journal"
+OLD_SUFFIX = ".old"
+CORRUPT_SUFFIX = ".corrupt"
+
+# После стольких записей в журнал запускается фоновая компактизация
+COMPACT_EVERY = 50
+
+OP_SET = "set"
+OP_DELETE = "delete"
+
+
+def journal_path_for(snapshot_path: Path) -> Path:
+    return snapshot_path.with_name(snapshot_path.name + JOURNAL_SUFFIX)
+
+
+def journal_files(snapshot_path: Path) -> List[Path]:
+    """Существующие файлы журнала в порядке применения (.journal.old, затем .journal)"""
+    journal = journal_path_for(snapshot_path)
+    old = journal.with_name(journal.name + OLD_SUFFIX)
+    return [path for path in (old, journal) if path.exists()]
+
+
+def _fsync_dir(path: Path) -> None:
+    # На POSIX rename становится надёжным только после fsync каталога.
+    # На Windows каталог так открыть нельзя — там это не требуется.
+    try:
+        fd = os.open(str(path), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _iter_entries(path: Path) -> Iterator[Dict[str, Any]]:
+    with path.open("r", encoding="utf-8") as file:
+        for line_no, line in enumerate(file, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # Недописанная строка после сбоя — пропускаем
+                print(f"[JOURNAL] Пропущена повреждённая строка {path}:{line_no}")
+                continue
+            if isinstance(entry, dict):
+                yield entry
+
+
+def _apply(points: Dict[str, Any], entry: Dict[str, Any]) -> None:
+    name = entry.get("name")
+    if not isinstance(name, str):
+        return
+    if entry.get("op") == OP_DELETE:
+        points.pop(name, None)
+    elif "pose" in entry:
+        points[name] = entry["pose"]
+
+
+def _replay_files(snapshot_path: Path, paths: List[Path]) -> Dict[str, Any]:
+    points: Dict[str, Any] = {}
+    if snapshot_path.exists():
+        points = json.loads(snapshot_path.read_text(encoding="utf-8"))
+        if not isinstance(points, dict):
+            raise ValueError("Ожидался словарь верхнего уровня")
+    for path in paths:
+        for entry in _iter_entries(path):
+            _apply(points, entry)
+    return points
+
+
+def replay(snapshot_path: Path) -> Dict[str, Any]:
+    """
+    Состояние точек: снимок + все файлы журнала.
+    Ошибки чтения/разбора снимка пробрасываются (OSError, json.JSONDecodeError, ValueError).
+    """
+    return _replay_files(snapshot_path, journal_files(snapshot_path))
+
+
+def write_snapshot(snapshot_path: Path, points: Dict[str, Any]) -> None:
+    """Атомарно записать канонический JSON: временный файл + fsync + os.replace"""
+    tmp_path = snapshot_path.with_name(snapshot_path.name + ".tmp")
+    with tmp_path.open("w", encoding="utf-8") as file:
+        file.write(json.dumps(points, ensure_ascii=False, indent=2))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, snapshot_path)
+    _fsync_dir(snapshot_path.parent)
+
+
+class CalibrationJournal:
+    """Точки калибровки с журналом записи и фоновой компактизацией в снимок"""
+
+    def __init__(self, snapshot_path: Path, compact_every: int = COMPACT_EVERY):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path_for(snapshot_path)
+        self.old_journal_path = self.journal_path.with_name(self.journal_path.name + OLD_SUFFIX)
+        self.compact_every = compact_every
+
+        self.points: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._file = None
+        self._pending = 0  # записей в журнале с последней компактизации
+        self._compactor: Optional[threading.Thread] = None
+
+    # --- Загрузка ---
+
+    def load(self) -> Dict[str, Any]:
+        """Прочитать снимок и применить журнал; возвращает словарь точек"""
+        self.points = replay(self.snapshot_path)
+        self._pending = sum(1 for path in journal_files(self.snapshot_path) for _ in _iter_entries(path))
+        return self.points
+
+    def set_aside_snapshot(self) -> Optional[Path]:
+        """
+        Переименовать нечитаемый снимок в coords3.json.corrupt[.N] и загрузить точки
+        только из журнала. Иначе каждая компактизация снова спотыкалась бы о тот же снимок.
+        Возвращает новый путь снимка (None, если снимка не было).
+        """
+        aside = None
+        if self.snapshot_path.exists():
+            aside = self.snapshot_path.with_name(self.snapshot_path.name + CORRUPT_SUFFIX)
+            counter = 1
+            while aside.exists():
+                aside = self.snapshot_path.with_name(f"{self.snapshot_path.name}{CORRUPT_SUFFIX}.{counter}")
+                counter += 1
+            os.replace(self.snapshot_path, aside)
+            _fsync_dir(self.snapshot_path.parent)
+        self.load()
+        return aside
+
+    # --- Запись ---
+
+    def _open(self):
+        if self._file is None:
+            # Если прошлый запуск оборвался посреди строки — начинаем с новой
+            needs_newline = False
+            if self.journal_path.exists() and self.journal_path.stat().st_size > 0:
+                with self.journal_path.open("rb") as file:
+                    file.seek(-1, os.SEEK_END)
+                    needs_newline = file.read(1) != b"\n"
+            self._file = self.journal_path.open("a", encoding="utf-8")
+            if needs_newline:
+                self._file.write("\n")
+        return self._file
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        file = self._open()
+        file.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+        file.flush()
+        os.fsync(file.fileno())
+        self._pending += 1
+
+    def record(self, name: str, pose: Any) -> None:
+        """Сохранить (или перезаписать) точку: одна строка журнала + fsync"""
+        with self._lock:
+            self._append({"op": OP_SET, "name": name, "pose": pose})
+            self.points[name] = pose
+            should_compact = self._pending >= self.compact_every
+        if should_compact:
+            self.compact_in_background()
+
+    def delete(self, name: str) -> None:
+        with self._lock:
+            self._append({"op": OP_DELETE, "name": name})
+            self.points.pop(name, None)
+
+    # --- Компактизация ---
+
+    def _rotate(self) -> bool:
+        """Под блокировкой: закрыть журнал и переименовать его в .old"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            rotated = False
+            # Если .old остался от оборванной компактизации, не затираем его:
+            # журнал просто остаётся на месте (повторное применение безопасно)
+            if self.journal_path.exists() and not self.old_journal_path.exists():
+                os.replace(self.journal_path, self.old_journal_path)
+                rotated = True
+            if rotated:
+                self._pending = 0
+            return rotated
+
+    def compact(self) -> None:
+        """Свернуть журнал в канонический JSON (синхронно)"""
+        rotated = self._rotate()
+        # Снимок строится с диска (снимок + .old), а не из памяти: в него попадает
+        # ровно то, что уже надёжно записано, а новые точки остаются в свежем журнале
+        old_files = [self.old_journal_path] if self.old_journal_path.exists() else []
+        points = _replay_files(self.snapshot_path, old_files)
+        write_snapshot(self.snapshot_path, points)
+        try:
+            self.old_journal_path.unlink()
+        except FileNotFoundError:
+            pass
+        if rotated:
+            print(f"[JOURNAL] Журнал свёрнут в {self.snapshot_path}, точек: {len(points)}")
+
+    def _compact_safe(self) -> None:
+        try:
+            self.compact()
+        except Exception as e:
+            print(f"[JOURNAL] Ошибка компактизации {self.snapshot_path}: {e}")
+
+    def compact_in_background(self) -> None:
+        """Запустить компактизацию в фоне, если она ещё не идёт"""
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(target=self._compact_safe, daemon=True)
+        self._compactor.start()
+
+    def close(self, compact: bool = True) -> None:
+        """Дождаться фоновой компактизации и (по умолчанию) свернуть журнал"""
+        if self._compactor is not None:
+            self._compactor.join()
+            self._compactor = None
+        if compact and journal_files(self.snapshot_path):
+            self.compact()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,316 @@
+"""
+Классификация цвета объектов по кадрам ColorSensor конвейера.
+
+Цвет переводится в хроматичность r = R/(R+G+B), g = G/(R+G+B) — она почти не зависит
+от освещённости и расстояния до объекта. Классы задаются центроидами в этой плоскости
+(калибровка по образцам), а решение берётся из заранее посчитанной таблицы
+LUT_RESOLUTION x LUT_RESOLUTION: класс ближайшего центроида и уверенность
+1 - d1/d2 (d1, d2 — расстояния до ближайшего и второго центроида).
+Классификация кадра — пара делений и чтение таблицы.
+
+Кадр не классифицируется (label=None), если объект далеко от датчика (Prox меньше min_prox),
+слишком тёмный, дальше max_distance от всех центроидов или уверенность ниже min_confidence.
+
+    classifier = ColorClassifier.load(Path("color_calibration.json"))
+    decision = classifier.classify(frame.color, frame.color_prox)
+
+    watcher = ColorWatcher(stream, classifier)          # одно решение на проход объекта
+    watcher.label_near(obj.trigger_time)                # метка для ConveyorTracker
+
+Калибровка: python color_classifier.py [файл.json] — по очереди показать датчику образцы цветов.
+"""
+
+import json
+import math
+import os
+import sys
+import threading
+import time
+from array import array
+from collections import Counter, deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+HOST = "10.5.0.2"
+CLIENT_ID = "color-calibration"
+LOGIN = "user"
+PASSWORD = "pass"
+
+CALIBRATION_FILE = Path("color_calibration.json")
+LUT_RESOLUTION = 64
+UNKNOWN = 255
+
+MIN_PROX = 5.0              # объект напротив датчика (ColorSensor.Prox)
+MIN_BRIGHTNESS = 30         # R+G+B; темнее — цвет не определяется
+MAX_DISTANCE = 0.08         # максимальное расстояние до центроида в плоскости (r, g)
+MIN_CONFIDENCE = 0.3
+
+CALIBRATION_SAMPLES = 30
+
+RGB = Tuple[int, int, int]
+
+
+@dataclass(frozen=True)
+class ColorDecision:
+    """Результат классификации кадра"""
+    label: Optional[str]
+    confidence: float
+    chromaticity: Optional[Tuple[float, float]]
+    reason: str = ""        # почему метки нет: "prox", "dark", "far", "ambiguous"
+
+
+def chromaticity(rgb: Sequence[float]) -> Optional[Tuple[float, float]]:
+    total = rgb[0] + rgb[1] + rgb[2]
+    if total <= 0:
+        return None
+    return rgb[0] / total, rgb[1] / total
+
+
+class ColorClassifier:
+    """Ближайший центроид в плоскости хроматичности с таблицей решений"""
+
+    def __init__(self, centroids: Dict[str, Tuple[float, float]], min_prox: float = MIN_PROX,
+                 min_brightness: float = MIN_BRIGHTNESS, max_distance: float = MAX_DISTANCE,
+                 min_confidence: float = MIN_CONFIDENCE, resolution: int = LUT_RESOLUTION):
+        if not centroids:
+            raise ValueError("Нужен хотя бы один центроид цвета")
+        if len(centroids) >= UNKNOWN:
+            raise ValueError(f"Не больше {UNKNOWN - 1} классов")
+        self.centroids = {label: (float(r), float(g)) for label, (r, g) in centroids.items()}
+        self.labels: List[str] = list(self.centroids)
+        self.min_prox = min_prox
+        self.min_brightness = min_brightness
+        self.max_distance = max_distance
+        self.min_confidence = min_confidence
+        self.resolution = resolution
+        self._classes, self._confidence = self._build_lut()
+
+    def _nearest(self, r: float, g: float) -> Tuple[int, float, float]:
+        """(индекс класса, расстояние до ближайшего, уверенность)"""
+        distances = sorted((math.hypot(r - cr, g - cg), i)
+                           for i, (cr, cg) in enumerate(self.centroids.values()))
+        d1, index = distances[0]
+        if len(distances) == 1:
+            return index, d1, 1.0
+        d2 = distances[1][0]
+        return index, d1, 1.0 - d1 / d2 if d2 > 0 else 0.0
+
+    def _build_lut(self) -> Tuple[array, array]:
+        n = self.resolution
+        classes = array("B", bytes((n + 1) * (n + 1)))
+        confidence = array("f", bytes(4 * (n + 1) * (n + 1)))
+        for i in range(n + 1):
+            for j in range(n + 1):
+                # Клетки с r + g > 1 достижимы только из-за округления — считаем их тоже
+                index, distance, conf = self._nearest(i / n, j / n)
+                cell = i * (n + 1) + j
+                if distance <= self.max_distance:
+                    classes[cell] = index
+                    confidence[cell] = conf
+                else:
+                    classes[cell] = UNKNOWN
+        return classes, confidence
+
+    def classify(self, rgb: Optional[Sequence[float]], prox: Optional[float] = None) -> ColorDecision:
+        """Классифицировать цвет; prox — близость объекта (ColorSensor.Prox), None — не проверять"""
+        if prox is not None and prox < self.min_prox:
+            return ColorDecision(None, 0.0, None, "prox")
+        if rgb is None:
+            return ColorDecision(None, 0.0, None, "dark")
+        total = rgb[0] + rgb[1] + rgb[2]
+        if total < self.min_brightness or total <= 0:
+            return ColorDecision(None, 0.0, None, "dark")
+        n = self.resolution
+        r, g = rgb[0] / total, rgb[1] / total
+        cell = int(r * n + 0.5) * (n + 1) + int(g * n + 0.5)
+        index = self._classes[cell]
+        if index == UNKNOWN:
+            return ColorDecision(None, 0.0, (r, g), "far")
+        confidence = self._confidence[cell]
+        if confidence < self.min_confidence:
+            return ColorDecision(None, confidence, (r, g), "ambiguous")
+        return ColorDecision(self.labels[index], confidence, (r, g))
+
+    def classify_frame(self, frame: Any) -> ColorDecision:
+        """Классифицировать кадр ConveyorSensorStream (SensorFrame)"""
+        prox = frame.color_prox if frame.color_prox is not None else frame.prox
+        return self.classify(frame.color, prox)
+
+    # --- Калибровка ---
+
+    @classmethod
+    def calibrate(cls, samples: Dict[str, Sequence[RGB]], **kwargs: Any) -> "ColorClassifier":
+        """
+        Центроиды по образцам каждого цвета. Если max_distance не задан, он берётся
+        как 3 стандартных отклонения самого «шумного» класса, но не меньше MAX_DISTANCE / 2.
+        """
+        centroids: Dict[str, Tuple[float, float]] = {}
+        spread = 0.0
+        for label, rgbs in samples.items():
+            points = [p for p in (chromaticity(rgb) for rgb in rgbs) if p is not None]
+            if not points:
+                raise ValueError(f"Нет пригодных образцов для цвета {label}")
+            cr = sum(p[0] for p in points) / len(points)
+            cg = sum(p[1] for p in points) / len(points)
+            centroids[label] = (cr, cg)
+            variance = sum((p[0] - cr) ** 2 + (p[1] - cg) ** 2 for p in points) / len(points)
+            spread = max(spread, math.sqrt(variance))
+        kwargs.setdefault("max_distance", max(3.0 * spread, MAX_DISTANCE / 2))
+        return cls(centroids, **kwargs)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "centroids": {label: list(point) for label, point in self.centroids.items()},
+            "min_prox": self.min_prox,
+            "min_brightness": self.min_brightness,
+            "max_distance": self.max_distance,
+            "min_confidence": self.min_confidence,
+            "resolution": self.resolution,
+        }
+
+    def save(self, path: Path = CALIBRATION_FILE) -> None:
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_text(json.dumps(self.to_dict(), ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path = CALIBRATION_FILE) -> "ColorClassifier":
+        data = json.loads(path.read_text(encoding="utf-8"))
+        return cls({label: tuple(point) for label, point in data["centroids"].items()},
+                   min_prox=data.get("min_prox", MIN_PROX),
+                   min_brightness=data.get("min_brightness", MIN_BRIGHTNESS),
+                   max_distance=data.get("max_distance", MAX_DISTANCE),
+                   min_confidence=data.get("min_confidence", MIN_CONFIDENCE),
+                   resolution=data.get("resolution", LUT_RESOLUTION))
+
+
+# ===================== ПОТОК ДАТЧИКОВ =====================
+
+@dataclass(frozen=True)
+class PassDecision:
+    """Решение по одному проходу объекта мимо датчика цвета"""
+    label: str
+    confidence: float
+    votes: int
+    timestamp: float        # time.monotonic() принятия решения
+
+
+class ColorWatcher:
+    """
+    Одно решение на проход объекта: пока объект напротив датчика (проходит гейт по Prox),
+    копятся метки кадров; решение принимается, когда votes кадров подряд дали одну метку.
+    """
+
+    def __init__(self, stream: Any, classifier: ColorClassifier, votes: int = 3, history: int = 32):
+        self.stream = stream
+        self.classifier = classifier
+        self.votes = votes
+        self.decisions: Deque[PassDecision] = deque(maxlen=history)
+        self.frames = 0
+        self.rejected: Counter = Counter()
+
+        self._streak_label: Optional[str] = None
+        self._streak = 0
+        self._streak_confidence = 0.0
+        self._decided = False
+        self._lock = threading.Lock()
+        self._unsubscribe = stream.subscribe(self._on_frame)
+
+    def close(self) -> None:
+        self._unsubscribe()
+
+    def _on_frame(self, frame: Any) -> None:
+        decision = self.classifier.classify_frame(frame)
+        with self._lock:
+            self.frames += 1
+            if decision.reason == "prox":
+                # Объект ушёл от датчика — следующий проход начинается заново
+                self._streak_label, self._streak, self._decided = None, 0, False
+                return
+            if decision.label is None:
+                self.rejected[decision.reason] += 1
+                return
+            if self._decided:
+                return
+            if decision.label == self._streak_label:
+                self._streak += 1
+                self._streak_confidence = min(self._streak_confidence, decision.confidence)
+            else:
+                self._streak_label, self._streak = decision.label, 1
+                self._streak_confidence = decision.confidence
+            if self._streak >= self.votes:
+                self._decided = True
+                self.decisions.append(PassDecision(decision.label, self._streak_confidence,
+                                                   self._streak, frame.timestamp))
+
+    @property
+    def last_decision(self) -> Optional[PassDecision]:
+        with self._lock:
+            return self.decisions[-1] if self.decisions else None
+
+    def label_near(self, timestamp: float, window: float = 1.0) -> Optional[str]:
+        """Метка прохода, решение по которому принято не дальше window секунд от timestamp"""
+        with self._lock:
+            candidates = [d for d in self.decisions if abs(d.timestamp - timestamp) <= window]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda d: abs(d.timestamp - timestamp)).label
+
+
+# ===================== КАЛИБРОВКА НА СТЕНДЕ =====================
+
+def collect_color_samples(stream: Any, count: int = CALIBRATION_SAMPLES, timeout: float = 10.0) -> List[RGB]:
+    """Собрать count значений ColorSensor из потока"""
+    samples: List[RGB] = []
+    deadline = time.monotonic() + timeout
+    last = None
+    while len(samples) < count and time.monotonic() < deadline:
+        frame = stream.wait_for_frame(timeout=max(0.0, deadline - time.monotonic()), newer_than=last)
+        if frame is None:
+            break
+        last = frame.timestamp
+        if frame.color is not None:
+            samples.append(frame.color)
+    return samples
+
+
+def main() -> None:
+    from sdk.manipulators.medu import MEdu
+
+    from conveyor_stream import ConveyorSensorStream
+
+    path = Path(sys.argv[1]) if len(sys.argv) > 1 else CALIBRATION_FILE
+    manipulator = MEdu(HOST, CLIENT_ID, LOGIN, PASSWORD)
+    manipulator.connect()
+    manipulator.get_control()
+    stream = ConveyorSensorStream(manipulator)
+    stream.start(poll_interval=0.05)
+
+    samples: Dict[str, List[RGB]] = {}
+    try:
+        while True:
+            label = input("Название цвета (пусто — закончить): ").strip()
+            if not label:
+                break
+            input(f"Поставьте образец «{label}» перед датчиком цвета и нажмите Enter...")
+            collected = collect_color_samples(stream)
+            print(f"[COLOR] {label}: {len(collected)} кадров")
+            if collected:
+                samples.setdefault(label, []).extend(collected)
+    finally:
+        stream.stop()
+        manipulator.disconnect()
+
+    if not samples:
+        print("[COLOR] Образцов нет, калибровка не сохранена")
+        return
+    classifier = ColorClassifier.calibrate(samples)
+    classifier.save(path)
+    for label, (r, g) in classifier.centroids.items():
+        print(f"   {label}: r={r:.3f} g={g:.3f}")
+    print(f"[COLOR] max_distance={classifier.max_distance:.3f}, калибровка сохранена в {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""
+Общий слот команды манипулятора.
+
+У Manipulator/MEdu один specific_command: каждая команда с ответом (play_audio,
+write_gpio, get_gpio_value, get_block_coordinates_from_pixy, ...) занимает его
+и в конце сбрасывает в None. Если фоновый поток запустит свою команду, пока
+основной ждёт ответа на свою, ответ основной команды потеряется и она уйдёт
+в таймаут.
+
+Фоновые опросы (PixyTracker, AudioPlayer) берут command_slot(manip) на время
+команды. Код, который шлёт команды, пока они работают, тоже должен их обернуть:
+
+    with command_slot(m):
+        m.play_audio(file_name="warning.wav")
+
+Блокировка реентерабельная и одна на объект манипулятора.
+"""
+
+import threading
+import weakref
+
+_slots: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_slots_lock = threading.Lock()
+
+
+def command_slot(manip) -> threading.RLock:
+    """Блокировка слота команды этого манипулятора"""
+    with _slots_lock:
+        slot = _slots.get(manip)
+        if slot is None:
+            slot = threading.RLock()
+            _slots[manip] = slot
+        return slot
@@ -0,0 +1,280 @@
+"""
+Непрерывный поток данных датчиков конвейера MGbot.
+
+get_sensors_data(True) — запрос/ответ: каждое чтение стоит круга через контроллер.
+ConveyorSensorStream слушает MGBOT_TOPIC и раздаёт каждый кадр с DistanceSensor/ColorSensor:
+
+    stream = ConveyorSensorStream(manipulator)
+    stream.start()                              # poll_interval=0.05 — если конвейер сам не шлёт кадры
+    stream.start(0.05, scheduler=PollScheduler())   # опрос через poll_scheduler: период подстраивается
+    stream.subscribe(lambda frame: print(frame.distance))
+    stream.latest                               # последний кадр (SensorFrame) или None
+    stream.rate()                               # кадров в секунду за последние RATE_WINDOW секунд
+    frame = stream.wait_for_frame(timeout=1.0)  # следующий кадр
+
+    async for frame in stream.frames():         # асинхронный итератор (очередь на подписчика)
+        ...
+
+Колбэки вызываются в потоке MQTT: они должны быть быстрыми.
+"""
+
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from sdk.utils.constants import MGBOT_TOPIC
+
+from topic_listeners import add_listener, remove_listener
+
+RATE_WINDOW = 2.0            # окно оценки частоты кадров, с
+ASYNC_QUEUE_SIZE = 64        # кадров в очереди асинхронного подписчика (старые вытесняются)
+DEFAULT_POLL_INTERVAL = 0.05
+POLL_SOURCE = "conveyor_sensors"   # имя источника в PollScheduler
+DISTANCE_CHANGE = 2.0        # изменение DistanceSensor, которое считается движением (не шумом)
+COLOR_CHANGE = 10            # то же для каналов ColorSensor
+
+
+@dataclass(frozen=True)
+class SensorFrame:
+    """Кадр датчиков конвейера"""
+    timestamp: float                            # time.monotonic() приёма
+    distance: Optional[float]                   # DistanceSensor
+    color: Optional[Tuple[int, int, int]]       # ColorSensor R, G, B
+    color_prox: Optional[float]                 # ColorSensor.Prox
+    prox: Optional[float]                       # Prox верхнего уровня
+    raw: Dict[str, Any]
+
+
+def frames_differ(old: Optional[SensorFrame], new: Optional[SensorFrame]) -> bool:
+    """Изменились ли показания больше шума датчиков (для адаптивного опроса)"""
+    if old is None or new is None:
+        return old is not new
+    if (old.distance is None) != (new.distance is None) or (old.color is None) != (new.color is None):
+        return True
+    if old.distance is not None and abs(new.distance - old.distance) > DISTANCE_CHANGE:
+        return True
+    return old.color is not None and any(abs(a - b) > COLOR_CHANGE for a, b in zip(old.color, new.color))
+
+
+def parse_frame(data: Dict[str, Any], timestamp: float) -> Optional[SensorFrame]:
+    """Кадр из поля data сообщения MGBOT_TOPIC; None, если датчиков в нём нет"""
+    if not isinstance(data, dict) or ("DistanceSensor" not in data and "ColorSensor" not in data):
+        return None
+    distance = data.get("DistanceSensor")
+    color = data.get("ColorSensor")
+    rgb = None
+    color_prox = None
+    if isinstance(color, dict):
+        try:
+            rgb = (int(color["R"]), int(color["G"]), int(color["B"]))
+        except (KeyError, TypeError, ValueError):
+            rgb = None
+        color_prox = color.get("Prox")
+    return SensorFrame(
+        timestamp=timestamp,
+        distance=float(distance) if isinstance(distance, (int, float)) else None,
+        color=rgb,
+        color_prox=float(color_prox) if isinstance(color_prox, (int, float)) else None,
+        prox=float(data["Prox"]) if isinstance(data.get("Prox"), (int, float)) else None,
+        raw=data,
+    )
+
+
+class _AsyncSubscription:
+    """Асинхронный итератор кадров: поток MQTT кладёт кадры в очередь через call_soon_threadsafe"""
+
+    def __init__(self, stream: "ConveyorSensorStream", maxsize: int):
+        self._stream = stream
+        self._loop = asyncio.get_running_loop()
+        self._queue: "asyncio.Queue[Optional[SensorFrame]]" = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+        stream.subscribe(self._on_frame)
+
+    def _on_frame(self, frame: SensorFrame) -> None:
+        try:
+            self._loop.call_soon_threadsafe(self._put, frame)
+        except RuntimeError:
+            # Цикл событий закрыт — подписка больше не нужна
+            self._stream.unsubscribe(self._on_frame)
+
+    def _put(self, frame: Optional[SensorFrame]) -> None:
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(frame)
+
+    def close(self) -> None:
+        self._stream.unsubscribe(self._on_frame)
+        self._loop.call_soon_threadsafe(self._put, None)
+
+    def __aiter__(self) -> "_AsyncSubscription":
+        return self
+
+    async def __anext__(self) -> SensorFrame:
+        frame = await self._queue.get()
+        if frame is None:
+            raise StopAsyncIteration
+        return frame
+
+
+class ConveyorSensorStream:
+    """Поток кадров датчиков конвейера: колбэки, асинхронный итератор, последний кадр, частота"""
+
+    def __init__(self, manip: Any):
+        self.manip = manip
+        self.latest: Optional[SensorFrame] = None
+        self.frames_total = 0
+
+        self._callbacks: List[Callable[[SensorFrame], None]] = []
+        self._arrivals: Deque[float] = deque(maxlen=256)
+        self._condition = threading.Condition()
+        self._started = False
+        self._poll_thread: Optional[threading.Thread] = None
+        self._poll_stop = threading.Event()
+        self._scheduler: Any = None
+
+    # --- Управление ---
+
+    def start(self, poll_interval: Optional[float] = None, scheduler: Any = None,
+              max_poll_interval: Optional[float] = None, max_age: Optional[float] = None) -> None:
+        """
+        Начать слушать MGBOT_TOPIC.
+        :param poll_interval: Если задан — фоновый поток запрашивает данные датчиков
+                              с этим периодом (для прошивок, которые не шлют кадры сами)
+        :param scheduler: PollScheduler: опрашивать через него, а не отдельным потоком.
+                          Период меняется от poll_interval (показания меняются)
+                          до max_poll_interval (не меняются), но не дольше max_age
+        """
+        if not self._started:
+            add_listener(self.manip, MGBOT_TOPIC, self._on_message)
+            self._started = True
+        if poll_interval is not None and scheduler is not None:
+            if self._scheduler is None:
+                scheduler.add_source(POLL_SOURCE, self._request_frame, min_interval=poll_interval,
+                                     max_interval=max_poll_interval or poll_interval * 10,
+                                     max_age=max_age, changed=frames_differ)
+                self._scheduler = scheduler
+        elif poll_interval is not None and self._poll_thread is None:
+            self._poll_stop.clear()
+            self._poll_thread = threading.Thread(target=self._poll_loop, args=(poll_interval,),
+                                                 name="conveyor-poll", daemon=True)
+            self._poll_thread.start()
+
+    def stop(self) -> None:
+        if self._scheduler is not None:
+            self._scheduler.remove_source(POLL_SOURCE)
+            self._scheduler = None
+        if self._poll_thread is not None:
+            self._poll_stop.set()
+            self._poll_thread.join(timeout=2.0)
+            self._poll_thread = None
+        if self._started:
+            try:
+                remove_listener(self.manip, MGBOT_TOPIC, self._on_message)
+            except Exception as e:
+                print(f"[CONVEYOR] Ошибка при отписке от датчиков: {e}")
+            self._started = False
+
+    def _poll_loop(self, interval: float) -> None:
+        while not self._poll_stop.is_set():
+            started = time.monotonic()
+            try:
+                # Ответ придёт в MGBOT_TOPIC и попадёт в поток через _on_message
+                self.manip.mgbot_conveyer.get_sensors_data(True)
+            except Exception as e:
+                print(f"[CONVEYOR] Ошибка запроса датчиков: {e}")
+            self._poll_stop.wait(max(0.0, interval - (time.monotonic() - started)))
+
+    def _request_frame(self) -> Optional[SensorFrame]:
+        """
+        Опрос для PollScheduler: значение — кадр из ответа get_sensors_data.
+        self.latest здесь не подходит: promise запроса разрешается раньше, чем
+        слушатели топика получают тот же кадр, и latest обычно ещё предыдущий.
+        """
+        raw = self.manip.mgbot_conveyer.get_sensors_data(True)
+        if isinstance(raw, (str, bytes)):
+            try:
+                raw = json.loads(raw)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                raw = None
+        frame = parse_frame(raw, time.monotonic())
+        # Ответ без датчиков (или неизвестного формата) — остаётся последний кадр из топика
+        return frame if frame is not None else self.latest
+
+    # --- Подписчики ---
+
+    def subscribe(self, callback: Callable[[SensorFrame], None]) -> Callable[[], None]:
+        """Добавить колбэк на каждый кадр; возвращает функцию отписки"""
+        if not callable(callback):
+            raise TypeError("Колбэк должен быть функцией или методом")
+        with self._condition:
+            self._callbacks = self._callbacks + [callback]
+        return lambda: self.unsubscribe(callback)
+
+    def unsubscribe(self, callback: Callable[[SensorFrame], None]) -> None:
+        with self._condition:
+            self._callbacks = [c for c in self._callbacks if c is not callback]
+
+    def frames(self, maxsize: int = ASYNC_QUEUE_SIZE) -> _AsyncSubscription:
+        """Асинхронный итератор кадров (вызывать внутри работающего цикла событий)"""
+        return _AsyncSubscription(self, maxsize)
+
+    def __aiter__(self) -> _AsyncSubscription:
+        return self.frames()
+
+    # --- Приём кадров ---
+
+    def _on_message(self, message: Dict[str, Any]) -> None:
+        data = message.get("data") if isinstance(message, dict) else None
+        frame = parse_frame(data, time.monotonic())
+        if frame is not None:
+            self.publish(frame)
+
+    def publish(self, frame: SensorFrame) -> None:
+        """Разослать кадр подписчикам (вызывается из потока MQTT или вручную)"""
+        with self._condition:
+            self.latest = frame
+            self.frames_total += 1
+            self._arrivals.append(frame.timestamp)
+            callbacks = self._callbacks
+            self._condition.notify_all()
+        for callback in callbacks:
+            try:
+                callback(frame)
+            except Exception as e:
+                print(f"[CONVEYOR] Ошибка в обработчике кадра датчиков: {e}")
+
+    # --- Последнее значение и статистика ---
+
+    def age(self) -> Optional[float]:
+        """Сколько секунд назад пришёл последний кадр (None — кадров ещё не было)"""
+        latest = self.latest
+        return None if latest is None else time.monotonic() - latest.timestamp
+
+    def wait_for_frame(self, timeout: Optional[float] = None,
+                       newer_than: Optional[float] = None) -> Optional[SensorFrame]:
+        """
+        Дождаться кадра, пришедшего позже newer_than (по умолчанию — позже текущего последнего).
+        Возвращает None по таймауту.
+        """
+        with self._condition:
+            if newer_than is None:
+                newer_than = self.latest.timestamp if self.latest is not None else float("-inf")
+            if self._condition.wait_for(lambda: self.latest is not None and self.latest.timestamp > newer_than,
+                                        timeout):
+                return self.latest
+            return None
+
+    def rate(self, window: float = RATE_WINDOW) -> float:
+        """Частота кадров (Гц) за последние window секунд"""
+        with self._condition:
+            arrivals = list(self._arrivals)
+        now = time.monotonic()
+        recent = [t for t in arrivals if now - t <= window]
+        if len(recent) < 2:
+            return 0.0
+        return (len(recent) - 1) / max(recent[-1] - recent[0], 1e-9)
@@ -0,0 +1,402 @@
+"""
+Отслеживание объектов на движущемся конвейере и захват «на лету».
+
+Положение объекта вдоль ленты оценивается по срабатыванию датчика расстояния
+(объект проходит мимо датчика) и пройденному лентой пути: путь считается
+интегрированием заданной скорости (set_speed_motors) по времени.
+Для каждого объекта считается момент и точка встречи с манипулятором
+с учётом задержки команды, скорости TCP и времени спуска, и манипулятор
+отправляется навстречу, не останавливая ленту.
+
+    tracker = ConveyorTracker(m, BeltGeometry(...), ArmTiming())
+    tracker.start(belt_speed=40)
+    obj = tracker.wait_for_object(timeout=10.0)
+    if obj is not None and tracker.pick_on_the_fly(obj):
+        ...
+
+Геометрию (точка датчика на ленте, направление движения, высоты) и
+meters_per_speed_unit нужно измерить на стенде: например, засечь время
+прохода объекта между двумя отметками на известной скорости.
+"""
+
+import bisect
+import itertools
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Collection, Dict, List, Optional, Tuple
+
+from sdk.commands.move_coordinates_command import (
+    MoveCoordinatesParamsOrientation,
+    MoveCoordinatesParamsPosition,
+)
+from sdk.manipulators.medu import MEdu
+
+from color_classifier import CALIBRATION_FILE, ColorClassifier, ColorWatcher
+from conveyor_stream import ConveyorSensorStream, SensorFrame
+from distance_zones import DistanceZone, DistanceZoneTracker
+
+# ===================== ПОДКЛЮЧЕНИЕ =====================
+
+HOST = "10.5.0.2"
+CLIENT_ID = "conveyor-tracker"
+LOGIN = "user"
+PASSWORD = "pass"
+
+BELT_SPEED = 40               # скорость ленты в единицах set_speed_motors
+SENSOR_POLL_INTERVAL = 0.05
+DROP_POSITION = (0.20, -0.20, 0.15)
+# Сортировка по цвету (если есть калибровка датчика цвета): метка -> точка сброса.
+# Объекты с цветом не из списка пропускаются дальше по ленте.
+DROP_POSITIONS: Dict[str, Tuple[float, float, float]] = {
+    "red": (0.20, -0.20, 0.15),
+    "green": (0.15, -0.25, 0.15),
+    "blue": (0.10, -0.30, 0.15),
+}
+GRIP_OPEN_ANGLE = 15
+GRIP_CLOSE_ANGLE = 45
+VEL = 0.4
+ACC = 0.4
+
+
+@dataclass
+class BeltGeometry:
+    """Лента в системе координат манипулятора (м)"""
+    sensor_xy: Tuple[float, float] = (0.30, 0.15)        # точка ленты напротив датчика
+    direction: Tuple[float, float] = (0.0, -1.0)          # направление движения ленты
+    meters_per_speed_unit: float = 0.001                  # м/с на единицу set_speed_motors
+    trigger_distance: float = 100.0                       # показание датчика «объект напротив»
+    trigger_hysteresis: float = 10.0
+    trigger_dwell: float = 0.05                           # с
+    pick_window: Tuple[float, float] = (0.10, 0.30)       # досягаемый участок ленты от датчика, м
+    pick_z: float = 0.07                                  # высота захвата (tool1), м
+    hover_height: float = 0.05                            # подход над объектом, м
+    orientation: Tuple[float, float, float, float] = (0.0, 0.0, 0.0, 1.0)
+
+
+@dataclass
+class ArmTiming:
+    """Модель времени движения манипулятора"""
+    command_latency: float = 0.15     # от отправки команды до начала движения, с
+    tcp_speed: float = 0.15           # средняя скорость TCP при переездах, м/с
+    descend_time: float = 0.6         # спуск с высоты подхода до захвата, с
+    grip_time: float = 0.3            # закрытие захвата, с
+
+
+@dataclass
+class TrackedObject:
+    """Объект на ленте"""
+    id: int
+    trigger_time: float               # time.monotonic() прохода мимо датчика
+    trigger_travel: float             # путь ленты на момент срабатывания, м
+    frame: Optional[SensorFrame] = None
+    label: Optional[str] = None
+    picked: bool = False
+
+
+@dataclass
+class Intercept:
+    """План встречи с объектом"""
+    obj: TrackedObject
+    meet_time: float
+    position: Tuple[float, float, float]
+    hover: Tuple[float, float, float]
+    offset: float                     # положение объекта от датчика в момент встречи, м
+
+
+# ===================== ОДОМЕТРИЯ ЛЕНТЫ =====================
+
+class BeltOdometer:
+    """Путь ленты как интеграл кусочно-постоянной заданной скорости"""
+
+    def __init__(self, meters_per_speed_unit: float):
+        self.meters_per_speed_unit = meters_per_speed_unit
+        now = time.monotonic()
+        # (время начала участка, путь в начале участка, скорость м/с)
+        self._segments: List[Tuple[float, float, float]] = [(now, 0.0, 0.0)]
+        self._starts: List[float] = [now]
+        self._lock = threading.Lock()
+
+    def set_speed(self, speed: float, timestamp: Optional[float] = None) -> None:
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        with self._lock:
+            travel = self._travel_locked(timestamp)
+            self._segments.append((timestamp, travel, speed * self.meters_per_speed_unit))
+            self._starts.append(timestamp)
+
+    @property
+    def velocity(self) -> float:
+        with self._lock:
+            return self._segments[-1][2]
+
+    def _travel_locked(self, timestamp: float) -> float:
+        index = max(0, bisect.bisect_right(self._starts, timestamp) - 1)
+        start, travel, velocity = self._segments[index]
+        return travel + velocity * (timestamp - start)
+
+    def travel(self, timestamp: Optional[float] = None) -> float:
+        """Путь ленты (м) к моменту timestamp; для будущего — при текущей скорости"""
+        with self._lock:
+            return self._travel_locked(time.monotonic() if timestamp is None else timestamp)
+
+
+# ===================== ТРЕКЕР =====================
+
+class ConveyorTracker:
+    """Объекты на ленте по срабатываниям датчика, план встречи и захват на ходу"""
+
+    def __init__(self, manip: Any, geometry: Optional[BeltGeometry] = None, timing: Optional[ArmTiming] = None,
+                 stream: Optional[ConveyorSensorStream] = None,
+                 labeler: Optional[Callable[[TrackedObject], Optional[str]]] = None):
+        """
+        :param labeler: Метка объекта при срабатывании датчика (например, цвет из ColorWatcher.label_near)
+        """
+        self.manip = manip
+        self.labeler = labeler
+        self.geometry = geometry or BeltGeometry()
+        self.timing = timing or ArmTiming()
+        self.stream = stream or ConveyorSensorStream(manip)
+        self.odometer = BeltOdometer(self.geometry.meters_per_speed_unit)
+
+        g = self.geometry
+        norm = math.hypot(*g.direction)
+        self._direction = (g.direction[0] / norm, g.direction[1] / norm)
+        self._trigger = DistanceZoneTracker(
+            [DistanceZone("object", upper=g.trigger_distance), DistanceZone("empty", lower=g.trigger_distance)],
+            hysteresis=g.trigger_hysteresis, min_dwell=g.trigger_dwell,
+            on_change=self._on_zone_change, queue_changes=False)
+
+        self.objects: List[TrackedObject] = []
+        self._ids = itertools.count(1)
+        self._condition = threading.Condition()
+        self.arm_position: Optional[Tuple[float, float, float]] = None
+        self.missed = 0
+
+    # --- Лента и датчик ---
+
+    def start(self, belt_speed: Optional[float] = None, poll_interval: Optional[float] = SENSOR_POLL_INTERVAL) -> None:
+        self._trigger.attach(self.stream)
+        self.stream.start(poll_interval=poll_interval)
+        try:
+            coords = self.manip.get_cartesian_coordinates()
+            self.arm_position = (coords["x"], coords["y"], coords["z"])
+        except Exception as e:
+            print(f"[TRACKER] Положение манипулятора неизвестно ({e}), первый план будет с запасом")
+        if belt_speed is not None:
+            self.set_belt_speed(belt_speed)
+
+    def stop(self, stop_belt: bool = True) -> None:
+        if stop_belt:
+            self.set_belt_speed(0)
+        self._trigger.detach()
+        self.stream.stop()
+
+    def set_belt_speed(self, speed: float) -> None:
+        """Задать скорость ленты и учесть её в одометрии"""
+        self.manip.mgbot_conveyer.set_speed_motors(speed)
+        self.odometer.set_speed(speed)
+
+    def _on_zone_change(self, change: Any) -> None:
+        if change.zone.name != "object":
+            return
+        # Зона подтверждается через trigger_dwell после фактического прихода объекта
+        trigger_time = change.timestamp - self.geometry.trigger_dwell
+        obj = TrackedObject(id=next(self._ids), trigger_time=trigger_time,
+                            trigger_travel=self.odometer.travel(trigger_time), frame=self.stream.latest)
+        if self.labeler is not None:
+            try:
+                obj.label = self.labeler(obj)
+            except Exception as e:
+                print(f"[TRACKER] Ошибка определения метки объекта: {e}")
+        with self._condition:
+            self.objects.append(obj)
+            self._condition.notify_all()
+        print(f"[TRACKER] Объект #{obj.id} у датчика" + (f" ({obj.label})" if obj.label else ""))
+
+    # --- Положение объектов ---
+
+    def offset(self, obj: TrackedObject, timestamp: Optional[float] = None) -> float:
+        """Расстояние объекта от датчика вдоль ленты (м)"""
+        return self.odometer.travel(timestamp) - obj.trigger_travel
+
+    def belt_point(self, offset: float) -> Tuple[float, float]:
+        x0, y0 = self.geometry.sensor_xy
+        return x0 + self._direction[0] * offset, y0 + self._direction[1] * offset
+
+    def _time_at_offset(self, obj: TrackedObject, offset: float, now: float) -> Optional[float]:
+        """Когда объект дойдёт до offset при текущей скорости (None — лента стоит)"""
+        velocity = self.odometer.velocity
+        if velocity <= 0:
+            return None
+        return now + (offset - self.offset(obj, now)) / velocity
+
+    def pending_objects(self) -> List[TrackedObject]:
+        """Ещё не взятые объекты, не ушедшие за пределы досягаемости; ушедшие считаются пропущенными"""
+        now = time.monotonic()
+        end = self.geometry.pick_window[1]
+        with self._condition:
+            alive = []
+            for obj in self.objects:
+                if obj.picked:
+                    continue
+                if self.offset(obj, now) > end:
+                    self.missed += 1
+                    print(f"[TRACKER] Объект #{obj.id} ушёл за пределы досягаемости")
+                    continue
+                alive.append(obj)
+            self.objects = alive
+            return list(alive)
+
+    def wait_for_object(self, timeout: Optional[float] = None,
+                        labels: Optional[Collection[str]] = None) -> Optional[TrackedObject]:
+        """
+        Необработанный объект, раньше всех прошедший датчик (дальше всех по ленте).
+        :param labels: Брать только объекты с этими метками (остальные уезжают дальше)
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            pending = [obj for obj in self.pending_objects() if labels is None or obj.label in labels]
+            if pending:
+                return pending[0]
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return None
+            with self._condition:
+                self._condition.wait(remaining)
+
+    # --- План встречи ---
+
+    def _travel_time(self, target: Tuple[float, float, float]) -> float:
+        if self.arm_position is None:
+            return self.timing.command_latency + 1.0
+        return self.timing.command_latency + math.dist(self.arm_position, target) / self.timing.tcp_speed
+
+    def plan_intercept(self, obj: TrackedObject, now: Optional[float] = None) -> Optional[Intercept]:
+        """
+        Момент и точка встречи: подъехать над точкой, где будет объект, и спуститься к его приходу.
+        None — объект уже не догнать в пределах окна досягаемости.
+        """
+        now = time.monotonic() if now is None else now
+        g, t = self.geometry, self.timing
+        start, end = g.pick_window
+
+        meet = now + t.command_latency + t.descend_time
+        for _ in range(10):
+            # Неподвижная точка: время встречи = подъезд к точке встречи + спуск
+            offset = self.offset(obj, meet)
+            x, y = self.belt_point(min(max(offset, start), end))
+            new_meet = now + self._travel_time((x, y, g.pick_z + g.hover_height)) + t.descend_time
+            if abs(new_meet - meet) < 1e-3:
+                meet = new_meet
+                break
+            meet = new_meet
+
+        offset = self.offset(obj, meet)
+        if offset < start:
+            # Раньше объект не войдёт в зону досягаемости — ждём его на входе
+            arrival = self._time_at_offset(obj, start, now)
+            if arrival is None:
+                return None
+            meet, offset = arrival, start
+        if offset > end:
+            return None
+        x, y = self.belt_point(offset)
+        return Intercept(obj=obj, meet_time=meet, position=(x, y, g.pick_z),
+                         hover=(x, y, g.pick_z + g.hover_height), offset=offset)
+
+    # --- Движение ---
+
+    def move_to(self, xyz: Tuple[float, float, float], velocity: float = VEL, acceleration: float = ACC) -> None:
+        qx, qy, qz, qw = self.geometry.orientation
+        prom = self.manip.move_to_coordinates(
+            MoveCoordinatesParamsPosition(x=xyz[0], y=xyz[1], z=xyz[2]),
+            MoveCoordinatesParamsOrientation(x=qx, y=qy, z=qz, w=qw),
+            velocity_scaling_factor=velocity,
+            acceleration_scaling_factor=acceleration,
+        )
+        if hasattr(prom, "result"):
+            prom.result(timeout=30.0)
+        self.arm_position = xyz
+
+    def pick_on_the_fly(self, obj: TrackedObject) -> bool:
+        """Захватить объект на движущейся ленте; False — не успели"""
+        plan = self.plan_intercept(obj)
+        if plan is None:
+            print(f"[TRACKER] Объект #{obj.id}: встреча невозможна")
+            return False
+
+        g, t = self.geometry, self.timing
+        self.manip.manage_gripper(rotation=0, gripper=GRIP_OPEN_ANGLE)
+        self.move_to(plan.hover)
+
+        # Спуск начинаем так, чтобы прийти к точке вместе с объектом; если опаздываем —
+        # спускаемся туда, где объект будет к концу спуска
+        now = time.monotonic()
+        descend_at = plan.meet_time - t.descend_time - t.command_latency
+        if descend_at > now:
+            time.sleep(descend_at - now)
+            target = plan.position
+        else:
+            late_offset = self.offset(obj, now + t.command_latency + t.descend_time)
+            if late_offset > g.pick_window[1]:
+                print(f"[TRACKER] Объект #{obj.id}: опоздали на {now - descend_at:.2f} с")
+                return False
+            x, y = self.belt_point(late_offset)
+            target = (x, y, g.pick_z)
+
+        self.move_to(target)
+        self.manip.manage_gripper(rotation=0, gripper=GRIP_CLOSE_ANGLE)
+        time.sleep(t.grip_time)
+        self.move_to((target[0], target[1], target[2] + g.hover_height))
+        obj.picked = True
+        print(f"[TRACKER] Объект #{obj.id} взят в {plan.offset:.3f} м от датчика")
+        return True
+
+
+def main():
+    m = MEdu(HOST, CLIENT_ID, LOGIN, PASSWORD)
+    print("[*] Подключение...")
+    m.connect()
+    m.get_control()
+    m.nozzle_power(True)
+
+    stream = ConveyorSensorStream(m)
+    watcher = None
+    labels = None
+    if CALIBRATION_FILE.exists():
+        # Сортировка по цвету: метка приходит от датчика цвета к моменту срабатывания
+        watcher = ColorWatcher(stream, ColorClassifier.load(CALIBRATION_FILE))
+        labels = DROP_POSITIONS.keys()
+        print(f"[*] Сортировка по цветам: {', '.join(labels)}")
+    tracker = ConveyorTracker(m, stream=stream,
+                              labeler=(lambda obj: watcher.label_near(obj.trigger_time)) if watcher else None)
+    tracker.start(belt_speed=BELT_SPEED)
+    picked = 0
+    try:
+        while True:
+            obj = tracker.wait_for_object(timeout=10.0, labels=labels)
+            if obj is None:
+                print("[*] Объектов нет 10 с")
+                continue
+            if tracker.pick_on_the_fly(obj):
+                tracker.move_to(DROP_POSITIONS.get(obj.label, DROP_POSITION))
+                m.manage_gripper(rotation=0, gripper=GRIP_OPEN_ANGLE)
+                picked += 1
+    except KeyboardInterrupt:
+        print("\n[!] Остановлено пользователем")
+    finally:
+        tracker.stop()
+        if watcher is not None:
+            watcher.close()
+        print(f"[*] Взято: {picked}, пропущено: {tracker.missed}")
+        try:
+            m.nozzle_power(False)
+            m.release_control()
+            m.disconnect()
+        except Exception:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Скомпилированное хранилище точек из coords3.json.
+
+JSON разбирается и проверяется один раз; результат сохраняется в бинарный кэш
+рядом с исходником (coords3.json.cache) с ключом mtime + SHA-256 исходного файла.
+При следующих запусках, пока исходник не менялся, скрипт читает только кэш.
+
+Для каждой пары (точка, инструмент) заранее собираются объекты
+MoveCoordinatesParamsPosition / MoveCoordinatesParamsOrientation, поэтому
+move_pose не делает поиск по словарям и не создаёт объекты на каждом движении:
+
+    store = load_point_store(Path("coords3.json"))
+    position, orientation = store.pose("CELL_1", "tool1")
+
+Если рядом лежит журнал калибровки (calib_journal), точки берутся из снимка
+с применённым журналом, минуя кэш.
+
+Хранилище ведёт себя и как обычный словарь: store["CELL_1"]["tool0"]["position"].
+"""
+
+import hashlib
+import json
+import os
+import pickle
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from calib_journal import journal_files, replay
+
+CACHE_FORMAT_VERSION = 1
+CACHE_SUFFIX = ".cache"
+
+CoordinatesData = Dict[str, Dict[str, Dict[str, Any]]]
+PoseVector = Tuple[float, float, float, float, float, float, float]
+
+
+class PointStore:
+    """Точки калибровки: исходные данные, векторы поз и готовые объекты SDK"""
+
+    def __init__(self, source: Path, data: CoordinatesData, vectors: Dict[Tuple[str, str], PoseVector]):
+        self.source = source
+        self.data = data
+        self.vectors = vectors
+        self._poses: Dict[Tuple[str, str], Tuple[Any, Any]] = {}
+
+    # --- Доступ как к словарю coords3.json ---
+
+    def __getitem__(self, name: str) -> Dict[str, Dict[str, Any]]:
+        return self.data[name]
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.data
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.data)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def keys(self):
+        return self.data.keys()
+
+    def items(self):
+        return self.data.items()
+
+    # --- Быстрый доступ к позам ---
+
+    def vector(self, name: str, tool: str = "tool0") -> PoseVector:
+        """(x, y, z, qx, qy, qz, qw) для точки и инструмента"""
+        try:
+            return self.vectors[(name, tool)]
+        except KeyError as exc:
+            raise KeyError(f"В файле {self.source} нет точки '{name}' и/или инструмента '{tool}'") from exc
+
+    def pose(self, name: str, tool: str = "tool0") -> Tuple[Any, Any]:
+        """Готовые (MoveCoordinatesParamsPosition, MoveCoordinatesParamsOrientation)"""
+        key = (name, tool)
+        pose = self._poses.get(key)
+        if pose is None:
+            if not self._poses:
+                self.build_poses()
+            pose = self._poses.get(key)
+            if pose is None:
+                self.vector(name, tool)  # выбросит KeyError с понятным сообщением
+        return pose
+
+    def build_poses(self) -> None:
+        """Собрать объекты SDK для всех точек (вызывается автоматически при первом pose())"""
+        from sdk.commands.move_coordinates_command import (
+            MoveCoordinatesParamsPosition,
+            MoveCoordinatesParamsOrientation,
+        )
+
+        for key, (x, y, z, qx, qy, qz, qw) in self.vectors.items():
+            self._poses[key] = (
+                MoveCoordinatesParamsPosition(x=x, y=y, z=z),
+                MoveCoordinatesParamsOrientation(x=qx, y=qy, z=qz, w=qw),
+            )
+
+
+def compile_coordinates(data: Any) -> Dict[Tuple[str, str], PoseVector]:
+    """
+    Проверить структуру name -> tool -> position/orientation и собрать векторы поз.
+    Инструменты без position/orientation пропускаются (их нет в быстрых позах).
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Ожидался словарь верхнего уровня")
+
+    vectors: Dict[Tuple[str, str], PoseVector] = {}
+    for name, tools in data.items():
+        if not isinstance(tools, dict):
+            raise ValueError(f"Точка '{name}': ожидался словарь инструментов")
+        for tool, pose in tools.items():
+            if not isinstance(pose, dict) or "position" not in pose or "orientation" not in pose:
+                continue
+            position = pose["position"]
+            orientation = pose["orientation"]
+            try:
+                vectors[(name, tool)] = (
+                    float(position["x"]), float(position["y"]), float(position["z"]),
+                    float(orientation["x"]), float(orientation["y"]),
+                    float(orientation["z"]), float(orientation["w"]),
+                )
+            except (KeyError, TypeError, ValueError) as exc:
+                raise ValueError(f"Точка '{name}.{tool}': некорректная поза ({exc})") from exc
+    return vectors
+
+
+def cache_path_for(source: Path) -> Path:
+    return source.with_name(source.name + CACHE_SUFFIX)
+
+
+_CACHE_KEYS = ("mtime_ns", "size", "sha256", "data", "vectors")
+
+
+def _read_cache(cache_path: Path) -> Optional[Dict[str, Any]]:
+    """Кэш или None: любой нечитаемый, чужой или устаревший кэш — промах, а не ошибка запуска"""
+    try:
+        with cache_path.open("rb") as file:
+            cached = pickle.load(file)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        # Повреждённый pickle может бросить почти что угодно
+        # (ImportError, IndexError, TypeError, KeyError, UnicodeDecodeError, ...)
+        print(f"[!] Кэш координат {cache_path} не читается ({type(e).__name__}: {e}), пересобираю")
+        return None
+    if not isinstance(cached, dict) or cached.get("version") != CACHE_FORMAT_VERSION:
+        return None
+    if any(key not in cached for key in _CACHE_KEYS):
+        return None
+    return cached
+
+
+def _write_cache(cache_path: Path, cached: Dict[str, Any]) -> None:
+    tmp_path = cache_path.with_name(cache_path.name + ".tmp")
+    try:
+        with tmp_path.open("wb") as file:
+            pickle.dump(cached, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"[!] Не удалось сохранить кэш координат {cache_path}: {e}")
+
+
+def load_point_store(source: Path, use_cache: bool = True) -> PointStore:
+    """
+    Загрузить точки: из кэша, если исходник не менялся (mtime, затем SHA-256),
+    иначе разобрать JSON, проверить и пересохранить кэш.
+    Ошибки чтения/разбора исходника пробрасываются (OSError, json.JSONDecodeError, ValueError).
+    """
+    if journal_files(source):
+        # Калибровка не свёрнута в снимок (write_coords ещё работает или упал):
+        # актуальное состояние — снимок + журнал, кэш не используем
+        data = replay(source)
+        return PointStore(source, data, compile_coordinates(data))
+
+    stat = source.stat()
+    cache_path = cache_path_for(source)
+    cached = _read_cache(cache_path) if use_cache else None
+
+    if cached is not None and cached["mtime_ns"] == stat.st_mtime_ns and cached["size"] == stat.st_size:
+        return PointStore(source, cached["data"], cached["vectors"])
+
+    raw = source.read_bytes()
+    digest = hashlib.sha256(raw).hexdigest()
+
+    if cached is not None and cached["sha256"] == digest:
+        # Файл «тронули», но содержимое то же — обновляем только ключ кэша
+        cached["mtime_ns"] = stat.st_mtime_ns
+        cached["size"] = stat.st_size
+        _write_cache(cache_path, cached)
+        return PointStore(source, cached["data"], cached["vectors"])
+
+    data = json.loads(raw.decode("utf-8"))
+    vectors = compile_coordinates(data)
+
+    if use_cache:
+        _write_cache(cache_path, {
+            "version": CACHE_FORMAT_VERSION,
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "sha256": digest,
+            "data": data,
+            "vectors": vectors,
+        })
+    return PointStore(source, data, vectors)
@@ -0,0 +1,160 @@
+"""
+Отслеживание зон расстояния с гистерезисом и минимальным временем пребывания.
+
+Сырые показания DistanceSensor у границы зоны «дрожат», и сравнение с порогами
+на каждом чтении гоняет манипулятор между позами. DistanceZoneTracker:
+
+    - не покидает текущую зону, пока значение не выйдет за её границы больше чем на hysteresis;
+    - подтверждает новую зону, только если значение пробыло в ней не меньше min_dwell секунд;
+    - выдаёт только события смены зоны (ZoneChange).
+
+    tracker = DistanceZoneTracker(zones, hysteresis=5.0, min_dwell=0.15)
+    tracker.attach(stream)                       # ConveyorSensorStream
+    change = tracker.next_change(timeout=1.0)    # в основном потоке: команды манипулятору
+                                                 # нельзя ждать в потоке MQTT
+"""
+
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Sequence
+
+from conveyor_stream import SensorFrame
+
+
+@dataclass(frozen=True)
+class DistanceZone:
+    """Зона [lower, upper); None — граница не ограничена"""
+    name: str
+    lower: Optional[float] = None
+    upper: Optional[float] = None
+
+    def contains(self, value: float, margin: float = 0.0) -> bool:
+        return (self.lower is None or value >= self.lower - margin) and \
+               (self.upper is None or value < self.upper + margin)
+
+
+@dataclass(frozen=True)
+class ZoneChange:
+    """Событие смены зоны"""
+    previous: Optional[DistanceZone]
+    zone: DistanceZone
+    value: float
+    timestamp: float
+
+
+class DistanceZoneTracker:
+    """Зона по потоку показаний датчика расстояния; события — только при смене зоны"""
+
+    def __init__(self, zones: Sequence[DistanceZone], hysteresis: float = 0.0, min_dwell: float = 0.0,
+                 on_change: Optional[Callable[[ZoneChange], None]] = None, queue_changes: bool = True):
+        """
+        :param on_change: Колбэк смены зоны (в потоке, который передал показание)
+        :param queue_changes: Копить события для next_change(); выключить, если хватает on_change
+        """
+        if not zones:
+            raise ValueError("Нужна хотя бы одна зона")
+        if hysteresis < 0 or min_dwell < 0:
+            raise ValueError("hysteresis и min_dwell не могут быть отрицательными")
+        self.zones = list(zones)
+        self.hysteresis = hysteresis
+        self.min_dwell = min_dwell
+        self.on_change = on_change
+        self.queue_changes = queue_changes
+
+        self.zone: Optional[DistanceZone] = None
+        self._candidate: Optional[DistanceZone] = None
+        self._candidate_since = 0.0
+        self._lock = threading.Lock()
+        self._changes: "queue.Queue[ZoneChange]" = queue.Queue()
+        self._unsubscribe: Optional[Callable[[], None]] = None
+
+        self.samples = 0
+        self.changes = 0
+        self.suppressed = 0     # кандидаты, не продержавшиеся min_dwell
+
+    def classify(self, value: float) -> Optional[DistanceZone]:
+        """Зона по значению без учёта гистерезиса (первая подходящая)"""
+        for zone in self.zones:
+            if zone.contains(value):
+                return zone
+        return None
+
+    def update(self, value: Optional[float], timestamp: float) -> Optional[ZoneChange]:
+        """Учесть показание; возвращает ZoneChange, если зона сменилась"""
+        if value is None:
+            return None
+        with self._lock:
+            self.samples += 1
+            if self.zone is not None and self.zone.contains(value, self.hysteresis):
+                # Внутри текущей зоны с учётом полосы гистерезиса
+                if self._candidate is not None:
+                    self.suppressed += 1
+                    self._candidate = None
+                return None
+
+            raw = self.classify(value)
+            if raw is None or raw is self.zone:
+                return None
+            if raw is not self._candidate:
+                if self._candidate is not None:
+                    self.suppressed += 1
+                self._candidate = raw
+                self._candidate_since = timestamp
+            if timestamp - self._candidate_since < self.min_dwell:
+                return None
+
+            change = ZoneChange(previous=self.zone, zone=raw, value=value, timestamp=timestamp)
+            self.zone = raw
+            self._candidate = None
+            self.changes += 1
+
+        if self.queue_changes:
+            self._changes.put(change)
+        if self.on_change is not None:
+            try:
+                self.on_change(change)
+            except Exception as e:
+                print(f"[ZONES] Ошибка в обработчике смены зоны: {e}")
+        return change
+
+    # --- Поток датчиков ---
+
+    def attach(self, stream: Any) -> None:
+        """Получать показания из ConveyorSensorStream"""
+        self.detach()
+        self._unsubscribe = stream.subscribe(self._on_frame)
+
+    def detach(self) -> None:
+        if self._unsubscribe is not None:
+            self._unsubscribe()
+            self._unsubscribe = None
+
+    def _on_frame(self, frame: SensorFrame) -> None:
+        self.update(frame.distance, frame.timestamp)
+
+    def next_change(self, timeout: Optional[float] = None, latest_only: bool = True) -> Optional[ZoneChange]:
+        """
+        Дождаться смены зоны. При latest_only накопившиеся события схлопываются
+        в последнее: если манипулятор был занят, ехать нужно в актуальную зону.
+        """
+        try:
+            change = self._changes.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if latest_only:
+            while True:
+                try:
+                    change = self._changes.get_nowait()
+                except queue.Empty:
+                    break
+        return change
+
+    def pending(self) -> List[ZoneChange]:
+        """Забрать все накопившиеся события без ожидания"""
+        changes = []
+        while True:
+            try:
+                changes.append(self._changes.get_nowait())
+            except queue.Empty:
+                return changes
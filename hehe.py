@@ -1,58 +1,81 @@
+from __future__ import annotations
+
 from abc import abstractmethod
 import asyncio
 import json
-from typing import Optional, List, Dict, Any, Union, Set, Callable
-
-from sdk.commands.data import Joint, Point, Pose, Point3D
-from sdk.commands.move_group import MoveGroup, MoveType
-from sdk.commands.abstracts.sdk_command import SdkCommand
-from sdk.commands.get_manage_command import GetManageCommand
-from sdk.commands.play_audio_command import PlayAudioCommand
-from sdk.commands.move_angles_command import MoveAnglesCommand, MoveAnglesCommandParamsAngleInfo
-from sdk.commands.set_conveyor_velocity_command import SetConveyorVelocityCommand
-from sdk.commands.calibration_linear_module_command import CalibrateControllerCommand
-from sdk.commands.move_linear_module_command import MoveLinearModuleCommand
-from sdk.manipulators.extern_devices.pixy_cam.pixy_cam_uart_module import PixyCamUartModule
-from sdk.manipulators.extern_devices.pixy_cam.pixy_cam_usb_module import PixyCamUsbModule
-from sdk.manipulators.extern_devices.mgbot.mgbot_conveyer import MGbotConveyer
-from sdk.commands.pixy_cam_get_coordinates_command import PixyCamGetCoordinatesCommand
+import threading
+from typing import TYPE_CHECKING, Optional, List, Dict, Any, Union, Set, Callable
+
+# Команды и навесные модули SDK импортируются лениво — в методах, которые их создают,
+# и в свойствах pixy_cam_uart_control / pixy_cam_usb_control / mgbot_conveyer / info.
+# Скрипту, который только двигает рукой, не нужно загружать модули камеры, конвейера и т.п.
+# Здесь остаётся то, что нужно при определении класса (PlannerType.LIN в значениях
+# по умолчанию), базовые классы команд, Promise, перечисления и константы топиков.
+from sdk.commands.abstracts.sdk_command import SdkCommand, NoWaitCommand
 from sdk.commands.move_coordinates_command import MoveCoordinatesCommand, MoveCoordinatesParams, \
     MoveCoordinatesParamsPosition, MoveCoordinatesParamsOrientation, PlannerType
-from sdk.commands.manipulator_commands import SetStateCommand, TCPAdd, GetGpio, SetJointLimits, GetJointLimits, \
-    JointLimit, WriteAnalogOutputCommand, WriteDigitalOutputCommand, TCPDelete, TCPApply, TCPGetCurrent, TCPGetList
-from sdk.manipulators.manipulator_info import ManipulatorInfo
-from sdk.commands.arc_motion import ArcMotion, Pose
-from sdk.manipulators.manipulator_connection import ManipulatorConnection
 from sdk.promise import Promise
 from sdk.utils.constants import COMMAND_TOPIC, MANAGEMENT_TOPIC, CARTESIAN_COORDINATES_TOPIC, JOINT_INFO_TOPIC, \
     COMMAND_RESULT_TOPIC, COMMAND_FEEDBACK_TOPIC, PIXY_CAM_COORDINATES_TOPIC, MGBOT_TOPIC
-from sdk.commands import (
-    RunProgramJsonCommand,
-    RunProgramByNameCommand,
-    RunPythonProgramCommand,
-    StopMovementCommand,
-    SetZeroZCommand,
-    WriteI2C,
-    WriteGPIO
-)
-from sdk.commands.servo_control_type_command import ServoControlTypeCommand, JOINT_JOG, TWIST, POSE
 from sdk.utils.enums import ManipulatorState, ServoControlType
-from sdk.commands.abstracts.sdk_command import NoWaitCommand
+
+if TYPE_CHECKING:
+    from sdk.commands.data import Joint, Point, Point3D
+    from sdk.commands.move_group import MoveGroup, MoveType
+    from sdk.commands.get_manage_command import GetManageCommand
+    from sdk.commands.play_audio_command import PlayAudioCommand
+    from sdk.commands.move_angles_command import MoveAnglesCommand, MoveAnglesCommandParamsAngleInfo
+    from sdk.commands.set_conveyor_velocity_command import SetConveyorVelocityCommand
+    from sdk.commands.calibration_linear_module_command import CalibrateControllerCommand
+    from sdk.commands.move_linear_module_command import MoveLinearModuleCommand
+    from sdk.manipulators.extern_devices.pixy_cam.pixy_cam_uart_module import PixyCamUartModule
+    from sdk.manipulators.extern_devices.pixy_cam.pixy_cam_usb_module import PixyCamUsbModule
+    from sdk.manipulators.extern_devices.mgbot.mgbot_conveyer import MGbotConveyer
+    from sdk.commands.pixy_cam_get_coordinates_command import PixyCamGetCoordinatesCommand
+    from sdk.commands.manipulator_commands import SetStateCommand, TCPAdd, GetGpio, SetJointLimits, \
+        GetJointLimits, JointLimit, WriteAnalogOutputCommand, WriteDigitalOutputCommand, TCPDelete, TCPApply, \
+        TCPGetCurrent, TCPGetList
+    from sdk.manipulators.manipulator_info import ManipulatorInfo
+    from sdk.commands.arc_motion import ArcMotion, Pose
+    from sdk.manipulators.manipulator_connection import ManipulatorConnection
+    from sdk.commands import (
+        RunProgramJsonCommand,
+        RunProgramByNameCommand,
+        RunPythonProgramCommand,
+        StopMovementCommand,
+        SetZeroZCommand,
+        WriteI2C,
+        WriteGPIO
+    )
+    from sdk.commands.servo_control_type_command import ServoControlTypeCommand, JOINT_JOG, TWIST, POSE
 
 
 class Manipulator:
     message_bus: ManipulatorConnection
 
-    def __init__(self, host: str, client_id: str, login: str, password: str):
+    def __init__(self, host: str, client_id: str, login: str, password: str,
+                 connection_factory: Optional[Callable[..., ManipulatorConnection]] = None):
+        """
+        :param connection_factory: Класс/фабрика соединения с сигнатурой ManipulatorConnection
+                                   (host, client_id, login, password, on_message). Позволяет
+                                   подставить офлайн-соединение для воспроизведения записей и тестов.
+                                   По умолчанию — ManipulatorConnection (MQTT).
+        """
+        if connection_factory is None:
+            from sdk.manipulators.manipulator_connection import ManipulatorConnection as connection_factory
+
         self.host = host
         self.client_id = client_id
         self.login = login
         self.password = password
-        self.message_bus = ManipulatorConnection(host, client_id, login, password, self.process_message)
+        self.message_bus = connection_factory(host, client_id, login, password, self.process_message)
         self.message_bus._manipulator_ref = self
-        self.pixy_cam_uart_control = PixyCamUartModule(self.message_bus, self._run_async, self)
-        self.pixy_cam_usb_control = PixyCamUsbModule(self.message_bus, self._run_async, self)
-        self.mgbot_conveyer = MGbotConveyer(self.message_bus, self._run_async, self)
+        # Навесные модули создаются при первом обращении (свойства ниже)
+        self._pixy_cam_uart_control: Optional[PixyCamUartModule] = None
+        self._pixy_cam_usb_control: Optional[PixyCamUsbModule] = None
+        self._mgbot_conveyer: Optional[MGbotConveyer] = None
+        self._info: Optional[ManipulatorInfo] = None
+        self._lazy_lock = threading.Lock()
 
         self.last_cartesian_coordinates: Optional[str] = None
         self.last_pixy_coordinates: Optional[str] = None
@@ -74,14 +97,66 @@ class Manipulator:
         self.last_pixy_coordinates: Optional[str] = None
         self.last_joint_state: str | None = None
 
-        self.info = ManipulatorInfo(self.message_bus)
-        self.info._manipulator_ref = self
-
         self._user_message_handler = None
         self._topic_handlers: Dict[str, Callable[[Dict[str, Any]], None]] = {}
+        self._topic_listeners: Dict[str, List[Callable[[Dict[str, Any]], None]]] = {}
+        self._run_feedback_handlers: List[Callable[[dict], None]] = []
+        self._state_histories: Dict[str, Any] = {}
+        self._conveyor_stream = None
+        self._audio_player = None
 
         self._attachments: List[Any] = []
 
+    # --- Навесные модули SDK (создаются при первом обращении) ---
+
+    def _lazy_attribute(self, name: str, factory: Callable[[], Any]) -> Any:
+        """
+        Значение self.<name>, созданное factory() при первом обращении.
+        Под блокировкой: к mgbot_conveyer первым может обратиться поток MQTT (process_message).
+        """
+        value = getattr(self, name)
+        if value is None:
+            with self._lazy_lock:
+                value = getattr(self, name)
+                if value is None:
+                    value = factory()
+                    setattr(self, name, value)
+        return value
+
+    @property
+    def pixy_cam_uart_control(self) -> PixyCamUartModule:
+        def create():
+            from sdk.manipulators.extern_devices.pixy_cam.pixy_cam_uart_module import PixyCamUartModule
+            return PixyCamUartModule(self.message_bus, self._run_async, self)
+
+        return self._lazy_attribute("_pixy_cam_uart_control", create)
+
+    @property
+    def pixy_cam_usb_control(self) -> PixyCamUsbModule:
+        def create():
+            from sdk.manipulators.extern_devices.pixy_cam.pixy_cam_usb_module import PixyCamUsbModule
+            return PixyCamUsbModule(self.message_bus, self._run_async, self)
+
+        return self._lazy_attribute("_pixy_cam_usb_control", create)
+
+    @property
+    def mgbot_conveyer(self) -> MGbotConveyer:
+        def create():
+            from sdk.manipulators.extern_devices.mgbot.mgbot_conveyer import MGbotConveyer
+            return MGbotConveyer(self.message_bus, self._run_async, self)
+
+        return self._lazy_attribute("_mgbot_conveyer", create)
+
+    @property
+    def info(self) -> ManipulatorInfo:
+        def create():
+            from sdk.manipulators.manipulator_info import ManipulatorInfo
+            info = ManipulatorInfo(self.message_bus)
+            info._manipulator_ref = self
+            return info
+
+        return self._lazy_attribute("_info", create)
+
     def register_attachment(self, attachment: Any) -> None:
         """
         Зарегистрировать насадку в манипуляторе
@@ -132,10 +207,33 @@ class Manipulator:
 
         print(f"[Feedback] {node}: {prev} → {curr}")
 
+        for handler in list(self._run_feedback_handlers):
+            try:
+                handler(feedback)
+            except Exception as e:
+                print(f"Ошибка в обработчике feedback: {e}")
+
         if curr == 'FAILURE':
             if self.promise and self.promise.is_active:
                 self.promise.reject(Exception(f"{node} → FAILURE"))
 
+    def add_run_feedback_handler(self, handler: Callable[[dict], None]) -> None:
+        """
+        Подписаться на промежуточные статусы узлов программ (через _on_run_feedback)
+        :param handler: Функция, получающая словарь feedback
+        """
+        if not callable(handler):
+            raise TypeError("Обработчик должен быть функцией или методом")
+        self._run_feedback_handlers.append(handler)
+
+    def remove_run_feedback_handler(self, handler: Callable[[dict], None]) -> None:
+        """
+        Отписаться от промежуточных статусов узлов программ
+        :param handler: Ранее добавленный обработчик
+        """
+        if handler in self._run_feedback_handlers:
+            self._run_feedback_handlers.remove(handler)
+
     def connect(self) -> None:
         self.message_bus.connect()
 
@@ -192,9 +290,12 @@ class Manipulator:
             except Exception as e:
                 print(f"[MANIPULATOR] Ошибка обработки ответа: {e}")
 
-        if not is_streaming_topic:
-            print(f"[MANIPULATOR] Передаем в info.process_message...")
-        self.info.process_message(topic, payload)
+        # Пока к info никто не обращался, сообщения ему не передаются:
+        # его данные накапливаются с момента первого обращения к свойству
+        if self._info is not None:
+            if not is_streaming_topic:
+                print(f"[MANIPULATOR] Передаем в info.process_message...")
+            self._info.process_message(topic, payload)
 
         # Для потоковых топиков проверяем только активные команды
         if is_streaming_topic:
@@ -272,17 +373,31 @@ class Manipulator:
             except Exception as e:
                 print(f"Ошибка в пользовательском обработчике сообщений: {e}")
 
-        # Вызываем обработчик для конкретного топика, если он есть
-        if topic in self._topic_handlers:
-            print(f"[MANIPULATOR] Вызываем обработчик для топика {topic}...")
+        # Вызываем обработчик и слушателей конкретного топика, если они есть.
+        # JSON разбирается один раз на всех.
+        handler = self._topic_handlers.get(topic)
+        listeners = self._topic_listeners.get(topic)
+        if handler is not None or listeners:
+            import json as json_module
             try:
-                import json as json_module
                 data = json_module.loads(payload)
-                self._topic_handlers[topic](data)
             except json_module.JSONDecodeError:
                 print(f"Ошибка декодирования JSON из топика {topic}: {payload}")
-            except Exception as e:
-                print(f"Ошибка в обработчике для топика {topic}: {e}")
+                data = None
+
+            if data is not None and handler is not None:
+                print(f"[MANIPULATOR] Вызываем обработчик для топика {topic}...")
+                try:
+                    handler(data)
+                except Exception as e:
+                    print(f"Ошибка в обработчике для топика {topic}: {e}")
+
+            if data is not None and listeners:
+                for listener in tuple(listeners):
+                    try:
+                        listener(data)
+                    except Exception as e:
+                        print(f"Ошибка в слушателе топика {topic}: {e}")
 
         if not is_streaming_topic:
             print(f"[MANIPULATOR] process_message завершен")
@@ -299,6 +414,7 @@ class Manipulator:
 
     # Асинхронные методы для существующих команд
     def get_control_async(self, timeout_seconds: float = 60.0, throw_error: bool = True) -> GetManageCommand:
+        from sdk.commands.get_manage_command import GetManageCommand
         self.manage_command = GetManageCommand(
             self.message_bus.publish,
             self.client_id,
@@ -390,6 +506,7 @@ class Manipulator:
                                           enable_feedback: bool = False,
                                           velocity_factor: float = 0.1,
                                           acceleration_factor: float = 0.1) -> MoveAnglesCommand:
+        from sdk.commands.move_angles_command import MoveAnglesCommand
         self.move_angles_command = MoveAnglesCommand(self.message_bus.publish,
                                                      angles,
                                                      timeout_seconds,
@@ -466,6 +583,7 @@ class Manipulator:
 
     def set_state_async(self, state_id: int, timeout_seconds: float = 6.0, throw_error: bool = True) -> SetStateCommand:
         """Асинхронно устанавливает состояние манипулятора по docs_api."""
+        from sdk.commands.manipulator_commands import SetStateCommand
         self.specific_command = SetStateCommand(
             state_id,
             self.message_bus.publish,
@@ -502,6 +620,7 @@ class Manipulator:
 
     def run_program_json_async(self, name: str, program_json: dict, timeout_seconds: float = 60.0,
                                throw_error: bool = True, enable_feedback: bool = False) -> RunProgramJsonCommand:
+        from sdk.commands import RunProgramJsonCommand
         self.specific_command = RunProgramJsonCommand(
             name,
             program_json,
@@ -519,12 +638,13 @@ class Manipulator:
         return self.specific_command
 
     async def run_program_json_async_await(self, name: str, program_json: dict, timeout_seconds: float = 60.0,
-                                           throw_error: bool = True) -> None:
-        await self._run_async(self.run_program_json, name, program_json, timeout_seconds, throw_error)
+                                           throw_error: bool = True, enable_feedback: bool = False) -> None:
+        await self._run_async(self.run_program_json, name, program_json, timeout_seconds, throw_error,
+                              enable_feedback)
 
     def run_program_json(self, name: str, program_json: dict, timeout_seconds: float = 60.0,
-                         throw_error: bool = True) -> None:
-        command = self.run_program_json_async(name, program_json, timeout_seconds, throw_error)
+                         throw_error: bool = True, enable_feedback: bool = False) -> None:
+        command = self.run_program_json_async(name, program_json, timeout_seconds, throw_error, enable_feedback)
         command.make_command_action()  # Отправляем команду
         try:
             command.result()
@@ -533,6 +653,7 @@ class Manipulator:
 
     def run_program_by_name_async(self, program_name: str, timeout_seconds: float = 60.0, throw_error: bool = True,
                                   enable_feedback: bool = False) -> RunProgramByNameCommand:
+        from sdk.commands import RunProgramByNameCommand
         self.specific_command = RunProgramByNameCommand(
             program_name,
             self.message_bus.publish,
@@ -548,11 +669,12 @@ class Manipulator:
         return self.specific_command
 
     async def run_program_by_name_async_await(self, program_name: str, timeout_seconds: float = 60.0,
-                                              throw_error: bool = True) -> None:
-        await self._run_async(self.run_program_by_name, program_name, timeout_seconds, throw_error)
+                                              throw_error: bool = True, enable_feedback: bool = False) -> None:
+        await self._run_async(self.run_program_by_name, program_name, timeout_seconds, throw_error, enable_feedback)
 
-    def run_program_by_name(self, program_name: str, timeout_seconds: float = 60.0, throw_error: bool = True) -> None:
-        command = self.run_program_by_name_async(program_name, timeout_seconds, throw_error)
+    def run_program_by_name(self, program_name: str, timeout_seconds: float = 60.0, throw_error: bool = True,
+                            enable_feedback: bool = False) -> None:
+        command = self.run_program_by_name_async(program_name, timeout_seconds, throw_error, enable_feedback)
         command.make_command_action()  # Отправляем команду
         try:
             command.result()
@@ -567,6 +689,7 @@ class Manipulator:
                                  timeout_seconds: float = 60.0,
                                  throw_error: bool = True,
                                  enable_feedback: bool = False) -> RunPythonProgramCommand:
+        from sdk.commands import RunPythonProgramCommand
         self.specific_command = RunPythonProgramCommand(
             python_code,
             self.message_bus.publish,
@@ -614,6 +737,7 @@ class Manipulator:
         self.specific_command = None
 
     def stop_movement_async(self, timeout_seconds: float = 60.0, throw_error: bool = True) -> StopMovementCommand:
+        from sdk.commands import StopMovementCommand
         self.specific_command = StopMovementCommand(
             self.message_bus.publish,
             timeout_seconds,
@@ -634,6 +758,7 @@ class Manipulator:
         self.specific_command = None
 
     def set_zero_z_async(self, timeout_seconds: float = 60.0, throw_error: bool = True) -> SetZeroZCommand:
+        from sdk.commands import SetZeroZCommand
         self.specific_command = SetZeroZCommand(
             self.message_bus.publish,
             timeout_seconds,
@@ -655,6 +780,7 @@ class Manipulator:
 
     def tcp_add_async(self, name: str, position: Point3D, apply: bool, timeout_seconds: float = 60.0,
                       throw_error: bool = True) -> TCPAdd:
+        from sdk.commands.manipulator_commands import TCPAdd
         self.specific_command = TCPAdd(
             name,
             position,
@@ -680,6 +806,7 @@ class Manipulator:
 
     def write_analog_output_async(self, channel: int, value: float, timeout_seconds: float = 60.0,
                                   throw_error: bool = True) -> WriteAnalogOutputCommand:
+        from sdk.commands.manipulator_commands import WriteAnalogOutputCommand
         self.specific_command = WriteAnalogOutputCommand(
             channel,
             value,
@@ -705,6 +832,7 @@ class Manipulator:
 
     def write_gpio_async(self, name: str, value: int, timeout_seconds: float = 60.0,
                          throw_error: bool = True) -> WriteGPIO:
+        from sdk.commands import WriteGPIO
         self.specific_command = WriteGPIO(name, value, self.message_bus.publish, timeout_seconds, throw_error)
         self.message_bus.subscribe(COMMAND_TOPIC)
         self.message_bus.subscribe(COMMAND_RESULT_TOPIC)
@@ -722,6 +850,7 @@ class Manipulator:
 
     def tcp_delete_async(self, name: str, reset_current: bool = True, apply_other: str = "",
                          timeout_seconds: float = 60.0, throw_error: bool = True) -> TCPDelete:
+        from sdk.commands.manipulator_commands import TCPDelete
         self.specific_command = TCPDelete(
             name,
             self.message_bus.publish,
@@ -745,6 +874,7 @@ class Manipulator:
         self.specific_command = None
 
     def tcp_apply_async(self, name: str, timeout_seconds: float = 60.0, throw_error: bool = True) -> TCPApply:
+        from sdk.commands.manipulator_commands import TCPApply
         self.specific_command = TCPApply(name, self.message_bus.publish, timeout_seconds, throw_error)
         self.message_bus.subscribe(COMMAND_TOPIC)
         self.message_bus.subscribe(COMMAND_RESULT_TOPIC)
@@ -760,6 +890,7 @@ class Manipulator:
         self.specific_command = None
 
     def tcp_get_current_async(self, timeout_seconds: float = 60.0, throw_error: bool = True) -> TCPGetCurrent:
+        from sdk.commands.manipulator_commands import TCPGetCurrent
         self.specific_command = TCPGetCurrent(self.message_bus.publish, timeout_seconds, throw_error)
         self.message_bus.subscribe(COMMAND_TOPIC)
         self.message_bus.subscribe(COMMAND_RESULT_TOPIC)
@@ -771,6 +902,7 @@ class Manipulator:
         return command.result()
 
     def tcp_get_list_async(self, timeout_seconds: float = 60.0, throw_error: bool = True) -> TCPGetList:
+        from sdk.commands.manipulator_commands import TCPGetList
         self.specific_command = TCPGetList(self.message_bus.publish, timeout_seconds, throw_error)
         self.message_bus.subscribe(COMMAND_TOPIC)
         self.message_bus.subscribe(COMMAND_RESULT_TOPIC)
@@ -783,6 +915,7 @@ class Manipulator:
 
     def write_i2c_async(self, name: str, value: int, timeout_seconds: float = 60.0,
                         throw_error: bool = True) -> WriteI2C:
+        from sdk.commands import WriteI2C
         self.specific_command = WriteI2C(name, value, self.message_bus.publish, timeout_seconds, throw_error)
         self.message_bus.subscribe(COMMAND_TOPIC)
         self.message_bus.subscribe(COMMAND_RESULT_TOPIC)
@@ -800,6 +933,7 @@ class Manipulator:
 
     def write_digital_output_async(self, channel: int, value: bool, timeout_seconds: float = 60.0,
                                    throw_error: bool = True) -> WriteDigitalOutputCommand:
+        from sdk.commands.manipulator_commands import WriteDigitalOutputCommand
         self.specific_command = WriteDigitalOutputCommand(
             channel,
             value,
@@ -825,6 +959,7 @@ class Manipulator:
 
     def set_joint_limits_async(self, limits: list[JointLimit], timeout_seconds: float = 60.0,
                                throw_error: bool = True) -> SetJointLimits:
+        from sdk.commands.manipulator_commands import SetJointLimits
         self.specific_command = SetJointLimits(limits, self.message_bus.publish, timeout_seconds, throw_error)
         self.message_bus.subscribe(COMMAND_TOPIC)
         self.message_bus.subscribe(COMMAND_RESULT_TOPIC)
@@ -842,6 +977,7 @@ class Manipulator:
         self.specific_command = None
 
     def get_joint_limits_async(self, timeout_seconds: float = 60.0, throw_error: bool = True) -> GetJointLimits:
+        from sdk.commands.manipulator_commands import GetJointLimits
         self.specific_command = GetJointLimits(self.message_bus.publish, timeout_seconds, throw_error)
         self.message_bus.subscribe(COMMAND_TOPIC)
         self.message_bus.subscribe(COMMAND_RESULT_TOPIC)
@@ -858,6 +994,7 @@ class Manipulator:
 
     def move_group_async(self, move_type: MoveType, points: list[Union[Point, Pose]], timeout_seconds: float = 60.0,
                          throw_error: bool = True) -> SdkCommand:
+        from sdk.commands.move_group import MoveGroup, MoveType
         self.specific_command = MoveGroup(move_type, points)
         for point in self.specific_command.points:
             if isinstance(move_type, MoveType.JOINT):
@@ -901,6 +1038,7 @@ class Manipulator:
                          timeout_seconds: float = 60.0,
                          throw_error: bool = True,
                          enable_feedback: bool = False) -> ArcMotion:
+        from sdk.commands.arc_motion import ArcMotion
         self.specific_command = ArcMotion(target=target,
                                           center_arc=center_arc,
                                           step=step,
@@ -1103,6 +1241,7 @@ class Manipulator:
         :param throw_error: Выбрасывать ли исключение при ошибке.
         :return: Promise, который будет разрешен с результатом команды.
         """
+        from sdk.commands.servo_control_type_command import ServoControlTypeCommand
         self.specific_command = ServoControlTypeCommand(
             send_command=self.message_bus.publish,
             control_type_id=control_type.value,
@@ -1165,6 +1304,7 @@ class Manipulator:
         :param timeout_seconds: Таймаут ожидания ответа.
         :param throw_error: Выбрасывать ли исключение при ошибке.
         """
+        from sdk.commands.servo_control_type_command import ServoControlTypeCommand
         self.specific_command = ServoControlTypeCommand(
             self.message_bus.publish,
             ServoControlType.TWIST.value if enabled else ServoControlType.JOINT_JOG.value,
@@ -1393,6 +1533,7 @@ class Manipulator:
 
     def play_audio_async(self, file_name: str, timeout_seconds: float = 60.0,
                          throw_error: bool = True) -> PlayAudioCommand:
+        from sdk.commands.play_audio_command import PlayAudioCommand
         self.specific_command = PlayAudioCommand(self.message_bus.publish, file_name, timeout_seconds, throw_error)
         self.message_bus.subscribe(COMMAND_TOPIC)
         self.message_bus.subscribe(COMMAND_RESULT_TOPIC)
@@ -1483,6 +1624,92 @@ class Manipulator:
         self.message_bus.subscribe(topic)
         self._topic_handlers[topic] = handler
 
+    def add_topic_listener(self, topic: str, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """
+        Добавить слушателя топика. В отличие от _set_topic_handler, слушателей может быть
+        несколько, и они не заменяют пользовательский обработчик топика.
+        :param topic: Топик (например, "/coordinates")
+        :param listener: Функция, принимающая разобранный JSON сообщения
+        """
+        if not callable(listener):
+            raise TypeError("Слушатель должен быть функцией или методом")
+        self.message_bus.subscribe(topic)
+        self._topic_listeners.setdefault(topic, []).append(listener)
+
+    def remove_topic_listener(self, topic: str, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """
+        Удалить слушателя топика. Если у топика не осталось ни слушателей, ни обработчика,
+        отписывается от него на уровне MQTT.
+        """
+        listeners = self._topic_listeners.get(topic)
+        if not listeners or listener not in listeners:
+            return
+        listeners.remove(listener)
+        if not listeners:
+            del self._topic_listeners[topic]
+            if topic not in self._topic_handlers:
+                try:
+                    self.message_bus.unsubscribe(topic)
+                except Exception as e:
+                    print(f"[MANIPULATOR] Ошибка при отписке от топика {topic}: {e}")
+
+    # --- История состояния ---
+
+    def enable_state_history(self, topics: Optional[List[str]] = None, capacity: int = 2048) -> None:
+        """
+        Начать накапливать историю топиков в кольцевых буферах (state_history.RingBuffer).
+        :param topics: Топики; по умолчанию /joint_states и /coordinates
+        :param capacity: Число последних отсчётов, хранимых по каждому топику
+        """
+        from state_history import EXTRACTORS, TopicHistory
+
+        for topic in topics or list(EXTRACTORS):
+            if topic in self._state_histories:
+                continue
+            history = TopicHistory(topic, capacity)
+            self._state_histories[topic] = history
+            self.add_topic_listener(topic, history)
+
+    def disable_state_history(self) -> None:
+        for topic, history in list(self._state_histories.items()):
+            self.remove_topic_listener(topic, history)
+        self._state_histories.clear()
+
+    def state_history(self, topic: str = "/joint_states"):
+        """
+        Кольцевой буфер истории топика (RingBuffer) или None, если отсчётов ещё не было.
+        Окна: .last(n), .last_seconds(t); производные: window.velocity(), window.peak_speed()
+        """
+        history = self._state_histories.get(topic)
+        if history is None:
+            raise KeyError(f"История топика {topic} не включена (enable_state_history)")
+        return history.buffer
+
+    @property
+    def conveyor_stream(self):
+        """
+        Поток кадров датчиков конвейера (conveyor_stream.ConveyorSensorStream).
+        Создаётся и подписывается на MGBOT_TOPIC при первом обращении.
+        """
+        if self._conveyor_stream is None:
+            from conveyor_stream import ConveyorSensorStream
+
+            self._conveyor_stream = ConveyorSensorStream(self)
+            self._conveyor_stream.start()
+        return self._conveyor_stream
+
+    @property
+    def audio_player(self):
+        """
+        Неблокирующая очередь воспроизведения звука (audio_queue.AudioPlayer).
+        Создаётся при первом обращении; поток воспроизведения — при первом клипе.
+        """
+        if self._audio_player is None:
+            from audio_queue import AudioPlayer
+
+            self._audio_player = AudioPlayer(self)
+        return self._audio_player
+
     def set_coordinates_handler(self, handler: Callable[[Dict[str, Any]], None]) -> None:
         self._set_topic_handler("/coordinates", handler)
 
@@ -1606,7 +1833,8 @@ class Manipulator:
             # Отписываемся на уровне MQTT
             self.message_bus.unsubscribe(topic)
 
-            # Удаляем обработчик из словаря
+            # Удаляем обработчик и слушателей топика
+            self._topic_listeners.pop(topic, None)
             if topic in self._topic_handlers:
                 del self._topic_handlers[topic]
                 print(f"[MANIPULATOR] Отписались от топика {topic}")
@@ -1637,7 +1865,7 @@ class Manipulator:
         self._user_message_handler = None
 
         # Очищаем обработчики топиков
-        for topic in list(self._topic_handlers.keys()):
+        for topic in list(self._topic_handlers.keys() | self._topic_listeners.keys()):
             self.unsubscribe_from_topic(topic)
 
         print("[MANIPULATOR] Все обработчики событий очищены")
@@ -1650,6 +1878,7 @@ class Manipulator:
 
     def set_conveyer_velocity_async(self, velocity: float, timeout_seconds: float = 60.0,
                                     throw_error: bool = True) -> SetConveyorVelocityCommand:
+        from sdk.commands.set_conveyor_velocity_command import SetConveyorVelocityCommand
         self.specific_command = SetConveyorVelocityCommand(
             self.message_bus.publish,
             velocity,
@@ -1666,6 +1895,7 @@ class Manipulator:
 
     def calibrate_controller_async(self, timeout_seconds: float = 60.0,
                                    throw_error: bool = True) -> CalibrateControllerCommand:
+        from sdk.commands.calibration_linear_module_command import CalibrateControllerCommand
         self.specific_command = CalibrateControllerCommand(
             self.message_bus.publish,
             timeout_seconds,
@@ -1686,6 +1916,7 @@ class Manipulator:
 
     def move_linear_module_async(self, distance: float, timeout_seconds: float = 60.0,
                                  throw_error: bool = True) -> MoveLinearModuleCommand:
+        from sdk.commands.move_linear_module_command import MoveLinearModuleCommand
         self.specific_command = MoveLinearModuleCommand(
             self.message_bus.publish,
             distance,
@@ -1708,6 +1939,7 @@ class Manipulator:
 
     def get_block_coordinates_from_pixy_async(self, signature: int, timeout_seconds: float = 60.0,
                                               throw_error: bool = True) -> PixyCamGetCoordinatesCommand:
+        from sdk.commands.pixy_cam_get_coordinates_command import PixyCamGetCoordinatesCommand
         self.specific_command = PixyCamGetCoordinatesCommand(
             self.message_bus.publish,
             signature,
@@ -1741,6 +1973,7 @@ class Manipulator:
         return self.pixy_coordinates_promise
 
     def get_gpio_value(self, name: str, timeout_seconds: float = 60.0, throw_error: bool = True) -> Optional[float]:
+        from sdk.commands.manipulator_commands import GetGpio
         self.specific_command = GetGpio(self.message_bus.publish, name, timeout_seconds, throw_error)
         self.message_bus.subscribe(COMMAND_TOPIC)
         self.message_bus.subscribe(COMMAND_RESULT_TOPIC)
@@ -21,6 +21,8 @@ from typing import Any, Dict, Optional
 
 from sdk.manipulators.medu import MEdu
 
+from conveyor_stream import ConveyorSensorStream, SensorFrame
+
 
 # ================== НАСТРОЙКИ ПОДКЛЮЧЕНИЯ ==================
 
@@ -305,6 +307,43 @@ def test_conveyor_sensors(manipulator: MEdu, interactive: bool = True) -> None:
             time.sleep(delay)
 
 
+def test_conveyor_sensor_stream(manipulator: MEdu, interactive: bool = True) -> None:
+    """
+    Тест: поток кадров датчиков конвейера без запроса на каждое чтение.
+
+    Каждый кадр MGBOT_TOPIC приходит в колбэк; в конце печатается
+    число кадров и их частота.
+    """
+    require_conveyor(manipulator)
+
+    print("\n=== ТЕСТ ПОТОКА ДАТЧИКОВ КОНВЕЙЕРА ===")
+    default_duration = 5.0
+    default_poll = 0.05
+    if interactive:
+        duration = ask_float("Сколько секунд слушать датчики?", default_duration)
+        poll_interval = ask_float("Период запроса данных, если конвейер не шлёт их сам (0 — не запрашивать)",
+                                  default_poll)
+    else:
+        duration = default_duration
+        poll_interval = default_poll
+
+    def on_frame(frame: SensorFrame) -> None:
+        color = frame.color if frame.color is not None else "-"
+        print(f"  DistanceSensor={frame.distance}, ColorSensor={color}, Prox={frame.prox}")
+
+    stream = ConveyorSensorStream(manipulator)
+    stream.subscribe(on_frame)
+    stream.start(poll_interval=poll_interval if poll_interval > 0 else None)
+    try:
+        time.sleep(max(0.0, duration))
+    finally:
+        stream.stop()
+
+    print(f"Получено кадров: {stream.frames_total}, частота: {stream.rate(window=duration):.1f} Гц")
+    if stream.latest is not None:
+        _pretty_print_sensors(stream.latest.raw)
+
+
 # ================== ТОЧКА ВХОДА ==================
 
 def main():
@@ -322,6 +361,7 @@ def main():
         # test_conveyor_display_text(manipulator, interactive=True)
         # test_conveyor_buzzer(manipulator, interactive=True)
         # test_conveyor_sensors(manipulator, interactive=True)
+        # test_conveyor_sensor_stream(manipulator, interactive=True)
 
     except Exception as e:
         print(f"\nОШИБКА: {e}")
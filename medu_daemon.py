@@ -0,0 +1,776 @@
+"""
+Локальный демон управления MEdu: одно подключение к манипулятору на все скрипты.
+
+Каждый скрипт (task_2.py, rab.py, line.py, test.py) сам подключается к MQTT,
+захватывает управление и подписывается на топики, а запущенные подряд — отбирают
+управление друг у друга. Демон держит одно подключение (connect + get_control один раз)
+и кэш последних значений топиков; скрипты говорят с ним через Unix-сокет
+строками JSON — подключение занимает миллисекунды, читать телеметрию могут
+сразу несколько клиентов.
+
+    python medu_daemon.py                  # демон с реальным манипулятором (HOST ниже)
+    python medu_daemon.py --sim            # демон поверх medu_sim (без робота)
+    python medu_daemon.py status           # состояние работающего демона
+    python medu_daemon.py --sim stopcheck  # проверка: стоп проходит во время долгого движения
+
+    from medu_daemon import DaemonClient
+    with DaemonClient() as client:
+        client.state("/joint_states")                  # последнее сообщение из кэша, без запроса
+        m = client.manipulator                         # прокси: вызовы уходят в демон
+        m.move_to_angles(0.0, 0.0, 1.0, 0, 0, 0, velocity_factor=0.1, acceleration_factor=0.1)
+        m.mgbot_conveyer.set_led_color(0, 255, 0)
+        client.subscribe(["conveyor"], lambda topic, data, ts: print(data["distance"]))
+
+Протокол — одна строка JSON на сообщение:
+    запрос  {"id": 1, "op": "call", "method": "move_to_angles", "args": [...], "kwargs": {...}}
+    ответ   {"id": 1, "ok": true, "result": ...} / {"id": 1, "ok": false, "error": "...", "type": "..."}
+    событие {"event": "/joint_states", "data": {...}, "ts": ...}   (после op=subscribe)
+
+Вызывать можно только методы из ALLOWED_METHODS; команды выполняются по одной
+(у контроллера один слот команды), чтение кэша их не ждёт. Исключение —
+PRIORITY_METHODS: stop_movement не ждёт, пока другой клиент дождётся конца движения. Клиентская часть
+модуля не импортирует sdk — импорт DaemonClient быстрый.
+"""
+
+import dataclasses
+import enum
+import functools
+import itertools
+import json
+import os
+import queue
+import socket
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Sequence, Set
+
+# ================== НАСТРОЙКИ ==================
+
+HOST = "192.168.0.183"
+CLIENT_ID = "medu-daemon"
+LOGIN = "user"
+PASSWORD = "pass"
+
+SOCKET_PATH = "/tmp/medu_daemon.sock"
+STATE_TOPICS = ("/joint_states", "/coordinates", "/gpio_states")
+CONVEYOR_TOPIC = "conveyor"             # кадры датчиков конвейера (ConveyorSensorStream)
+CONVEYOR_POLL_INTERVAL: Optional[float] = None   # период опроса датчиков, если конвейер сам не шлёт кадры
+
+CALL_TIMEOUT = 120.0            # ожидание ответа на вызов у клиента, с (движения бывают долгими)
+REQUEST_TIMEOUT = 5.0           # ожидание ответа на остальные запросы, с
+STOP_CHECK_TCP_SPEED = 0.02     # stopcheck: скорость TCP симулятора, м/с
+STOP_CHECK_DROP = 0.1           # stopcheck: длина движения вниз, м (~5 с)
+EVENT_QUEUE_SIZE = 256          # событий в очереди клиента (старые вытесняются)
+LATENCY_HISTORY = 256
+
+ALLOWED_METHODS = frozenset({
+    "move_to_angles",
+    "move_to_coordinates",
+    "manage_gripper",
+    "nozzle_power",
+    "stop_movement",
+    "play_audio",
+    "get_joint_state",
+    "get_cartesian_coordinates",
+    "get_gpio_value",
+    "write_gpio",
+    "get_block_coordinates_from_pixy",
+    "set_conveyer_velocity",
+    "tcp_get_current",
+    "mgbot_conveyer.set_speed_motors",
+    "mgbot_conveyer.set_led_color",
+    "mgbot_conveyer.display_text",
+    "mgbot_conveyer.get_sensors_data",
+})
+
+# Команды, которые не ждут текущую: пока слот занят (клиент ждёт конца move_to_*),
+# стоп уходит сразу через stop_movement_no_wait — он не занимает specific_command,
+# поэтому прерванное движение получает свой ответ
+PRIORITY_METHODS = frozenset({"stop_movement"})
+
+
+class DaemonError(RuntimeError):
+    """Ошибка, пришедшая от демона (или обрыв соединения с ним)"""
+
+    def __init__(self, message: str, error_type: str = "DaemonError"):
+        super().__init__(message)
+        self.error_type = error_type
+
+
+def _jsonable(value: Any) -> Any:
+    """Привести значение к виду, который переживёт json.dumps (SDK-объекты — в dict, enum — в имя)"""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, enum.Enum):
+        return value.name
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return {f.name: _jsonable(getattr(value, f.name)) for f in dataclasses.fields(value)}
+    if hasattr(value, "__dict__"):
+        return {k: _jsonable(v) for k, v in vars(value).items() if not k.startswith("_")}
+    return str(value)
+
+
+def _encode(message: Dict[str, Any]) -> bytes:
+    return (json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+# ================== ДЕМОН ==================
+
+class _StateCache:
+    """Последнее сообщение каждого топика"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+
+    def update(self, topic: str, data: Any, timestamp: float) -> None:
+        with self._lock:
+            entry = self._entries.get(topic)
+            count = entry["count"] + 1 if entry is not None else 1
+            self._entries[topic] = {"data": data, "timestamp": timestamp, "count": count}
+
+    def get(self, topic: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(topic)
+        if entry is None:
+            return None
+        return {"data": entry["data"], "age": time.monotonic() - entry["timestamp"], "count": entry["count"]}
+
+    def topics(self) -> List[str]:
+        with self._lock:
+            return list(self._entries)
+
+
+class _ClientConnection:
+    """Подключённый клиент: ответы пишутся сразу, события — через ограниченную очередь"""
+
+    def __init__(self, sock: socket.socket, number: int):
+        self.sock = sock
+        self.number = number
+        self.topics: Set[str] = set()
+        self.dropped = 0
+        self._write_lock = threading.Lock()
+        self._events: "queue.Queue[Optional[bytes]]" = queue.Queue(maxsize=EVENT_QUEUE_SIZE)
+        self._sender: Optional[threading.Thread] = None
+        self.closed = False
+
+    def send(self, message: Dict[str, Any]) -> None:
+        data = _encode(message)
+        with self._write_lock:
+            self.sock.sendall(data)
+
+    def push_event(self, data: bytes) -> None:
+        """Вызывается из потока MQTT: не блокируется, при переполнении вытесняет старое событие"""
+        if self.closed:
+            return
+        try:
+            self._events.put_nowait(data)
+        except queue.Full:
+            try:
+                self._events.get_nowait()
+            except queue.Empty:
+                pass
+            self.dropped += 1
+            self._events.put_nowait(data)
+
+    def start_sender(self) -> None:
+        if self._sender is None:
+            self._sender = threading.Thread(target=self._send_events, name=f"daemon-events-{self.number}",
+                                            daemon=True)
+            self._sender.start()
+
+    def _send_events(self) -> None:
+        while True:
+            data = self._events.get()
+            if data is None or self.closed:
+                return
+            try:
+                with self._write_lock:
+                    self.sock.sendall(data)
+            except OSError:
+                return
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self._events.put_nowait(None)
+        except queue.Full:
+            pass
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class MeduDaemon:
+    """Владеет подключением к манипулятору, кэширует топики и обслуживает клиентов Unix-сокета"""
+
+    def __init__(self, manip: Any, socket_path: str = SOCKET_PATH, topics: Sequence[str] = STATE_TOPICS,
+                 conveyor: bool = True, conveyor_poll_interval: Optional[float] = CONVEYOR_POLL_INTERVAL):
+        self.manip = manip
+        self.socket_path = socket_path
+        self.topics = list(topics)
+        self.conveyor = conveyor
+        self.conveyor_poll_interval = conveyor_poll_interval
+
+        self.cache = _StateCache()
+        self.started_at = time.monotonic()
+        self._listeners: Dict[str, Callable[[Dict[str, Any]], None]] = {}
+        self._stream: Any = None
+        self._unsubscribe_stream: Optional[Callable[[], None]] = None
+        self._server: Optional[socket.socket] = None
+        self._accept_thread: Optional[threading.Thread] = None
+        self._clients: List[_ClientConnection] = []
+        self._clients_lock = threading.Lock()
+        self._client_numbers = itertools.count(1)
+        self._command_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stopped = threading.Event()
+
+        self.calls = 0
+        self.call_errors = 0
+        self._call_latency: Dict[str, Deque[float]] = {}
+
+    # --- Запуск и остановка ---
+
+    def start(self) -> None:
+        from topic_listeners import add_listener
+
+        for topic in self.topics:
+            listener = functools.partial(self._on_state, topic)
+            self._listeners[topic] = listener
+            add_listener(self.manip, topic, listener)
+        if self.conveyor:
+            from conveyor_stream import ConveyorSensorStream
+
+            self._stream = getattr(self.manip, "_conveyor_stream", None) or ConveyorSensorStream(self.manip)
+            self._stream.start(self.conveyor_poll_interval)
+            self._unsubscribe_stream = self._stream.subscribe(self._on_frame)
+
+        self._server = self._bind(self.socket_path)
+        self._accept_thread = threading.Thread(target=self._accept_loop, name="daemon-accept", daemon=True)
+        self._accept_thread.start()
+        print(f"[DAEMON] Слушаю {self.socket_path}; топики: {', '.join(self.topics)}"
+              + (f", {CONVEYOR_TOPIC}" if self.conveyor else ""))
+
+    @staticmethod
+    def _bind(path: str) -> socket.socket:
+        if os.path.exists(path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(path)
+            except OSError:
+                os.unlink(path)         # сокет остался от упавшего демона
+            else:
+                raise RuntimeError(f"Демон уже запущен на {path}")
+            finally:
+                probe.close()
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(path)
+        os.chmod(path, 0o600)
+        server.listen()
+        return server
+
+    def serve_forever(self) -> None:
+        self.start()
+        try:
+            while not self._stopped.wait(1.0):
+                pass
+        except KeyboardInterrupt:
+            print("\n[DAEMON] Остановка по Ctrl+C")
+        finally:
+            self.stop()
+
+    def stop(self) -> None:
+        if self._stopped.is_set() and self._server is None:
+            return
+        self._stopped.set()
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+        with self._clients_lock:
+            clients, self._clients = self._clients, []
+        for client in clients:
+            client.close()
+
+        from topic_listeners import remove_listener
+
+        for topic, listener in self._listeners.items():
+            try:
+                remove_listener(self.manip, topic, listener)
+            except Exception as e:
+                print(f"[DAEMON] Ошибка при отписке от {topic}: {e}")
+        self._listeners.clear()
+        if self._unsubscribe_stream is not None:
+            self._unsubscribe_stream()
+            self._unsubscribe_stream = None
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream = None
+        print("[DAEMON] Остановлен.")
+
+    # --- Телеметрия ---
+
+    def _on_state(self, topic: str, message: Dict[str, Any]) -> None:
+        timestamp = time.monotonic()
+        self.cache.update(topic, message, timestamp)
+        self._fan_out(topic, message, timestamp)
+
+    def _on_frame(self, frame: Any) -> None:
+        data = dataclasses.asdict(frame)
+        self.cache.update(CONVEYOR_TOPIC, data, frame.timestamp)
+        self._fan_out(CONVEYOR_TOPIC, data, frame.timestamp)
+
+    def _fan_out(self, topic: str, data: Any, timestamp: float) -> None:
+        with self._clients_lock:
+            targets = [client for client in self._clients if topic in client.topics]
+        if not targets:
+            return
+        encoded = _encode({"event": topic, "data": data, "ts": timestamp})
+        for client in targets:
+            client.push_event(encoded)
+
+    # --- Клиенты ---
+
+    def _accept_loop(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                sock, _ = self._server.accept()
+            except OSError:
+                return
+            client = _ClientConnection(sock, next(self._client_numbers))
+            with self._clients_lock:
+                self._clients.append(client)
+            threading.Thread(target=self._serve_client, args=(client,), name=f"daemon-client-{client.number}",
+                             daemon=True).start()
+
+    def _serve_client(self, client: _ClientConnection) -> None:
+        try:
+            with client.sock.makefile("r", encoding="utf-8") as lines:
+                for line in lines:
+                    if not line.strip():
+                        continue
+                    try:
+                        request = json.loads(line)
+                    except json.JSONDecodeError as e:
+                        client.send({"id": None, "ok": False, "error": f"Некорректный JSON: {e}",
+                                     "type": "ValueError"})
+                        continue
+                    if request.get("op") == "call":
+                        # Команда может идти минуты: не держим чтение остальных запросов клиента
+                        threading.Thread(target=self._respond, args=(client, request), daemon=True).start()
+                    else:
+                        self._respond(client, request)
+        except (OSError, ValueError):
+            pass
+        finally:
+            with self._clients_lock:
+                if client in self._clients:
+                    self._clients.remove(client)
+            client.close()
+
+    def _respond(self, client: _ClientConnection, request: Dict[str, Any]) -> None:
+        request_id = request.get("id")
+        try:
+            result = self.handle(client, request)
+            response = {"id": request_id, "ok": True, "result": _jsonable(result)}
+        except Exception as e:
+            response = {"id": request_id, "ok": False, "error": str(e), "type": type(e).__name__}
+        try:
+            client.send(response)
+        except OSError:
+            pass
+
+    def handle(self, client: _ClientConnection, request: Dict[str, Any]) -> Any:
+        op = request.get("op")
+        if op == "ping":
+            with self._clients_lock:
+                clients = len(self._clients)
+            return {"pid": os.getpid(), "uptime": time.monotonic() - self.started_at, "clients": clients}
+        if op == "state":
+            return self.cache.get(request["topic"])
+        if op == "states":
+            return {topic: self.cache.get(topic) for topic in self.cache.topics()}
+        if op == "call":
+            return self.call(request["method"], request.get("args") or [], request.get("kwargs") or {})
+        if op == "subscribe":
+            topics = set(request.get("topics") or [])
+            unknown = topics - set(self.topics) - ({CONVEYOR_TOPIC} if self.conveyor else set())
+            if unknown:
+                raise ValueError(f"Демон не слушает топики: {', '.join(sorted(unknown))}")
+            client.topics |= topics
+            client.start_sender()
+            return sorted(client.topics)
+        if op == "unsubscribe":
+            client.topics -= set(request.get("topics") or client.topics)
+            return sorted(client.topics)
+        if op == "stats":
+            return self.stats()
+        raise ValueError(f"Неизвестная операция: {op!r}")
+
+    # --- Команды ---
+
+    def call(self, method: str, args: List[Any], kwargs: Dict[str, Any]) -> Any:
+        if method not in ALLOWED_METHODS:
+            raise PermissionError(f"Метод {method!r} не разрешён (ALLOWED_METHODS)")
+        target: Any = self.manip
+        for part in method.split("."):
+            target = getattr(target, part)
+        args, kwargs = _prepare_arguments(method, args, kwargs)
+
+        if method in PRIORITY_METHODS:
+            if not self._command_lock.acquire(blocking=False):
+                no_wait = getattr(self.manip, f"{method}_no_wait", None)
+                if no_wait is not None:
+                    return self._execute(method, no_wait, [], {})
+                # Без _no_wait стоп займёт слот поверх текущей команды: её ответ потеряется
+                # и она завершится по таймауту, но движение остановится сразу
+                return self._execute(method, target, args, kwargs)
+        else:
+            self._command_lock.acquire()
+        try:
+            return self._execute(method, target, args, kwargs)
+        finally:
+            self._command_lock.release()
+
+    def _execute(self, method: str, target: Callable[..., Any], args: List[Any], kwargs: Dict[str, Any]) -> Any:
+        started = time.monotonic()
+        failed = False
+        try:
+            result = target(*args, **kwargs)
+            # Некоторые команды возвращают promise — ждём завершения, как сделал бы скрипт
+            if hasattr(result, "result") and callable(result.result):
+                result = result.result()
+            return result
+        except Exception:
+            failed = True
+            raise
+        finally:
+            with self._stats_lock:
+                self.calls += 1
+                self.call_errors += failed
+                self._call_latency.setdefault(method, deque(maxlen=LATENCY_HISTORY)).append(
+                    time.monotonic() - started)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._clients_lock:
+            clients = [{"number": c.number, "topics": sorted(c.topics), "dropped_events": c.dropped}
+                       for c in self._clients]
+        latency = {}
+        for method, values in list(self._call_latency.items()):
+            ordered = sorted(values)
+            latency[method] = {"calls": len(ordered), "p50_ms": ordered[len(ordered) // 2] * 1000.0,
+                               "max_ms": ordered[-1] * 1000.0}
+        return {
+            "uptime": time.monotonic() - self.started_at,
+            "clients": clients,
+            "calls": self.calls,
+            "call_errors": self.call_errors,
+            "latency": latency,
+            "cached_topics": self.cache.topics(),
+        }
+
+
+def _prepare_arguments(method: str, args: List[Any], kwargs: Dict[str, Any]):
+    """Восстановить SDK-объекты из JSON: позиция/ориентация — списком или словарём, планировщик — именем"""
+    if method != "move_to_coordinates":
+        return args, kwargs
+    from sdk.commands.move_coordinates_command import (
+        MoveCoordinatesParamsOrientation,
+        MoveCoordinatesParamsPosition,
+        PlannerType,
+    )
+
+    def build(cls, value):
+        if isinstance(value, dict):
+            return cls(**value)
+        if isinstance(value, (list, tuple)):
+            return cls(*value)
+        return value
+
+    args = list(args)
+    for index, name, cls in ((0, "position", MoveCoordinatesParamsPosition),
+                             (1, "orientation", MoveCoordinatesParamsOrientation)):
+        if len(args) > index:
+            args[index] = build(cls, args[index])
+        elif name in kwargs:
+            kwargs[name] = build(cls, kwargs[name])
+    if isinstance(kwargs.get("planner_type"), str):
+        kwargs["planner_type"] = PlannerType[kwargs["planner_type"]]
+    return args, kwargs
+
+
+# ================== КЛИЕНТ ==================
+
+EventCallback = Callable[[str, Any, float], None]
+
+
+class _RemoteProxy:
+    """Объект-заместитель: m.move_to_angles(...) → client.call("move_to_angles", ...)"""
+
+    def __init__(self, client: "DaemonClient", prefix: str = ""):
+        self._client = client
+        self._prefix = prefix
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        path = self._prefix + name
+        if any(method.startswith(path + ".") for method in ALLOWED_METHODS):
+            return _RemoteProxy(self._client, path + ".")
+        return functools.partial(self._client.call, path)
+
+
+class DaemonClient:
+    """Клиент демона: запросы из любых потоков, события подписки — в потоке чтения"""
+
+    def __init__(self, path: str = SOCKET_PATH, timeout: float = REQUEST_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self._sock.connect(path)
+        except OSError as e:
+            self._sock.close()
+            raise DaemonError(f"Демон не отвечает на {path}: {e}") from e
+        self._write_lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, list] = {}
+        self._pending_lock = threading.Lock()
+        self._callbacks: Dict[str, List[EventCallback]] = {}
+        self._closed = False
+        self._reader = threading.Thread(target=self._read_loop, name="daemon-client", daemon=True)
+        self._reader.start()
+
+    # --- Запросы ---
+
+    def request(self, op: str, timeout: Optional[float] = None, **fields: Any) -> Any:
+        if self._closed:
+            raise DaemonError("Соединение с демоном закрыто")
+        request_id = next(self._ids)
+        slot = [threading.Event(), None]
+        with self._pending_lock:
+            self._pending[request_id] = slot
+        try:
+            data = _encode({"id": request_id, "op": op, **_jsonable(fields)})
+            with self._write_lock:
+                self._sock.sendall(data)
+            if not slot[0].wait(self.timeout if timeout is None else timeout):
+                raise TimeoutError(f"Демон не ответил на {op}")
+        finally:
+            with self._pending_lock:
+                self._pending.pop(request_id, None)
+        response = slot[1]
+        if not response.get("ok"):
+            raise DaemonError(response.get("error", "неизвестная ошибка"), response.get("type", "DaemonError"))
+        return response.get("result")
+
+    def ping(self) -> Dict[str, Any]:
+        return self.request("ping")
+
+    def state(self, topic: str) -> Optional[Dict[str, Any]]:
+        """Последнее сообщение топика: {"data", "age", "count"} или None"""
+        return self.request("state", topic=topic)
+
+    def states(self) -> Dict[str, Any]:
+        return self.request("states")
+
+    def stats(self) -> Dict[str, Any]:
+        return self.request("stats")
+
+    def call(self, method: str, *args: Any, **kwargs: Any) -> Any:
+        """Вызвать разрешённый метод манипулятора в демоне (ждёт завершения команды)"""
+        return self.request("call", timeout=CALL_TIMEOUT, method=method, args=list(args), kwargs=kwargs)
+
+    @property
+    def manipulator(self) -> _RemoteProxy:
+        return _RemoteProxy(self)
+
+    # --- События ---
+
+    def subscribe(self, topics: Iterable[str], callback: EventCallback) -> List[str]:
+        """callback(topic, data, timestamp) — в потоке чтения клиента, должен быть быстрым"""
+        topics = list(topics)
+        for topic in topics:
+            self._callbacks.setdefault(topic, []).append(callback)
+        return self.request("subscribe", topics=topics)
+
+    def unsubscribe(self, topics: Iterable[str]) -> List[str]:
+        topics = list(topics)
+        for topic in topics:
+            self._callbacks.pop(topic, None)
+        return self.request("unsubscribe", topics=topics)
+
+    def _read_loop(self) -> None:
+        try:
+            with self._sock.makefile("r", encoding="utf-8") as lines:
+                for line in lines:
+                    message = json.loads(line)
+                    if "event" in message:
+                        for callback in self._callbacks.get(message["event"], ()):
+                            try:
+                                callback(message["event"], message.get("data"), message.get("ts", 0.0))
+                            except Exception as e:
+                                print(f"[DAEMON] Ошибка в обработчике события {message['event']}: {e}")
+                        continue
+                    with self._pending_lock:
+                        slot = self._pending.get(message.get("id"))
+                    if slot is not None:
+                        slot[1] = message
+                        slot[0].set()
+        except (OSError, ValueError):
+            pass
+        finally:
+            self._closed = True
+            with self._pending_lock:
+                for slot in self._pending.values():
+                    slot[1] = {"ok": False, "error": "Соединение с демоном закрыто"}
+                    slot[0].set()
+
+    def close(self) -> None:
+        self._closed = True
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._sock.close()
+
+    def __enter__(self) -> "DaemonClient":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+# ================== ЗАПУСК ==================
+
+def _open_manipulator(simulated: bool) -> Any:
+    if simulated:
+        from medu_sim import make_simulated_manipulator
+
+        manip = make_simulated_manipulator()
+    else:
+        from sdk.manipulators.medu import MEdu
+
+        print(f"[DAEMON] Подключение к манипулятору {HOST!r} (client_id={CLIENT_ID})...")
+        manip = MEdu(HOST, CLIENT_ID, LOGIN, PASSWORD)
+        manip.connect()
+    manip.get_control()
+    print("[DAEMON] Управление манипулятором захвачено.")
+    return manip
+
+
+def _print_status(path: str) -> None:
+    with DaemonClient(path) as client:
+        started = time.perf_counter()
+        info = client.ping()
+        print(f"[DAEMON] pid={info['pid']}, работает {info['uptime']:.0f} с, клиентов: {info['clients']}, "
+              f"ответ за {(time.perf_counter() - started) * 1000.0:.2f} мс")
+        for topic, entry in sorted(client.states().items()):
+            if entry is None:
+                continue
+            print(f"  {topic}: {entry['count']} сообщений, последнее {entry['age'] * 1000.0:.0f} мс назад")
+        stats = client.stats()
+        for method, latency in sorted(stats["latency"].items()):
+            print(f"  {method}: {latency['calls']} вызовов, p50 {latency['p50_ms']:.1f} мс")
+
+
+def _stop_check(path: str) -> None:
+    """
+    Проверка на симуляторе: первый клиент ждёт долгое move_to_coordinates, второй
+    шлёт stop_movement. Стоп должен пройти за доли секунды, движение — прерваться,
+    а move_to_coordinates — вернуться сразу после стопа.
+    """
+    from medu_sim import SimConfig, make_simulated_manipulator
+
+    manip = make_simulated_manipulator(config=SimConfig(tcp_speed=STOP_CHECK_TCP_SPEED))
+    daemon = MeduDaemon(manip, path, conveyor=False)
+    daemon.start()
+    moved: Dict[str, Any] = {}
+
+    def long_move(position: List[float], orientation: Dict[str, float]) -> None:
+        started = time.monotonic()
+        with DaemonClient(path) as client:
+            try:
+                client.call("move_to_coordinates", position, orientation, 0.1, 0.1)
+            except DaemonError as e:
+                moved["error"] = str(e)
+        moved["seconds"] = time.monotonic() - started
+
+    try:
+        with DaemonClient(path) as client:
+            while client.state("/coordinates") is None:
+                time.sleep(0.05)
+            tool0 = client.state("/coordinates")["data"]["tool0"]
+            target = [tool0["position"]["x"], tool0["position"]["y"], tool0["position"]["z"] - STOP_CHECK_DROP]
+            mover = threading.Thread(target=long_move, args=(target, tool0["orientation"]), daemon=True)
+            mover.start()
+            time.sleep(1.0)
+
+            started = time.monotonic()
+            client.call("stop_movement", timeout_seconds=5.0)
+            stop_seconds = time.monotonic() - started
+            mover.join(CALL_TIMEOUT)
+            time.sleep(0.2)
+            stopped_at = client.state("/joint_states")["data"]["position"]
+            time.sleep(0.5)
+            later = client.state("/joint_states")["data"]["position"]
+    finally:
+        daemon.stop()
+
+    print(f"[CHECK] stop_movement во время движения: ответ за {stop_seconds * 1000.0:.0f} мс, "
+          f"move_to_coordinates вернулся через {moved.get('seconds', float('nan')):.2f} с "
+          f"(без стопа ~{STOP_CHECK_DROP / STOP_CHECK_TCP_SPEED:.0f} с)"
+          f"{', ошибка: ' + moved['error'] if 'error' in moved else ''}, "
+          f"рука {'стоит' if stopped_at == later else 'продолжает движение'}")
+    # Движение должно было идти к моменту стопа (через 1 с) и закончиться раньше, чем без стопа
+    move_seconds = moved.get("seconds", float("inf"))
+    if stop_seconds > 1.0 or stopped_at != later or not 1.0 <= move_seconds < STOP_CHECK_DROP / STOP_CHECK_TCP_SPEED:
+        print("[CHECK] ПРОВАЛ")
+        sys.exit(1)
+    print("[CHECK] OK")
+
+
+def main() -> None:
+    args = sys.argv[1:]
+    path = next((a for a in args if not a.startswith("--") and a not in ("status", "stopcheck")), SOCKET_PATH)
+    if "status" in args:
+        _print_status(path)
+        return
+    if "stopcheck" in args:
+        _stop_check(path + ".check")
+        return
+
+    manip = _open_manipulator("--sim" in args)
+    daemon = MeduDaemon(manip, path)
+    try:
+        daemon.serve_forever()
+    finally:
+        try:
+            manip.stop_movement(timeout_seconds=5.0)
+        except Exception as e:
+            print(f"[DAEMON] Ошибка при stop_movement: {e}")
+        for name in ("release_control", "disconnect"):
+            if not hasattr(manip, name):
+                continue
+            try:
+                getattr(manip, name)()
+            except Exception as e:
+                print(f"[DAEMON] Ошибка при {name}: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,438 @@
+"""
+Симулятор MEdu в процессе: замена ManipulatorConnection без сети.
+
+SimulatedConnection имеет ту же сигнатуру конструктора, что ManipulatorConnection
+(host, client_id, login, password, on_message), и ведёт себя как брокер + робот:
+    - команды, опубликованные в COMMAND_TOPIC / MANAGEMENT_TOPIC, подтверждаются
+      в COMMAND_RESULT_TOPIC через ack_latency (для движений — после их окончания
+      или сразу после стопа); команды без id (*_no_wait) выполняются без подтверждения;
+    - /joint_states, /coordinates, /gpio_states и кадры датчиков MGBOT
+      публикуются с заданными частотами;
+    - сообщения доставляются только в топики, на которые есть подписка (как в MQTT).
+
+Все события (периодические публикации и подтверждения) обслуживает один поток
+планировщика; on_message вызывается из него же, как из сетевого потока MQTT.
+
+    m = make_simulated_manipulator()                 # hehe.Manipulator поверх симулятора
+    m = Manipulator(..., connection_factory=SimulatedConnection)
+
+    install()                                        # подменить соединение в загруженном SDK,
+    manip = MEdu(HOST, CLIENT_ID, LOGIN, PASSWORD)   # чтобы скрипты (rab.py и др.) шли в симулятор
+
+Формат подтверждения ({"id": ..., "result": ...}) и полей команд в SDK не
+задокументирован; разбор команд нестрогий, значение result настраивается.
+"""
+
+import functools
+import heapq
+import itertools
+import json
+import math
+import random
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from sdk.utils.constants import COMMAND_RESULT_TOPIC, COMMAND_TOPIC, MANAGEMENT_TOPIC, MGBOT_TOPIC
+
+JOINT_STATES_TOPIC = "/joint_states"
+COORDINATES_TOPIC = "/coordinates"
+GPIO_STATES_TOPIC = "/gpio_states"
+
+JOINT_NAMES = ("povorot_osnovaniya", "privod_plecha", "privod_strely")
+
+# Упрощённая кинематика: высота плеча над базой и длины звеньев (м)
+BASE_HEIGHT = 0.10
+SHOULDER_LENGTH = 0.20
+BOOM_LENGTH = 0.20
+TOOL1_OFFSET_Z = -0.05
+
+
+@dataclass
+class SimConfig:
+    """Параметры симуляции"""
+    ack_latency: float = 0.02           # задержка подтверждения команды, с
+    ack_jitter: float = 0.005           # разброс задержки, с
+    move_speed: float = 0.5             # скорость суставов при движении, рад/с
+    tcp_speed: float = 0.1              # скорость TCP при декартовом движении, м/с
+    joint_rate_hz: float = 50.0
+    coordinates_rate_hz: float = 50.0
+    gpio_rate_hz: float = 10.0
+    mgbot_rate_hz: float = 20.0
+    result_value: Any = "SUCCESS"       # значение поля result в подтверждении
+    gpio_pins: Tuple[str, ...] = ("/dev/gpiochip4/e1_pin", "/dev/gpiochip4/e2_pin")
+    belt_period: float = 3.0            # объект проходит под датчиком раз в belt_period, с
+    object_colors: Tuple[Tuple[int, int, int], ...] = ((200, 40, 40), (40, 180, 60), (40, 60, 200))
+    deliver_unsubscribed: bool = False  # доставлять сообщения без подписки
+    seed: Optional[int] = None
+
+
+# ===================== МОДЕЛЬ РОБОТА =====================
+
+def forward_kinematics(joints: List[float]) -> Tuple[float, float, float]:
+    base, shoulder, boom = joints
+    reach = SHOULDER_LENGTH * math.cos(shoulder) + BOOM_LENGTH * math.cos(shoulder + boom)
+    height = BASE_HEIGHT + SHOULDER_LENGTH * math.sin(-shoulder) + BOOM_LENGTH * math.sin(-(shoulder + boom))
+    return reach * math.cos(base), reach * math.sin(base), height
+
+
+def inverse_kinematics(x: float, y: float, z: float) -> Optional[List[float]]:
+    base = math.atan2(y, x)
+    reach = math.hypot(x, y)
+    height = z - BASE_HEIGHT
+    d_sq = reach * reach + height * height
+    cos_boom = (d_sq - SHOULDER_LENGTH ** 2 - BOOM_LENGTH ** 2) / (2 * SHOULDER_LENGTH * BOOM_LENGTH)
+    if abs(cos_boom) > 1.0:
+        return None
+    boom = -math.acos(cos_boom)
+    shoulder = -(math.atan2(height, reach) -
+                 math.atan2(BOOM_LENGTH * math.sin(-boom), SHOULDER_LENGTH + BOOM_LENGTH * math.cos(-boom)))
+    return [base, shoulder, boom]
+
+
+class SimulatedRobot:
+    """Состояние суставов, TCP, GPIO и конвейера; движение — линейная интерполяция"""
+
+    def __init__(self, config: SimConfig):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.joints = [0.0, -0.35, -0.75]
+        self.velocities = [0.0, 0.0, 0.0]
+        self.orientation = {"x": 0.0, "y": 0.0, "z": 0.0, "w": 1.0}
+        self.gripper = {"rotation": 0.0, "gripper": 0.0}
+        self.gpio = {pin: 0.0 for pin in config.gpio_pins}
+        self.conveyor_velocity = 0.0
+
+        self._move_from = list(self.joints)
+        self._move_to = list(self.joints)
+        self._move_started = 0.0
+        self._move_duration = 0.0
+        self._lock = threading.Lock()
+
+    def start_move(self, target: List[float], now: float, cartesian: bool = False) -> float:
+        """Начать движение к целевым углам; возвращает длительность движения"""
+        with self._lock:
+            self._advance(now)
+            self._move_from = list(self.joints)
+            self._move_to = list(target)
+            if cartesian:
+                start = forward_kinematics(self.joints)
+                end = forward_kinematics(target)
+                distance = math.dist(start, end)
+                self._move_duration = distance / max(self.config.tcp_speed, 1e-6)
+            else:
+                delta = max(abs(b - a) for a, b in zip(self._move_from, self._move_to))
+                self._move_duration = delta / max(self.config.move_speed, 1e-6)
+            self._move_started = now
+            return self._move_duration
+
+    def stop(self, now: float) -> None:
+        with self._lock:
+            self._advance(now)
+            self._move_to = list(self.joints)
+            self._move_duration = 0.0
+
+    def _advance(self, now: float) -> None:
+        if self._move_duration <= 0.0:
+            self.joints = list(self._move_to)
+            self.velocities = [0.0, 0.0, 0.0]
+            return
+        progress = min(1.0, (now - self._move_started) / self._move_duration)
+        self.joints = [a + (b - a) * progress for a, b in zip(self._move_from, self._move_to)]
+        if progress >= 1.0:
+            self.velocities = [0.0, 0.0, 0.0]
+        else:
+            self.velocities = [(b - a) / self._move_duration for a, b in zip(self._move_from, self._move_to)]
+
+    def snapshot(self, now: float) -> Tuple[List[float], List[float]]:
+        with self._lock:
+            self._advance(now)
+            return list(self.joints), list(self.velocities)
+
+    def mgbot_frame(self, now: float) -> Dict[str, Any]:
+        """Кадр датчиков конвейера: объект периодически проходит под датчиками"""
+        period = self.config.belt_period
+        phase = (now % period) / period
+        index = int(now // period) % len(self.config.object_colors)
+        present = 0.4 <= phase < 0.6
+        noise = self.random.uniform(-2.0, 2.0)
+        distance = (120.0 if present else 300.0) + noise
+        r, g, b = self.config.object_colors[index] if present else (20, 20, 20)
+        prox = 200 if present else 5
+        return {"DistanceSensor": round(distance, 1),
+                "ColorSensor": {"R": r, "G": g, "B": b, "Prox": prox},
+                "Prox": prox}
+
+
+# ===================== РАЗБОР КОМАНД =====================
+
+def _walk(node: Any) -> Iterator[Tuple[str, Any]]:
+    if isinstance(node, dict):
+        for key, value in node.items():
+            yield key, value
+            yield from _walk(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _walk(value)
+
+
+def parse_command(payload: Any) -> Dict[str, Any]:
+    """
+    Нестрогий разбор команды: id, тип, целевые углы / позиция, GPIO и т.п.
+    Поля ищутся на любом уровне вложенности.
+    """
+    if isinstance(payload, (bytes, bytearray)):
+        payload = payload.decode("utf-8", errors="replace")
+    if isinstance(payload, str):
+        try:
+            data = json.loads(payload)
+        except json.JSONDecodeError:
+            return {}
+    else:
+        data = payload
+    if not isinstance(data, dict):
+        return {}
+
+    command: Dict[str, Any] = {"raw": data}
+    for key, value in _walk(data):
+        lowered = key.lower()
+        if lowered in ("id", "command_id") and "id" not in command:
+            command["id"] = value
+        elif lowered in ("type", "command", "command_type", "name") and isinstance(value, str) \
+                and "type" not in command:
+            command["type"] = value
+        elif key in JOINT_NAMES and isinstance(value, (int, float)):
+            command.setdefault("joints", {})[key] = float(value)
+        elif lowered == "position" and isinstance(value, dict) and {"x", "y", "z"} <= value.keys():
+            command["position"] = value
+        elif lowered == "orientation" and isinstance(value, dict) and "w" in value:
+            command["orientation"] = value
+        elif lowered in ("velocity", "value") and isinstance(value, (int, float, bool)):
+            command.setdefault(lowered, value)
+    return command
+
+
+# ===================== СОЕДИНЕНИЕ =====================
+
+class SimulatedConnection:
+    """Замена ManipulatorConnection: брокер + модель робота в одном потоке"""
+
+    def __init__(self, host: str, client_id: str, login: str, password: str,
+                 on_message: Callable[[str, str], None], config: Optional[SimConfig] = None):
+        self.host = host
+        self.client_id = client_id
+        self.login = login
+        self.password = password
+        self.on_message = on_message
+        self.config = config or SimConfig()
+        self.robot = SimulatedRobot(self.config)
+        self.is_connected = False
+
+        self.subscriptions: Set[str] = set()
+        self.published_count = 0
+        self.delivered: Dict[str, int] = {}
+
+        self._events: List[Tuple[float, int, Callable[[float], None]]] = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._moves_in_flight: Set[Any] = set()
+
+    # --- Интерфейс ManipulatorConnection ---
+
+    def connect(self) -> None:
+        if self.is_connected:
+            return
+        self.is_connected = True
+        now = time.monotonic()
+        for topic, rate in ((JOINT_STATES_TOPIC, self.config.joint_rate_hz),
+                            (COORDINATES_TOPIC, self.config.coordinates_rate_hz),
+                            (GPIO_STATES_TOPIC, self.config.gpio_rate_hz),
+                            (MGBOT_TOPIC, self.config.mgbot_rate_hz)):
+            if rate > 0:
+                self._schedule(now, functools.partial(self._periodic, topic, 1.0 / rate))
+        self._thread = threading.Thread(target=self._run, name="medu-sim", daemon=True)
+        self._thread.start()
+
+    async def connect_async(self) -> None:
+        self.connect()
+
+    def disconnect(self) -> None:
+        with self._condition:
+            self.is_connected = False
+            self._events.clear()
+            self._condition.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+        self._thread = None
+
+    def subscribe(self, topic: str) -> None:
+        self.subscriptions.add(topic)
+
+    def unsubscribe(self, topic: str) -> None:
+        self.subscriptions.discard(topic)
+
+    def publish(self, topic: str, payload: Any, *args: Any, **kwargs: Any) -> None:
+        self.published_count += 1
+        if topic in (COMMAND_TOPIC, MANAGEMENT_TOPIC):
+            self._handle_command(parse_command(payload))
+
+    # --- Планировщик ---
+
+    def _schedule(self, due: float, action: Callable[[float], None]) -> None:
+        with self._condition:
+            heapq.heappush(self._events, (due, next(self._sequence), action))
+            self._condition.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                if not self.is_connected:
+                    return
+                if not self._events:
+                    self._condition.wait()
+                    continue
+                due = self._events[0][0]
+                delay = due - time.monotonic()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+                _, _, action = heapq.heappop(self._events)
+            try:
+                action(due)
+            except Exception as e:
+                print(f"[SIM] Ошибка события симулятора: {e}", file=sys.stderr)
+
+    def _deliver(self, topic: str, message: Any) -> None:
+        if not self.config.deliver_unsubscribed and topic not in self.subscriptions:
+            return
+        self.delivered[topic] = self.delivered.get(topic, 0) + 1
+        self.on_message(topic, message if isinstance(message, str) else json.dumps(message, ensure_ascii=False))
+
+    # --- Периодические топики ---
+
+    def _periodic(self, topic: str, interval: float, due: float) -> None:
+        now = time.monotonic()
+        if topic == JOINT_STATES_TOPIC:
+            self._deliver(topic, self._joint_states(now))
+        elif topic == COORDINATES_TOPIC:
+            self._deliver(topic, self._coordinates(now))
+        elif topic == GPIO_STATES_TOPIC:
+            self._deliver(topic, {"name": list(self.robot.gpio), "value": list(self.robot.gpio.values())})
+        elif topic == MGBOT_TOPIC:
+            self._deliver(topic, {"data": self.robot.mgbot_frame(time.time())})
+        # Следующий запуск от расписания, а не от факта — частота не «уплывает»
+        self._schedule(max(due + interval, now), functools.partial(self._periodic, topic, interval))
+
+    def _joint_states(self, now: float) -> Dict[str, Any]:
+        joints, velocities = self.robot.snapshot(now)
+        wall = time.time()
+        return {
+            "header": {"stamp": {"sec": int(wall), "nanosec": int((wall % 1) * 1e9)}, "frame_id": ""},
+            "name": list(JOINT_NAMES),
+            "position": joints,
+            "velocity": velocities,
+            "effort": [0.0] * len(JOINT_NAMES),
+        }
+
+    def _coordinates(self, now: float) -> Dict[str, Any]:
+        joints, _ = self.robot.snapshot(now)
+        x, y, z = forward_kinematics(joints)
+        orientation = dict(self.robot.orientation)
+        return {
+            "tool0": {"position": {"x": x, "y": y, "z": z}, "orientation": orientation},
+            "tool1": {"position": {"x": x, "y": y, "z": z + TOOL1_OFFSET_Z}, "orientation": dict(orientation)},
+        }
+
+    # --- Команды ---
+
+    def _handle_command(self, command: Dict[str, Any]) -> None:
+        command_id = command.get("id")
+        now = time.monotonic()
+        duration = 0.0
+        kind = str(command.get("type", "")).lower()
+
+        if "joints" in command:
+            joints, _ = self.robot.snapshot(now)
+            target = [command["joints"].get(name, joints[i]) for i, name in enumerate(JOINT_NAMES)]
+            duration = self.robot.start_move(target, now)
+        elif "position" in command:
+            position = command["position"]
+            target = inverse_kinematics(float(position["x"]), float(position["y"]), float(position["z"]))
+            if target is not None:
+                duration = self.robot.start_move(target, now, cartesian=True)
+            if "orientation" in command:
+                self.robot.orientation = {k: float(command["orientation"][k]) for k in ("x", "y", "z", "w")}
+        elif "stop" in kind:
+            self.robot.stop(now)
+            # Прерванные движения завершаются сейчас, а не в запланированное время
+            with self._condition:
+                stopped, self._moves_in_flight = self._moves_in_flight, set()
+            for move_id in stopped:
+                self._schedule(now + self.config.ack_latency, functools.partial(self._ack, move_id))
+        elif "gpio" in kind and "value" in command:
+            raw = command["raw"]
+            name = next((v for k, v in _walk(raw) if k == "name" and isinstance(v, str) and v in self.robot.gpio),
+                        None)
+            if name is not None:
+                self.robot.gpio[name] = float(command["value"])
+        elif "conveyor" in kind or "conveyer" in kind:
+            self.robot.conveyor_velocity = float(command.get("velocity", 0.0))
+
+        if command_id is None:
+            return
+        latency = max(0.0, self.config.ack_latency + self.robot.random.uniform(-1.0, 1.0) * self.config.ack_jitter)
+        if duration > 0.0:
+            with self._condition:
+                self._moves_in_flight.add(command_id)
+            self._schedule(now + duration + latency, functools.partial(self._ack_move, command_id))
+        else:
+            self._schedule(now + duration + latency, functools.partial(self._ack, command_id))
+
+    def _ack(self, command_id: Any, due: float) -> None:
+        self._deliver(COMMAND_RESULT_TOPIC, {"id": command_id, "result": self.config.result_value})
+
+    def _ack_move(self, command_id: Any, due: float) -> None:
+        """Подтверждение движения по окончании, если его не подтвердил стоп"""
+        with self._condition:
+            if command_id not in self._moves_in_flight:
+                return
+            self._moves_in_flight.discard(command_id)
+        self._ack(command_id, due)
+
+
+# ===================== ПОДКЛЮЧЕНИЕ К СКРИПТАМ =====================
+
+def simulated_connection_factory(config: Optional[SimConfig] = None) -> Callable[..., SimulatedConnection]:
+    """Фабрика для Manipulator(..., connection_factory=...) с заданной конфигурацией"""
+    return functools.partial(SimulatedConnection, config=config)
+
+
+def make_simulated_manipulator(manipulator_class: Any = None, config: Optional[SimConfig] = None) -> Any:
+    """Manipulator (по умолчанию hehe.Manipulator) поверх симулятора, уже подключённый"""
+    if manipulator_class is None:
+        from hehe import Manipulator as manipulator_class
+    manipulator = manipulator_class("sim", "sim-client", "user", "pass",
+                                    connection_factory=simulated_connection_factory(config))
+    manipulator.connect()
+    return manipulator
+
+
+def install(config: Optional[SimConfig] = None) -> int:
+    """
+    Подменить ManipulatorConnection во всех загруженных модулях sdk.* на симулятор,
+    чтобы скрипты, создающие MEdu напрямую, работали без робота. Вызывать до создания MEdu.
+    Возвращает число подменённых ссылок.
+    """
+    import sdk.manipulators.medu  # noqa: F401 — загружаем модули, в которых создаётся соединение
+    factory = simulated_connection_factory(config)
+    replaced = 0
+    for name, module in list(sys.modules.items()):
+        if (name == "sdk" or name.startswith("sdk.")) and module is not None \
+                and hasattr(module, "ManipulatorConnection") and name != "sdk.manipulators.manipulator_connection":
+            setattr(module, "ManipulatorConnection", factory)
+            replaced += 1
+    print(f"[SIM] Симулятор MEdu подключён вместо ManipulatorConnection ({replaced} ссылок)")
+    return replaced
@@ -0,0 +1,493 @@
+"""
+Непрерывное отслеживание блоков Pixy с предсказанием движения.
+
+get_block_coordinates_from_pixy на каждый вызов шлёт PixyCamGetCoordinatesCommand
+и ждёт отдельного Promise на PIXY_CAM_COORDINATES_TOPIC, а last_pixy_coordinates —
+одна сырая строка. PixyTracker сам опрашивает камеру по нескольким сигнатурам
+(через PollScheduler: период подстраивается под движение блоков, общий бюджет запросов)
+и ведёт по каждому блоку трек с фильтром Калмана (модель постоянной скорости,
+по осям x и y независимо). Запрос положения не ждёт камеру: трек экстраполируется
+на момент запроса.
+
+    tracker = PixyTracker(manipulator, signatures=(1, 2))
+    tracker.start()
+    estimate = tracker.best(1)                     # TrackEstimate или None
+    estimate.x, estimate.y, estimate.vx            # пиксели и пиксели/с на момент запроса
+    estimate = tracker.best(1, at=time.monotonic() + 0.4)   # где блок будет через 0.4 с
+    tracker.wait_for(2, timeout=5.0)
+
+Сопоставление блоков с треками: по индексу трекинга Pixy (если камера его отдаёт),
+иначе — ближайший по расстоянию Махаланобиса трек в пределах строба (gate).
+Трек подтверждается после min_hits измерений и удаляется после max_misses опросов
+подряд без блока или max_coast секунд без измерений.
+
+Запрос к камере занимает единственный слот команды манипулятора (specific_command)
+и в конце сбрасывает его. Поэтому опрос берёт command_slot(manip), а команды
+основного потока, пока трекер работает, нужно оборачивать так же:
+
+    with command_slot(manipulator):
+        manipulator.write_gpio(...)
+
+Если слот занят дольше SLOT_WAIT или камера не ответила за FETCH_TIMEOUT, опрос
+пропускается, и треки продолжаются по прогнозу (промах не засчитывается).
+
+Формат сообщения камеры в SDK не задокументирован: parse_blocks понимает JSON
+с одним блоком, списком блоков или полем "blocks"/"data", имена полей x/y/width/height/
+signature/index/age с префиксом m_ и без.
+"""
+
+import functools
+import itertools
+import json
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sdk.manipulators.medu import MEdu
+
+from command_slot import command_slot
+from poll_scheduler import PollScheduler
+
+# ===================== ПОДКЛЮЧЕНИЕ =====================
+
+HOST = "10.5.0.2"
+CLIENT_ID = "pixy-tracker"
+LOGIN = "user"
+PASSWORD = "pass"
+
+SIGNATURES = (1, 2, 3)
+
+# ===================== ПАРАМЕТРЫ ФИЛЬТРА =====================
+
+MEASUREMENT_NOISE = 2.0        # СКО положения блока, пиксели
+# СКО ускорения блока, пиксели/с². Подобрано bench_pixy_tracker.py (блок 50 px/s, 10 Гц,
+# шум 2 px): оценка vx 42..59 px/s, ошибка прогноза на 0.3 с — 5 px против 19 px
+# у экстраполяции по двум кадрам, реакция на разгон — 0.5 с. При 300 vx разбегалась от 2 до 98 px/s.
+PROCESS_NOISE = 20.0
+INITIAL_VELOCITY = 200.0       # СКО скорости нового трека, пиксели/с
+GATE = 9.21                    # строб: χ² для 2 степеней свободы, 99 %
+MAX_JUMP = 40.0                # блок вне строба, но ближе к прогнозу трека (пиксели) — тот же объект
+MIN_HITS = 2
+MAX_MISSES = 3
+MAX_COAST = 2.0                # с без измерений до удаления трека
+BLOCK_CHANGE = 2.0             # сдвиг блока (пиксели), который считается движением
+
+MIN_INTERVAL = 0.05            # период опроса камеры, пока блоки движутся, с
+MAX_INTERVAL = 0.5             # период опроса, пока всё стоит, с
+FETCH_TIMEOUT = 0.5            # столько слот команды может быть занят опросом, если камера молчит, с
+SLOT_WAIT = 0.05               # ожидание слота команды перед пропуском опроса, с
+
+_FIELDS = {
+    "signature": ("signature", "m_signature", "sig"),
+    "x": ("x", "m_x"),
+    "y": ("y", "m_y"),
+    "width": ("width", "m_width", "w"),
+    "height": ("height", "m_height", "h"),
+    "index": ("index", "m_index"),
+    "age": ("age", "m_age"),
+}
+
+
+@dataclass(frozen=True)
+class PixyBlock:
+    """Блок, найденный камерой (координаты изображения, пиксели)"""
+    signature: int
+    x: float
+    y: float
+    width: float = 0.0
+    height: float = 0.0
+    index: Optional[int] = None      # индекс трекинга Pixy2 — постоянен, пока камера видит объект
+    age: Optional[int] = None        # сколько кадров камера видит объект
+
+
+def _field(item: Dict[str, Any], name: str) -> Any:
+    for key in _FIELDS[name]:
+        if key in item:
+            return item[key]
+    return None
+
+
+def parse_blocks(payload: Any, signature: Optional[int] = None) -> List[PixyBlock]:
+    """Блоки из ответа камеры (строка JSON или разобранный объект); нераспознанное — пропускается"""
+    if isinstance(payload, (str, bytes)):
+        try:
+            payload = json.loads(payload)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return []
+    if isinstance(payload, dict):
+        for key in ("blocks", "data"):
+            if key in payload:
+                return parse_blocks(payload[key], signature)
+        payload = [payload]
+    if not isinstance(payload, list):
+        return []
+
+    blocks = []
+    for item in payload:
+        if not isinstance(item, dict):
+            continue
+        x, y = _field(item, "x"), _field(item, "y")
+        if not isinstance(x, (int, float)) or not isinstance(y, (int, float)):
+            continue
+        block_signature = _field(item, "signature")
+        block_signature = int(block_signature) if isinstance(block_signature, (int, float)) else signature
+        if block_signature is None or (signature is not None and block_signature != signature):
+            continue
+        index, age = _field(item, "index"), _field(item, "age")
+        blocks.append(PixyBlock(
+            signature=block_signature,
+            x=float(x),
+            y=float(y),
+            width=float(_field(item, "width") or 0.0),
+            height=float(_field(item, "height") or 0.0),
+            index=int(index) if isinstance(index, (int, float)) else None,
+            age=int(age) if isinstance(age, (int, float)) else None,
+        ))
+    return blocks
+
+
+def blocks_differ(old: Optional[Sequence[PixyBlock]], new: Optional[Sequence[PixyBlock]]) -> bool:
+    """Сдвинулся ли хотя бы один блок больше чем на BLOCK_CHANGE (для адаптивного опроса)"""
+    if old is None or new is None or len(old) != len(new):
+        return old is not new
+    key = lambda block: (block.index if block.index is not None else -1, block.x, block.y)
+    return any(abs(a.x - b.x) > BLOCK_CHANGE or abs(a.y - b.y) > BLOCK_CHANGE
+               for a, b in zip(sorted(old, key=key), sorted(new, key=key)))
+
+
+# ===================== ФИЛЬТР КАЛМАНА =====================
+
+class _AxisFilter:
+    """Фильтр Калмана одной оси: состояние (положение, скорость), ковариация 2×2"""
+
+    __slots__ = ("position", "velocity", "p00", "p01", "p11")
+
+    def __init__(self, position: float, measurement_var: float, velocity_var: float):
+        self.position = position
+        self.velocity = 0.0
+        self.p00 = measurement_var
+        self.p01 = 0.0
+        self.p11 = velocity_var
+
+    def predicted(self, dt: float, accel_var: float) -> Tuple[float, float, float, float, float]:
+        """Состояние и ковариация через dt секунд (без изменения фильтра)"""
+        p00 = self.p00 + 2.0 * dt * self.p01 + dt * dt * self.p11 + accel_var * dt ** 3 / 3.0
+        p01 = self.p01 + dt * self.p11 + accel_var * dt * dt / 2.0
+        p11 = self.p11 + accel_var * dt
+        return self.position + self.velocity * dt, self.velocity, p00, p01, p11
+
+    def update(self, z: float, dt: float, accel_var: float, measurement_var: float) -> None:
+        position, velocity, p00, p01, p11 = self.predicted(dt, accel_var)
+        s = p00 + measurement_var
+        k0, k1 = p00 / s, p01 / s
+        innovation = z - position
+        self.position = position + k0 * innovation
+        self.velocity = velocity + k1 * innovation
+        self.p00 = (1.0 - k0) * p00
+        self.p01 = (1.0 - k0) * p01
+        self.p11 = p11 - k1 * p01
+
+
+@dataclass(frozen=True)
+class TrackEstimate:
+    """Положение блока, предсказанное на момент at"""
+    track_id: int
+    signature: int
+    at: float                                   # time.monotonic(), на который сделан прогноз
+    x: float
+    y: float
+    vx: float
+    vy: float
+    sigma: float                                # СКО положения (большая из осей), пиксели
+    since_update: float                         # с от последнего измерения до at
+    hits: int
+    width: float
+    height: float
+    world: Optional[Tuple[float, float]] = None  # to_world(x, y), если задано
+
+
+class _Track:
+    def __init__(self, track_id: int, block: PixyBlock, timestamp: float, measurement_var: float,
+                 velocity_var: float):
+        self.id = track_id
+        self.signature = block.signature
+        self.index = block.index
+        self.x = _AxisFilter(block.x, measurement_var, velocity_var)
+        self.y = _AxisFilter(block.y, measurement_var, velocity_var)
+        self.timestamp = timestamp
+        self.hits = 1
+        self.misses = 0
+        self.width = block.width
+        self.height = block.height
+
+    def gate_distance(self, block: PixyBlock, timestamp: float, accel_var: float, measurement_var: float) -> float:
+        """Квадрат расстояния Махаланобиса измерения до прогноза трека"""
+        dt = max(0.0, timestamp - self.timestamp)
+        x, _, px, _, _ = self.x.predicted(dt, accel_var)
+        y, _, py, _, _ = self.y.predicted(dt, accel_var)
+        return (block.x - x) ** 2 / (px + measurement_var) + (block.y - y) ** 2 / (py + measurement_var)
+
+    def jump(self, block: PixyBlock, timestamp: float) -> float:
+        """Расстояние (пиксели) от прогноза трека до блока"""
+        dt = max(0.0, timestamp - self.timestamp)
+        return math.hypot(block.x - (self.x.position + self.x.velocity * dt),
+                          block.y - (self.y.position + self.y.velocity * dt))
+
+    def update(self, block: PixyBlock, timestamp: float, accel_var: float, measurement_var: float) -> None:
+        dt = max(0.0, timestamp - self.timestamp)
+        self.x.update(block.x, dt, accel_var, measurement_var)
+        self.y.update(block.y, dt, accel_var, measurement_var)
+        self.timestamp = max(self.timestamp, timestamp)
+        self.hits += 1
+        self.misses = 0
+        self.index = block.index if block.index is not None else self.index
+        self.width = block.width
+        self.height = block.height
+
+
+# ===================== ТРЕКЕР =====================
+
+class PixyTracker:
+    """Опрос камеры Pixy по сигнатурам и треки блоков с прогнозом на момент запроса"""
+
+    def __init__(self, manip: Any, signatures: Iterable[int] = SIGNATURES, scheduler: Optional[PollScheduler] = None,
+                 min_interval: float = MIN_INTERVAL, max_interval: float = MAX_INTERVAL,
+                 measurement_noise: float = MEASUREMENT_NOISE, process_noise: float = PROCESS_NOISE,
+                 gate: float = GATE, max_jump: float = MAX_JUMP, min_hits: int = MIN_HITS, max_misses: int = MAX_MISSES,
+                 max_coast: float = MAX_COAST, to_world: Optional[Callable[[float, float], Tuple[float, float]]] = None):
+        """
+        :param scheduler: Общий PollScheduler (по умолчанию — свой)
+        :param to_world: Перевод координат изображения в координаты манипулятора (калибровка камеры)
+        """
+        self.manip = manip
+        self.signatures = list(signatures)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.measurement_var = measurement_noise ** 2
+        self.accel_var = process_noise ** 2
+        self.velocity_var = INITIAL_VELOCITY ** 2
+        self.gate = gate
+        self.max_jump = max_jump
+        self.min_hits = min_hits
+        self.max_misses = max_misses
+        self.max_coast = max_coast
+        self.to_world = to_world
+
+        self._scheduler = scheduler
+        self._own_scheduler = scheduler is None
+        self._sources: List[str] = []
+        self._tracks: Dict[int, List[_Track]] = {signature: [] for signature in self.signatures}
+        self._ids = itertools.count(1)
+        self._condition = threading.Condition()
+
+        self._last_blocks: Dict[int, List[PixyBlock]] = {}
+
+        self.fetches = 0
+        self.skipped = 0
+        self.timeouts = 0
+        self.measurements = 0
+        self.created = 0
+        self.expired = 0
+
+    # --- Опрос камеры ---
+
+    def start(self) -> None:
+        if self._sources:
+            return
+        if self._scheduler is None:
+            self._scheduler = PollScheduler()
+        for signature in self.signatures:
+            name = f"pixy:{signature}"
+            self._scheduler.add_source(name, functools.partial(self._fetch, signature),
+                                       min_interval=self.min_interval, max_interval=self.max_interval,
+                                       changed=blocks_differ)
+            self._sources.append(name)
+
+    def stop(self) -> None:
+        for name in self._sources:
+            self._scheduler.remove_source(name)
+        self._sources.clear()
+        if self._own_scheduler and self._scheduler is not None:
+            self._scheduler.close()
+            self._scheduler = None
+
+    def _fetch(self, signature: int) -> List[PixyBlock]:
+        slot = command_slot(self.manip)
+        if not slot.acquire(timeout=SLOT_WAIT):
+            # Слот занят командой основного потока: прежнее значение для PollScheduler
+            with self._condition:
+                self.skipped += 1
+                return self._last_blocks.get(signature, [])
+        try:
+            # get_block_coordinates_from_pixy возвращает last_pixy_coordinates, даже если
+            # камера не ответила: без сброса это был бы прошлый кадр (и другой сигнатуры)
+            self.manip.last_pixy_coordinates = None
+            started = time.monotonic()
+            raw = self.manip.get_block_coordinates_from_pixy(signature, FETCH_TIMEOUT, False)
+            finished = time.monotonic()
+        finally:
+            slot.release()
+        if raw is None:
+            # Кадра нет (таймаут): это не «блоков нет», треки идут по прогнозу
+            with self._condition:
+                self.timeouts += 1
+                return self._last_blocks.get(signature, [])
+        blocks = parse_blocks(raw, signature)
+        # Момент съёмки неизвестен — берём середину запроса
+        self.observe(signature, blocks, (started + finished) / 2.0)
+        with self._condition:
+            self._last_blocks[signature] = blocks
+        return blocks
+
+    # --- Измерения ---
+
+    def observe(self, signature: int, blocks: Sequence[PixyBlock], timestamp: float) -> None:
+        """Учесть кадр камеры для сигнатуры (все блоки этой сигнатуры в кадре)"""
+        with self._condition:
+            self.fetches += 1
+            self.measurements += len(blocks)
+            tracks = self._tracks.setdefault(signature, [])
+            unmatched_tracks = list(tracks)
+            unmatched_blocks = list(blocks)
+
+            # 1. Индекс трекинга Pixy однозначно связывает блок с треком
+            for block in list(unmatched_blocks):
+                if block.index is None:
+                    continue
+                track = next((t for t in unmatched_tracks if t.index == block.index), None)
+                if track is not None:
+                    track.update(block, timestamp, self.accel_var, self.measurement_var)
+                    unmatched_tracks.remove(track)
+                    unmatched_blocks.remove(block)
+
+            # 2. Остальные — жадно по расстоянию Махаланобиса внутри строба
+            pairs = sorted(
+                (track.gate_distance(block, timestamp, self.accel_var, self.measurement_var), i, j)
+                for i, track in enumerate(unmatched_tracks)
+                for j, block in enumerate(unmatched_blocks)
+            )
+            used_tracks, used_blocks = set(), set()
+            for distance, i, j in pairs:
+                if distance > self.gate:
+                    break
+                if i in used_tracks or j in used_blocks:
+                    continue
+                unmatched_tracks[i].update(unmatched_blocks[j], timestamp, self.accel_var, self.measurement_var)
+                used_tracks.add(i)
+                used_blocks.add(j)
+
+            # 3. Резкий разгон или остановка выводят блок из строба: если он всё же
+            #    рядом с прогнозом оставшегося трека, это тот же объект, а не новый
+            jumps = sorted(
+                (track.jump(block, timestamp), i, j)
+                for i, track in enumerate(unmatched_tracks) if i not in used_tracks
+                for j, block in enumerate(unmatched_blocks) if j not in used_blocks
+            )
+            for distance, i, j in jumps:
+                if distance > self.max_jump:
+                    break
+                if i in used_tracks or j in used_blocks:
+                    continue
+                unmatched_tracks[i].update(unmatched_blocks[j], timestamp, self.accel_var, self.measurement_var)
+                used_tracks.add(i)
+                used_blocks.add(j)
+
+            for i, track in enumerate(unmatched_tracks):
+                if i not in used_tracks:
+                    track.misses += 1
+            for j, block in enumerate(unmatched_blocks):
+                if j not in used_blocks:
+                    tracks.append(_Track(next(self._ids), block, timestamp, self.measurement_var, self.velocity_var))
+                    self.created += 1
+
+            alive = [t for t in tracks
+                     if t.misses <= self.max_misses and timestamp - t.timestamp <= self.max_coast]
+            self.expired += len(tracks) - len(alive)
+            self._tracks[signature] = alive
+            self._condition.notify_all()
+
+    # --- Запросы ---
+
+    def _estimate(self, track: _Track, at: float) -> TrackEstimate:
+        dt = min(max(0.0, at - track.timestamp), self.max_coast)
+        x, vx, px, _, _ = track.x.predicted(dt, self.accel_var)
+        y, vy, py, _, _ = track.y.predicted(dt, self.accel_var)
+        return TrackEstimate(
+            track_id=track.id, signature=track.signature, at=at, x=x, y=y, vx=vx, vy=vy,
+            sigma=math.sqrt(max(px, py)), since_update=at - track.timestamp, hits=track.hits,
+            width=track.width, height=track.height,
+            world=self.to_world(x, y) if self.to_world is not None else None,
+        )
+
+    def estimates(self, signature: Optional[int] = None, at: Optional[float] = None,
+                  confirmed: bool = True) -> List[TrackEstimate]:
+        """Прогноз всех треков (сигнатуры или всех) на момент at (по умолчанию — сейчас)"""
+        at = time.monotonic() if at is None else at
+        with self._condition:
+            signatures = [signature] if signature is not None else list(self._tracks)
+            tracks = [t for s in signatures for t in self._tracks.get(s, ())
+                      if not confirmed or t.hits >= self.min_hits]
+            # Треки, которые к моменту запроса устарели бы, не возвращаем
+            return [self._estimate(t, at) for t in tracks if at - t.timestamp <= self.max_coast]
+
+    def best(self, signature: int, at: Optional[float] = None) -> Optional[TrackEstimate]:
+        """Самый надёжный подтверждённый трек сигнатуры: наименьшее СКО, затем больше измерений"""
+        candidates = self.estimates(signature, at)
+        if not candidates:
+            return None
+        return min(candidates, key=lambda e: (e.sigma, -e.hits))
+
+    def wait_for(self, signature: int, timeout: Optional[float] = None) -> Optional[TrackEstimate]:
+        """Дождаться подтверждённого трека сигнатуры; None по таймауту"""
+        with self._condition:
+            self._condition.wait_for(
+                lambda: any(t.hits >= self.min_hits for t in self._tracks.get(signature, ())), timeout)
+        return self.best(signature)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                "fetches": self.fetches,
+                "skipped": self.skipped,
+                "timeouts": self.timeouts,
+                "measurements": self.measurements,
+                "tracks_created": self.created,
+                "tracks_expired": self.expired,
+                "tracks": {signature: len(tracks) for signature, tracks in self._tracks.items()},
+            }
+
+
+# ===================== ЗАПУСК =====================
+
+def main() -> None:
+    print(f"[*] Подключение к {HOST}...")
+    m = MEdu(HOST, CLIENT_ID, LOGIN, PASSWORD)
+    m.connect()
+    m.get_control()
+
+    tracker = PixyTracker(m, SIGNATURES)
+    tracker.start()
+    try:
+        while True:
+            time.sleep(0.5)
+            for estimate in tracker.estimates():
+                print(f"[PIXY] sig={estimate.signature} #{estimate.track_id}: "
+                      f"({estimate.x:6.1f}, {estimate.y:6.1f}) px, "
+                      f"v=({estimate.vx:6.1f}, {estimate.vy:6.1f}) px/s, ±{estimate.sigma:.1f} px, "
+                      f"измерено {estimate.since_update * 1000.0:.0f} мс назад")
+    except KeyboardInterrupt:
+        print("\n[!] Остановлено пользователем")
+    finally:
+        tracker.stop()
+        print(f"[*] {tracker.stats()}")
+        try:
+            m.release_control()
+            m.disconnect()
+        except Exception:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""
+База точек калибровки на SQLite: несколько станций, история версий, ленивая загрузка.
+
+Таблица points хранит по строке на каждое сохранение точки:
+    (station, point, tool, version, x, y, z, qx, qy, qz, qw, extra, created_at)
+Первичный ключ (station, point, tool, version) служит и индексом для выборки
+последней версии, поэтому скрипт читает только те точки, к которым обращается.
+
+База открывается в режиме WAL: читатели (rab.py, task_3.py) не блокируют
+калибрующий write_coords.py и видят его изменения после коммита.
+
+    points = open_points(Path("points.db"), "cell_station", Path("coords3.json"))
+    position, orientation = points.pose("CELL_1", "tool1")   # один индексный запрос
+    points["CELL_1"]["tool0"]["position"]                    # как словарь coords3.json
+
+Если файла базы нет, open_points возвращает coords_store.PointStore из JSON.
+
+Таблица meta хранит служебные пометки (key -> value), например «точки станции
+уже перенесены из coords3.json» (import_points).
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from coords_store import PointStore, PoseVector, load_point_store
+
+DEFAULT_STATION = "default"
+BUSY_TIMEOUT_MS = 5000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS points (
+    station    TEXT    NOT NULL,
+    point      TEXT    NOT NULL,
+    tool       TEXT    NOT NULL,
+    version    INTEGER NOT NULL,
+    x REAL NOT NULL, y REAL NOT NULL, z REAL NOT NULL,
+    qx REAL NOT NULL, qy REAL NOT NULL, qz REAL NOT NULL, qw REAL NOT NULL,
+    extra      TEXT,
+    created_at REAL    NOT NULL,
+    PRIMARY KEY (station, point, tool, version)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Последняя версия каждого инструмента точки
+_LATEST_FOR_POINT = """
+SELECT tool, x, y, z, qx, qy, qz, qw, extra FROM points AS p
+WHERE station = ? AND point = ? AND version = (
+    SELECT MAX(version) FROM points
+    WHERE station = p.station AND point = p.point AND tool = p.tool
+)
+"""
+
+_LATEST_FOR_TOOL = """
+SELECT x, y, z, qx, qy, qz, qw FROM points
+WHERE station = ? AND point = ? AND tool = ?
+ORDER BY version DESC LIMIT 1
+"""
+
+# Имена точек в порядке первого сохранения (как порядок ключей в coords3.json)
+_POINT_NAMES = """
+SELECT point FROM points WHERE station = ? GROUP BY point ORDER BY MIN(rowid)
+"""
+
+
+def _imported_key(station: str) -> str:
+    return f"imported:{station}"
+
+
+def _pose_rows(pose: Dict[str, Any]) -> List[Tuple[Any, ...]]:
+    """Строки (tool, x, y, z, qx, qy, qz, qw, extra) из {tool: {"position", "orientation", ...}}"""
+    rows = []
+    for tool, tool_pose in pose.items():
+        if not isinstance(tool_pose, dict) or "position" not in tool_pose or "orientation" not in tool_pose:
+            continue
+        position = tool_pose["position"]
+        orientation = tool_pose["orientation"]
+        extra = {k: v for k, v in tool_pose.items() if k not in ("position", "orientation")}
+        rows.append((
+            tool,
+            float(position["x"]), float(position["y"]), float(position["z"]),
+            float(orientation["x"]), float(orientation["y"]), float(orientation["z"]), float(orientation["w"]),
+            json.dumps(extra, ensure_ascii=False) if extra else None,
+        ))
+    return rows
+
+
+def _pose_dict(vector: PoseVector, extra: Optional[str]) -> Dict[str, Any]:
+    x, y, z, qx, qy, qz, qw = vector
+    pose: Dict[str, Any] = json.loads(extra) if extra else {}
+    pose["position"] = {"x": x, "y": y, "z": z}
+    pose["orientation"] = {"x": qx, "y": qy, "z": qz, "w": qw}
+    return pose
+
+
+class PointDatabase:
+    """Соединение с базой точек; безопасно для использования из нескольких потоков"""
+
+    def __init__(self, path: Path, readonly: bool = False):
+        self.path = path
+        self.readonly = readonly
+        if readonly:
+            self._conn = sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True,
+                                         check_same_thread=False, timeout=BUSY_TIMEOUT_MS / 1000)
+        else:
+            self._conn = sqlite3.connect(str(path), check_same_thread=False,
+                                         timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+        self._conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # --- Чтение ---
+
+    def stations(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT DISTINCT station FROM points")]
+
+    def point_names(self, station: str = DEFAULT_STATION) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute(_POINT_NAMES, (station,))]
+
+    def point(self, name: str, station: str = DEFAULT_STATION) -> Dict[str, Dict[str, Any]]:
+        """Последние версии всех инструментов точки: tool -> {"position", "orientation", ...}"""
+        with self._lock:
+            rows = self._conn.execute(_LATEST_FOR_POINT, (station, name)).fetchall()
+        return {row[0]: _pose_dict(row[1:8], row[8]) for row in rows}
+
+    def vector(self, name: str, tool: str = "tool0", station: str = DEFAULT_STATION) -> Optional[PoseVector]:
+        with self._lock:
+            row = self._conn.execute(_LATEST_FOR_TOOL, (station, name, tool)).fetchone()
+        return tuple(row) if row is not None else None
+
+    def history(self, name: str, tool: str = "tool0",
+                station: str = DEFAULT_STATION) -> List[Tuple[int, float, PoseVector]]:
+        """Все версии точки: [(version, created_at, vector)] от старой к новой"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT version, created_at, x, y, z, qx, qy, qz, qw FROM points "
+                "WHERE station = ? AND point = ? AND tool = ? ORDER BY version",
+                (station, name, tool),
+            ).fetchall()
+        return [(row[0], row[1], tuple(row[2:])) for row in rows]
+
+    # --- Запись ---
+
+    def save_point(self, name: str, pose: Dict[str, Any], station: str = DEFAULT_STATION) -> int:
+        """
+        Сохранить новую версию точки из ответа get_cartesian_coordinates
+        ({tool: {"position": ..., "orientation": ...}}). Возвращает число записанных инструментов.
+        """
+        rows = _pose_rows(pose)
+        now = time.time()
+        with self._lock:
+            # BEGIN IMMEDIATE: номер версии вычисляется и записывается в одной транзакции
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for row in rows:
+                    self._insert_version(station, name, row, now)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return len(rows)
+
+    def _insert_version(self, station: str, name: str, row: Tuple[Any, ...], now: float) -> None:
+        tool, *values = row
+        version = self._conn.execute(
+            "SELECT COALESCE(MAX(version), 0) + 1 FROM points "
+            "WHERE station = ? AND point = ? AND tool = ?",
+            (station, name, tool),
+        ).fetchone()[0]
+        self._conn.execute(
+            "INSERT INTO points VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (station, name, tool, version, *values, now),
+        )
+
+    def is_imported(self, station: str = DEFAULT_STATION) -> bool:
+        """Перенесены ли уже точки станции из coords3.json (пометка в meta)"""
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM meta WHERE key = ?", (_imported_key(station),)).fetchone()
+        return row is not None
+
+    def import_points(self, points: Dict[str, Dict[str, Any]], station: str = DEFAULT_STATION) -> int:
+        """
+        Перенести точки {name: {tool: pose}} (coords3.json + журнал) в базу одной транзакцией
+        и поставить пометку is_imported. Инструмент, последняя версия которого в базе уже
+        совпадает с переносимой позой, пропускается, поэтому повторный перенос после сбоя
+        не плодит версии. Возвращает число записанных версий инструментов.
+        """
+        now = time.time()
+        written = 0
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for name, pose in points.items():
+                    for row in _pose_rows(pose):
+                        latest = self._conn.execute(_LATEST_FOR_TOOL, (station, name, row[0])).fetchone()
+                        if latest is not None and tuple(latest) == tuple(row[1:8]):
+                            continue
+                        self._insert_version(station, name, row, now)
+                        written += 1
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                    (_imported_key(station), str(now)),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return written
+
+    def import_json(self, source: Path, station: str = DEFAULT_STATION) -> int:
+        """Импортировать точки из coords3.json (с учётом журнала калибровки); возвращает число версий"""
+        return self.import_points(load_point_store(source).data, station)
+
+
+class StationPoints:
+    """
+    Точки одной станции с ленивой загрузкой. Интерфейс совпадает с coords_store.PointStore:
+    словарный доступ, vector() и pose(). Каждая точка читается из базы при первом обращении.
+    """
+
+    def __init__(self, db: PointDatabase, station: str = DEFAULT_STATION):
+        self.db = db
+        self.station = station
+        self.source = f"{db.path}:{station}"
+        self._points: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._poses: Dict[Tuple[str, str], Tuple[Any, Any]] = {}
+        self._names: Optional[List[str]] = None
+
+    def reload(self) -> None:
+        """Сбросить загруженные точки (например, после перекалибровки)"""
+        self._points.clear()
+        self._poses.clear()
+        self._names = None
+
+    # --- Доступ как к словарю coords3.json ---
+
+    def __getitem__(self, name: str) -> Dict[str, Dict[str, Any]]:
+        point = self._points.get(name)
+        if point is None:
+            point = self.db.point(name, self.station)
+            if not point:
+                raise KeyError(name)
+            self._points[name] = point
+        return point
+
+    def __contains__(self, name: object) -> bool:
+        if name in self._points:
+            return True
+        try:
+            self[name]
+        except KeyError:
+            return False
+        return True
+
+    def keys(self) -> List[str]:
+        if self._names is None:
+            self._names = self.db.point_names(self.station)
+        return list(self._names)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    def items(self) -> Iterator[Tuple[str, Dict[str, Dict[str, Any]]]]:
+        for name in self.keys():
+            yield name, self[name]
+
+    # --- Быстрый доступ к позам ---
+
+    def vector(self, name: str, tool: str = "tool0") -> PoseVector:
+        vector = self.db.vector(name, tool, self.station)
+        if vector is None:
+            raise KeyError(f"В базе {self.source} нет точки '{name}' и/или инструмента '{tool}'")
+        return vector
+
+    def pose(self, name: str, tool: str = "tool0") -> Tuple[Any, Any]:
+        """Готовые (MoveCoordinatesParamsPosition, MoveCoordinatesParamsOrientation)"""
+        key = (name, tool)
+        pose = self._poses.get(key)
+        if pose is None:
+            from sdk.commands.move_coordinates_command import (
+                MoveCoordinatesParamsPosition,
+                MoveCoordinatesParamsOrientation,
+            )
+
+            x, y, z, qx, qy, qz, qw = self.vector(name, tool)
+            pose = (
+                MoveCoordinatesParamsPosition(x=x, y=y, z=z),
+                MoveCoordinatesParamsOrientation(x=qx, y=qy, z=qz, w=qw),
+            )
+            self._poses[key] = pose
+        return pose
+
+
+def open_points(db_path: Path, station: str = DEFAULT_STATION,
+                json_path: Optional[Path] = None) -> Union[StationPoints, PointStore]:
+    """
+    Точки станции из базы, если файл базы существует; иначе — из JSON (coords_store).
+    База открывается только на чтение.
+    """
+    if db_path.exists():
+        return StationPoints(PointDatabase(db_path, readonly=True), station)
+    if json_path is None:
+        raise FileNotFoundError(f"Нет базы точек {db_path}")
+    return load_point_store(json_path)
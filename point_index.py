@@ -0,0 +1,236 @@
+"""
+Пространственный индекс именованных точек калибровки (coords3.json).
+
+Для каждого инструмента строится KD-дерево по позициям точек. Запросы
+«ближайшая точка» и «точки в радиусе» выполняются за O(log n) и занимают
+десятки микросекунд, поэтому их можно делать прямо в обработчике потока
+/coordinates.
+
+ProximityWatcher слушает /coordinates и отслеживает, у какой точки сейчас
+находится TCP (с гистерезисом: прибытие в arrive_radius, уход — за leave_radius).
+Это позволяет реагировать на прибытие в ячейку, не дожидаясь завершения
+команды движения:
+
+    index = PointIndex(load_point_store(Path("coords3.json")))
+    name, dist = index.nearest(0.21, -0.05, 0.12, tool="tool0")
+
+    watcher = ProximityWatcher(m, index, tool="tool1")
+    watcher.start()
+    m.move_to_coordinates_async(...)         # не ждём результат
+    watcher.wait_for_arrival("CELL_2", timeout=10.0)
+    watcher.stop()
+"""
+
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from topic_listeners import add_listener, remove_listener
+
+COORDINATES_TOPIC = "/coordinates"
+
+# Радиусы (м): прибытие ближе ARRIVE_RADIUS, уход дальше LEAVE_RADIUS
+ARRIVE_RADIUS = 0.005
+LEAVE_RADIUS = 0.010
+
+Point3 = Tuple[float, float, float]
+
+
+class KDTree:
+    """Статическое 3D KD-дерево; узлы хранятся в плоских списках"""
+
+    def __init__(self, points: Sequence[Point3], labels: Sequence[str]):
+        if len(points) != len(labels):
+            raise ValueError("points и labels должны быть одной длины")
+        self.points: List[Point3] = []
+        self.labels: List[str] = []
+        self.axes: List[int] = []
+        self.left: List[int] = []
+        self.right: List[int] = []
+        self.root = self._build(list(zip(points, labels)), 0)
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def _build(self, items: List[Tuple[Point3, str]], depth: int) -> int:
+        if not items:
+            return -1
+        axis = depth % 3
+        items.sort(key=lambda item: item[0][axis])
+        mid = len(items) // 2
+        node = len(self.points)
+        self.points.append(items[mid][0])
+        self.labels.append(items[mid][1])
+        self.axes.append(axis)
+        self.left.append(-1)
+        self.right.append(-1)
+        self.left[node] = self._build(items[:mid], depth + 1)
+        self.right[node] = self._build(items[mid + 1:], depth + 1)
+        return node
+
+    def nearest(self, query: Point3) -> Tuple[Optional[str], float]:
+        """Ближайшая точка: (метка, расстояние); (None, inf) для пустого дерева"""
+        best_label: Optional[str] = None
+        best_sq = math.inf
+        stack = [self.root] if self.root >= 0 else []
+        while stack:
+            node = stack.pop()
+            point = self.points[node]
+            dx = query[0] - point[0]
+            dy = query[1] - point[1]
+            dz = query[2] - point[2]
+            dist_sq = dx * dx + dy * dy + dz * dz
+            if dist_sq < best_sq:
+                best_sq = dist_sq
+                best_label = self.labels[node]
+
+            diff = query[self.axes[node]] - point[self.axes[node]]
+            near, far = (self.left[node], self.right[node]) if diff < 0 else (self.right[node], self.left[node])
+            # Дальнюю ветку кладём первой: она проверяется после ближней
+            if far >= 0 and diff * diff < best_sq:
+                stack.append(far)
+            if near >= 0:
+                stack.append(near)
+        return best_label, math.sqrt(best_sq)
+
+    def within_radius(self, query: Point3, radius: float) -> List[Tuple[str, float]]:
+        """Все точки не дальше radius: [(метка, расстояние)] по возрастанию расстояния"""
+        found: List[Tuple[str, float]] = []
+        radius_sq = radius * radius
+        stack = [self.root] if self.root >= 0 else []
+        while stack:
+            node = stack.pop()
+            point = self.points[node]
+            dx = query[0] - point[0]
+            dy = query[1] - point[1]
+            dz = query[2] - point[2]
+            dist_sq = dx * dx + dy * dy + dz * dz
+            if dist_sq <= radius_sq:
+                found.append((self.labels[node], math.sqrt(dist_sq)))
+
+            diff = query[self.axes[node]] - point[self.axes[node]]
+            if self.left[node] >= 0 and diff <= radius:
+                stack.append(self.left[node])
+            if self.right[node] >= 0 and diff >= -radius:
+                stack.append(self.right[node])
+        found.sort(key=lambda item: item[1])
+        return found
+
+
+class PointIndex:
+    """KD-деревья именованных точек по каждому инструменту"""
+
+    def __init__(self, coords: Mapping[str, Mapping[str, Any]]):
+        """
+        :param coords: Словарь name -> tool -> {"position": ..., ...}
+                       (содержимое coords3.json или coords_store.PointStore)
+        """
+        by_tool: Dict[str, Tuple[List[Point3], List[str]]] = {}
+        for name, tools in coords.items():
+            for tool, pose in tools.items():
+                if not isinstance(pose, dict) or "position" not in pose:
+                    continue
+                position = pose["position"]
+                points, labels = by_tool.setdefault(tool, ([], []))
+                points.append((float(position["x"]), float(position["y"]), float(position["z"])))
+                labels.append(name)
+        self.trees: Dict[str, KDTree] = {tool: KDTree(points, labels)
+                                         for tool, (points, labels) in by_tool.items()}
+        self.positions: Dict[str, Dict[str, Point3]] = {tool: dict(zip(labels, points))
+                                                        for tool, (points, labels) in by_tool.items()}
+
+    def _tree(self, tool: str) -> KDTree:
+        try:
+            return self.trees[tool]
+        except KeyError as exc:
+            raise KeyError(f"В индексе нет точек для инструмента '{tool}'") from exc
+
+    def nearest(self, x: float, y: float, z: float, tool: str = "tool0") -> Tuple[Optional[str], float]:
+        return self._tree(tool).nearest((x, y, z))
+
+    def within_radius(self, x: float, y: float, z: float, radius: float,
+                      tool: str = "tool0") -> List[Tuple[str, float]]:
+        return self._tree(tool).within_radius((x, y, z), radius)
+
+    def distance_to(self, name: str, x: float, y: float, z: float, tool: str = "tool0") -> float:
+        point = self.positions[tool][name]
+        return math.sqrt((x - point[0]) ** 2 + (y - point[1]) ** 2 + (z - point[2]) ** 2)
+
+
+class ProximityWatcher:
+    """Отслеживание ближайшей точки по потоку /coordinates с гистерезисом прибытия"""
+
+    def __init__(self, manip: Any, index: PointIndex, tool: str = "tool0",
+                 arrive_radius: float = ARRIVE_RADIUS, leave_radius: float = LEAVE_RADIUS,
+                 on_arrive: Optional[Callable[[str], None]] = None,
+                 on_leave: Optional[Callable[[str], None]] = None):
+        if leave_radius < arrive_radius:
+            raise ValueError("leave_radius должен быть не меньше arrive_radius")
+        self.manip = manip
+        self.index = index
+        self.tool = tool
+        self.arrive_radius = arrive_radius
+        self.leave_radius = leave_radius
+        self.on_arrive = on_arrive
+        self.on_leave = on_leave
+
+        self.nearest_name: Optional[str] = None
+        self.nearest_distance = math.inf
+        self.current_point: Optional[str] = None  # точка, у которой TCP сейчас «стоит»
+        self.updated_at = 0.0
+
+        self._condition = threading.Condition()
+        self._running = False
+
+    def start(self) -> None:
+        if self._running:
+            return
+        self._running = True
+        add_listener(self.manip, COORDINATES_TOPIC, self._on_coordinates)
+
+    def stop(self) -> None:
+        if not self._running:
+            return
+        self._running = False
+        remove_listener(self.manip, COORDINATES_TOPIC, self._on_coordinates)
+
+    def _on_coordinates(self, data: Dict[str, Any]) -> None:
+        pose = data.get(self.tool) if isinstance(data, dict) else None
+        if not isinstance(pose, dict) or "position" not in pose:
+            return
+        position = pose["position"]
+        self.update(float(position["x"]), float(position["y"]), float(position["z"]))
+
+    def update(self, x: float, y: float, z: float) -> None:
+        """Обработать новую позицию TCP (вызывается из потока /coordinates)"""
+        name, distance = self.index.nearest(x, y, z, self.tool)
+        arrived: Optional[str] = None
+        left: Optional[str] = None
+
+        with self._condition:
+            self.nearest_name = name
+            self.nearest_distance = distance
+            self.updated_at = time.monotonic()
+
+            current = self.current_point
+            if current is not None:
+                current_distance = distance if name == current else \
+                    self.index.distance_to(current, x, y, z, self.tool)
+                if current_distance > self.leave_radius:
+                    left = current
+                    self.current_point = None
+            if self.current_point is None and name is not None and distance <= self.arrive_radius:
+                arrived = name
+                self.current_point = name
+            self._condition.notify_all()
+
+        if left is not None and self.on_leave is not None:
+            self.on_leave(left)
+        if arrived is not None and self.on_arrive is not None:
+            self.on_arrive(arrived)
+
+    def wait_for_arrival(self, name: str, timeout: Optional[float] = None) -> bool:
+        """Дождаться, пока TCP окажется у точки name; False по таймауту"""
+        with self._condition:
+            return self._condition.wait_for(lambda: self.current_point == name, timeout)
@@ -0,0 +1,318 @@
+"""
+Адаптивный опрос источников, которые не присылают обновления сами.
+
+get_gpio_value, get_sensors_data, get_block_coordinates_from_pixy отвечают только
+на запрос, и скрипты опрашивают их с произвольным периодом (0.1 с, 0.5 с или без пауз).
+PollScheduler опрашивает все источники из одного потока-таймера:
+
+    - период источника подстраивается под то, как часто меняется значение:
+      изменилось — период уменьшается (до min_interval), не меняется — растёт (до max_interval);
+    - max_age источника — срок, дольше которого значение не должно устаревать
+      (ограничивает период сверху);
+    - общий бюджет запросов (token bucket: budget в секунду, запас burst) ограничивает
+      трафик команд; опросы сверх бюджета откладываются;
+    - get(name, max_age=...) отдаёт значение из кэша, если оно достаточно свежее, иначе
+      ставит опрос в начало очереди; одновременные запросы одного источника ждут
+      одного и того же опроса (coalescing).
+
+    scheduler = PollScheduler(budget=20.0)
+    scheduler.add_source("button", lambda: m.get_gpio_value(GPIO_BUTTON_PIN, 2.0, False),
+                         min_interval=0.05, max_interval=1.0, max_age=0.5)
+    scheduler.subscribe("button", lambda name, value: print(value))   # при изменении
+    value = scheduler.get("button", max_age=0.1)
+    scheduler.stats()
+
+Опросы выполняются по одному в потоке планировщика: у контроллера один слот команды,
+параллельные запросы всё равно мешали бы друг другу. Колбэки вызываются в том же
+потоке и должны быть быстрыми.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+DEFAULT_BUDGET = 20.0          # запросов в секунду на все источники
+DEFAULT_BURST = 5.0            # запас токенов для всплеска запросов
+CHANGE_SPEEDUP = 0.5           # множитель периода, если значение изменилось
+IDLE_SLOWDOWN = 1.5            # множитель периода, если значение не изменилось
+ERROR_BACKOFF = 2.0            # множитель периода после ошибки опроса
+LATENCY_HISTORY = 128
+
+ChangeCallback = Callable[[str, Any], None]
+
+
+def values_differ(old: Any, new: Any) -> bool:
+    return old != new
+
+
+class PollSource:
+    """Источник опроса: функция запроса, текущий период, последнее значение и счётчики"""
+
+    def __init__(self, name: str, fetch: Callable[[], Any], min_interval: float, max_interval: float,
+                 max_age: Optional[float], cost: float, changed: Callable[[Any, Any], bool]):
+        if min_interval <= 0 or max_interval < min_interval:
+            raise ValueError("Нужно 0 < min_interval <= max_interval")
+        self.name = name
+        self.fetch = fetch
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_age = max_age
+        self.cost = cost
+        self.changed = changed
+
+        self.interval = min_interval
+        self.value: Any = None
+        self.timestamp: Optional[float] = None      # time.monotonic() последнего успешного опроса
+        self.error: Optional[BaseException] = None
+        self.generation = 0                         # число завершённых опросов
+        self.due = 0.0
+        self.urgent = False
+        self.removed = False
+        self.callbacks: List[ChangeCallback] = []
+
+        self.polls = 0
+        self.changes = 0
+        self.failures = 0
+        self.coalesced = 0
+        self.latency: Deque[float] = deque(maxlen=LATENCY_HISTORY)
+
+    def effective_interval(self) -> float:
+        if self.max_age is None:
+            return self.interval
+        return max(self.min_interval, min(self.interval, self.max_age))
+
+    def age(self) -> Optional[float]:
+        return None if self.timestamp is None else time.monotonic() - self.timestamp
+
+
+class PollScheduler:
+    """Один поток-таймер на все источники опроса, с общим бюджетом запросов"""
+
+    def __init__(self, budget: float = DEFAULT_BUDGET, burst: float = DEFAULT_BURST):
+        if budget <= 0 or burst <= 0:
+            raise ValueError("budget и burst должны быть положительными")
+        self.budget = budget
+        self.burst = burst
+
+        self._sources: Dict[str, PollSource] = {}
+        self._heap: List[tuple] = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._tokens = burst
+        self._refilled_at = time.monotonic()
+        self.started_at = time.monotonic()
+        self.polls = 0             # опросов всех источников, включая удалённые
+        self.deferred = 0          # опросов, отложенных из-за бюджета
+
+    # --- Источники ---
+
+    def add_source(self, name: str, fetch: Callable[[], Any], min_interval: float = 0.1,
+                   max_interval: float = 2.0, max_age: Optional[float] = None, cost: float = 1.0,
+                   changed: Callable[[Any, Any], bool] = values_differ) -> PollSource:
+        """
+        :param fetch: Функция запроса значения (вызывается в потоке планировщика)
+        :param max_age: Значение не должно устаревать дольше (None — без ограничения)
+        :param cost: Сколько токенов бюджета стоит один опрос
+        :param changed: changed(old, new) — считать ли значение изменившимся
+        """
+        source = PollSource(name, fetch, min_interval, max_interval, max_age, cost, changed)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("PollScheduler остановлен")
+            if name in self._sources:
+                raise ValueError(f"Источник {name!r} уже добавлен")
+            self._sources[name] = source
+            self._schedule(source, time.monotonic())
+            self._ensure_thread()
+        return source
+
+    def remove_source(self, name: str) -> None:
+        with self._condition:
+            source = self._sources.pop(name, None)
+            if source is not None:
+                source.removed = True
+                self._condition.notify_all()
+
+    def source(self, name: str) -> PollSource:
+        with self._condition:
+            return self._sources[name]
+
+    def set_max_age(self, name: str, max_age: Optional[float]) -> None:
+        """Изменить срок свежести источника (например, на время ожидания объекта)"""
+        with self._condition:
+            source = self._sources[name]
+            source.max_age = max_age
+            if source.timestamp is not None:
+                due = source.timestamp + source.effective_interval()
+                if due < source.due:
+                    self._schedule(source, due)
+
+    def subscribe(self, name: str, callback: ChangeCallback) -> Callable[[], None]:
+        """callback(name, value) при каждом изменении значения; возвращает функцию отписки"""
+        with self._condition:
+            source = self._sources[name]
+            source.callbacks = source.callbacks + [callback]
+
+        def unsubscribe() -> None:
+            with self._condition:
+                source.callbacks = [c for c in source.callbacks if c is not callback]
+
+        return unsubscribe
+
+    # --- Запрос значения ---
+
+    def get(self, name: str, max_age: Optional[float] = None, timeout: Optional[float] = None) -> Any:
+        """
+        Значение источника не старше max_age секунд (None — любое уже полученное).
+        Если в кэше такого нет — внеочередной опрос; одновременные вызовы ждут одного опроса.
+        """
+        with self._condition:
+            source = self._sources[name]
+            now = time.monotonic()
+            if source.timestamp is not None and source.error is None and \
+                    (max_age is None or now - source.timestamp <= max_age):
+                return source.value
+            generation = source.generation
+            if source.urgent:
+                source.coalesced += 1
+            else:
+                source.urgent = True
+                self._schedule(source, now)
+            if not self._condition.wait_for(
+                    lambda: source.generation > generation or self._closed or source.removed, timeout):
+                raise TimeoutError(f"Опрос {name!r} не завершился за {timeout} с")
+            if source.generation == generation:
+                raise RuntimeError(f"Источник {name!r} больше не опрашивается")
+            if source.error is not None:
+                raise source.error
+            return source.value
+
+    # --- Поток планировщика ---
+
+    def _schedule(self, source: PollSource, due: float) -> None:
+        source.due = due
+        heapq.heappush(self._heap, (due, next(self._sequence), source))
+        self._condition.notify_all()
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="poll-scheduler", daemon=True)
+            self._thread.start()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.budget)
+        self._refilled_at = now
+
+    def _next_source(self) -> Optional[PollSource]:
+        """Дождаться источника, которому пора опрашиваться и на который хватает бюджета"""
+        with self._condition:
+            while True:
+                if self._closed:
+                    return None
+                # Записи удалённых и перенесённых источников пропускаем
+                while self._heap and (self._heap[0][2].removed or self._heap[0][0] != self._heap[0][2].due):
+                    heapq.heappop(self._heap)
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                due, _, source = self._heap[0]
+                now = time.monotonic()
+                if due > now:
+                    self._condition.wait(due - now)
+                    continue
+                self._refill(now)
+                if self._tokens < source.cost:
+                    self.deferred += 1
+                    heapq.heappop(self._heap)
+                    self._schedule(source, now + (source.cost - self._tokens) / self.budget)
+                    continue
+                heapq.heappop(self._heap)
+                self._tokens -= source.cost
+                return source
+
+    def _run(self) -> None:
+        while True:
+            source = self._next_source()
+            if source is None:
+                return
+            started = time.monotonic()
+            error: Optional[BaseException] = None
+            value: Any = None
+            try:
+                value = source.fetch()
+            except Exception as e:
+                error = e
+            finished = time.monotonic()
+
+            changed = False
+            with self._condition:
+                self.polls += 1
+                source.polls += 1
+                source.latency.append(finished - started)
+                if error is not None:
+                    source.failures += 1
+                    source.error = error
+                    source.interval = min(source.max_interval, source.interval * ERROR_BACKOFF)
+                else:
+                    changed = source.timestamp is None or source.changed(source.value, value)
+                    source.value = value
+                    source.timestamp = finished
+                    source.error = None
+                    if changed:
+                        source.changes += 1
+                        source.interval = max(source.min_interval, source.interval * CHANGE_SPEEDUP)
+                    else:
+                        source.interval = min(source.max_interval, source.interval * IDLE_SLOWDOWN)
+                source.generation += 1
+                source.urgent = False
+                if not source.removed:
+                    self._schedule(source, started + source.effective_interval())
+                callbacks = source.callbacks if changed else []
+                self._condition.notify_all()
+
+            if error is not None:
+                print(f"[POLL] Ошибка опроса {source.name}: {error}")
+            for callback in callbacks:
+                try:
+                    callback(source.name, value)
+                except Exception as e:
+                    print(f"[POLL] Ошибка в обработчике {source.name}: {e}")
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5.0)
+        self._thread = None
+
+    # --- Статистика ---
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            elapsed = max(time.monotonic() - self.started_at, 1e-9)
+            sources = {}
+            for name, source in self._sources.items():
+                ordered = sorted(source.latency)
+                age = source.age()
+                sources[name] = {
+                    "interval_ms": source.effective_interval() * 1000.0,
+                    "polls": source.polls,
+                    "changes": source.changes,
+                    "failures": source.failures,
+                    "coalesced": source.coalesced,
+                    "age_ms": None if age is None else age * 1000.0,
+                    "latency_p50_ms": ordered[len(ordered) // 2] * 1000.0 if ordered else 0.0,
+                }
+            return {
+                "polls": self.polls,
+                "polls_per_s": self.polls / elapsed,
+                "budget_per_s": self.budget,
+                "deferred": self.deferred,
+                "sources": sources,
+            }
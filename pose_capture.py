@@ -0,0 +1,185 @@
+"""
+Захват позы TCP по нескольким отсчётам потока /coordinates.
+
+Одиночный get_cartesian_coordinates сохраняет дрожание, которое было именно
+в момент запроса. capture_pose собирает N отсчётов за короткое окно
+(по умолчанию до 10 отсчётов за 0.4 с) и усредняет их устойчиво:
+    - позиция — медиана по каждой оси;
+    - ориентация — среднее кватернионов с выравниванием знака (q и -q — одна
+      ориентация) и нормировкой.
+Перед проверкой неподвижности отбрасываются до OUTLIER_FRACTION самых далёких
+отсчётов (одиночный сбой в потоке не должен срывать захват), а позиция
+и ориентация считаются по оставшимся. Если их разброс больше допуска, рука
+ещё движется — захват отклоняется (ArmMovingError), чтобы не записать точку «на ходу».
+
+    pose = capture_pose(manip)          # {"tool0": {"position": ..., "orientation": ...}, ...}
+"""
+
+import math
+import statistics
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from topic_listeners import add_listener, remove_listener
+
+COORDINATES_TOPIC = "/coordinates"
+
+DEFAULT_SAMPLES = 10
+DEFAULT_WINDOW_SECONDS = 0.4
+MIN_SAMPLES = 3
+
+# Допуски неподвижности: разброс позиции (м) и отклонение ориентации (градусы)
+POSITION_TOLERANCE = 0.0005
+ORIENTATION_TOLERANCE_DEGREES = 0.5
+# Доля отсчётов, которые можно отбросить как выбросы (из 10 отсчётов — 2)
+OUTLIER_FRACTION = 0.2
+
+
+class PoseCaptureError(RuntimeError):
+    """Не удалось получить усреднённую позу (мало отсчётов, нет потока)"""
+
+
+class ArmMovingError(PoseCaptureError):
+    """Отсчёты расходятся сильнее допуска — рука не остановилась"""
+
+
+def _trim_count(count: int) -> int:
+    """Сколько худших отсчётов можно отбросить, оставив не меньше MIN_SAMPLES"""
+    return max(0, min(int(count * OUTLIER_FRACTION), count - MIN_SAMPLES))
+
+
+def _median_position(positions: Sequence[Dict[str, float]]) -> Tuple[Dict[str, float], float]:
+    """
+    Медиана по осям и разброс (м): максимальное отклонение от медианы после того,
+    как отброшены _trim_count самых далёких отсчётов.
+    """
+    points = [tuple(float(p[axis]) for axis in ("x", "y", "z")) for p in positions]
+
+    def median_of(values: Sequence[Tuple[float, ...]]) -> Tuple[float, ...]:
+        return tuple(statistics.median(v[i] for v in values) for i in range(3))
+
+    def distance(v: Tuple[float, ...], m: Tuple[float, ...]) -> float:
+        return math.sqrt(sum((a - b) ** 2 for a, b in zip(v, m)))
+
+    median = median_of(points)
+    inliers = sorted(points, key=lambda v: distance(v, median))[:len(points) - _trim_count(len(points))]
+    median = median_of(inliers)
+    spread = max(distance(v, median) for v in inliers)
+    return dict(zip(("x", "y", "z"), median)), spread
+
+
+def _quaternion_mean(quats: Sequence[Tuple[float, ...]]) -> Tuple[float, ...]:
+    reference = quats[0]
+    acc = [0.0, 0.0, 0.0, 0.0]
+    for q in quats:
+        sign = -1.0 if sum(a * b for a, b in zip(q, reference)) < 0.0 else 1.0
+        for i in range(4):
+            acc[i] += sign * q[i]
+    norm = math.sqrt(sum(c * c for c in acc))
+    if norm == 0.0:
+        raise PoseCaptureError("Вырожденное среднее ориентации")
+    return tuple(c / norm for c in acc)
+
+
+def _angle_degrees(q: Tuple[float, ...], mean: Tuple[float, ...]) -> float:
+    qnorm = math.sqrt(sum(c * c for c in q)) or 1.0
+    dot = abs(sum(a * b for a, b in zip(q, mean))) / qnorm
+    return math.degrees(2.0 * math.acos(min(1.0, dot)))
+
+
+def _mean_orientation(orientations: Sequence[Dict[str, float]]) -> Tuple[Dict[str, float], float]:
+    """
+    Нормированное среднее кватернионов и разброс (градусы): максимальное угловое
+    отклонение после того, как отброшены _trim_count самых далёких отсчётов.
+    """
+    quats = [(float(q["x"]), float(q["y"]), float(q["z"]), float(q["w"])) for q in orientations]
+    mean = _quaternion_mean(quats)
+    inliers = sorted(quats, key=lambda q: _angle_degrees(q, mean))[:len(quats) - _trim_count(len(quats))]
+    mean = _quaternion_mean(inliers)
+    max_angle = max(_angle_degrees(q, mean) for q in inliers)
+    return {"x": mean[0], "y": mean[1], "z": mean[2], "w": mean[3]}, max_angle
+
+
+def average_poses(samples: Sequence[Dict[str, Any]],
+                  position_tolerance: float = POSITION_TOLERANCE,
+                  orientation_tolerance_degrees: float = ORIENTATION_TOLERANCE_DEGREES) -> Dict[str, Any]:
+    """
+    Усреднить отсчёты вида {tool: {"position": ..., "orientation": ...}}.
+    Поля, не являющиеся позами, берутся из последнего отсчёта.
+    """
+    if len(samples) < MIN_SAMPLES:
+        raise PoseCaptureError(f"Недостаточно отсчётов: {len(samples)} < {MIN_SAMPLES}")
+
+    result: Dict[str, Any] = dict(samples[-1])
+    for tool, last in samples[-1].items():
+        if not isinstance(last, dict) or "position" not in last or "orientation" not in last:
+            continue
+        poses = [s[tool] for s in samples if isinstance(s.get(tool), dict)]
+
+        position, spread = _median_position([p["position"] for p in poses])
+        if spread > position_tolerance:
+            raise ArmMovingError(f"{tool}: разброс позиции {spread * 1000:.2f} мм "
+                                 f"> {position_tolerance * 1000:.2f} мм")
+
+        orientation, angle = _mean_orientation([p["orientation"] for p in poses])
+        if angle > orientation_tolerance_degrees:
+            raise ArmMovingError(f"{tool}: разброс ориентации {angle:.2f}° "
+                                 f"> {orientation_tolerance_degrees:.2f}°")
+
+        result[tool] = dict(last, position=position, orientation=orientation)
+    return result
+
+
+class _SampleCollector:
+    """Накопление отсчётов из обработчика топика до N штук"""
+
+    def __init__(self, count: int):
+        self.count = count
+        self.samples: List[Dict[str, Any]] = []
+        self.done = threading.Event()
+        self._lock = threading.Lock()
+
+    def __call__(self, data: Dict[str, Any]) -> None:
+        if not isinstance(data, dict):
+            return
+        with self._lock:
+            if len(self.samples) < self.count:
+                self.samples.append(data)
+            if len(self.samples) >= self.count:
+                self.done.set()
+
+
+def collect_samples(manip: Any, count: int = DEFAULT_SAMPLES,
+                    window_seconds: float = DEFAULT_WINDOW_SECONDS) -> List[Dict[str, Any]]:
+    """
+    Собрать до count отсчётов /coordinates за window_seconds.
+    """
+    collector = _SampleCollector(count)
+    add_listener(manip, COORDINATES_TOPIC, collector)
+    try:
+        collector.done.wait(window_seconds)
+    finally:
+        remove_listener(manip, COORDINATES_TOPIC, collector)
+    with collector._lock:
+        return list(collector.samples)
+
+
+def capture_pose(manip: Any,
+                 samples: int = DEFAULT_SAMPLES,
+                 window_seconds: float = DEFAULT_WINDOW_SECONDS,
+                 position_tolerance: float = POSITION_TOLERANCE,
+                 orientation_tolerance_degrees: float = ORIENTATION_TOLERANCE_DEGREES,
+                 stats: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Усреднённая поза по потоку /coordinates.
+    :raises ArmMovingError: рука движется (разброс больше допуска)
+    :raises PoseCaptureError: поток не дал достаточно отсчётов за окно
+    :param stats: Если передан словарь, в него пишутся samples и seconds
+    """
+    started = time.monotonic()
+    collected = collect_samples(manip, samples, window_seconds)
+    if stats is not None:
+        stats["samples"] = len(collected)
+        stats["seconds"] = time.monotonic() - started
+    return average_poses(collected, position_tolerance, orientation_tolerance_degrees)
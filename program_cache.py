@@ -0,0 +1,143 @@
+"""
+Кэш JSON-программ на стороне клиента.
+
+Программа идентифицируется хэшем своего содержимого. Первый запуск отправляет
+JSON через run_program_json под производным именем (контроллер сохраняет
+программу), все последующие запуски того же содержимого идут через
+run_program_by_name — без повторной передачи и разбора JSON.
+
+Записи ключуются хэшем содержимого, и все загруженные версии остаются в кэше:
+если под одним логическим именем чередуются разные программы (например,
+разные перестановки для "sort_with_one_buffer"), каждая загружается один раз.
+
+Что программа, загруженная через run_program_json, потом доступна через
+run_program_by_name, — предположение: в этом репозитории нет описания того,
+как контроллер хранит программы, и проверить это без контроллера нельзя.
+Поэтому при ошибке запуска по имени запись удаляется (invalidations), ошибка
+пробрасывается дальше, а следующий запуск загрузит программу заново через
+run_program_json. Повторять автоматически нельзя: ошибка могла случиться
+посреди движения.
+
+Пример:
+
+    cache = ProgramCache(m)
+    cache.run("sort", program_json)   # промах: загрузка + запуск
+    cache.run("sort", program_json)   # попадание: запуск по имени
+    print(cache.stats())
+"""
+
+import hashlib
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+def program_digest(program_json: Dict[str, Any]) -> str:
+    """SHA-256 канонического представления программы (ключи отсортированы, без пробелов)"""
+    canonical = json.dumps(program_json, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ProgramCache:
+    """Загрузка программы один раз и запуск по имени при совпадении содержимого"""
+
+    def __init__(self, manipulator: Any, prefix: str = "cached", index_path: Optional[Path] = None):
+        """
+        :param manipulator: Объект манипулятора (run_program_json / run_program_by_name)
+        :param prefix: Префикс производных имён программ на контроллере
+        :param index_path: Файл для сохранения индекса между запусками скрипта.
+                           Имеет смысл, только пока контроллер не перезагружался.
+        """
+        self.manipulator = manipulator
+        self.prefix = prefix
+        self.index_path = index_path
+
+        # хэш содержимого -> {"name": логическое имя, "stored": производное имя}
+        self._entries: Dict[str, Dict[str, str]] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.bytes_saved = 0
+
+        if index_path is not None and index_path.exists():
+            self._load_index()
+
+    def derived_name(self, name: str, program_json: Dict[str, Any]) -> str:
+        """Имя, под которым версия программы хранится на контроллере"""
+        return f"{self.prefix}_{name}_{program_digest(program_json)[:16]}"
+
+    def run(self, name: str, program_json: Dict[str, Any], timeout_seconds: float = 60.0,
+            throw_error: bool = True, enable_feedback: bool = False) -> None:
+        """
+        Запустить программу: по имени, если это содержимое уже загружено,
+        иначе загрузить через run_program_json.
+        """
+        digest = program_digest(program_json)
+        stored_name = self.derived_name(name, program_json)
+        # enable_feedback передаётся, только если он нужен: у MEdu из SDK такого аргумента может не быть
+        kwargs = {"enable_feedback": True} if enable_feedback else {}
+
+        with self._lock:
+            hit = digest in self._entries
+            if hit:
+                self.hits += 1
+                self.bytes_saved += len(json.dumps(program_json, ensure_ascii=False).encode("utf-8"))
+            else:
+                self.misses += 1
+
+        if hit:
+            try:
+                self.manipulator.run_program_by_name(stored_name, timeout_seconds, throw_error, **kwargs)
+            except Exception as e:
+                print(f"[PROGRAM CACHE] Запуск {stored_name} по имени не удался ({e}), запись удалена")
+                with self._lock:
+                    if self._entries.pop(digest, None) is not None:
+                        self.invalidations += 1
+                        self._save_index()
+                raise
+            return
+
+        self.manipulator.run_program_json(stored_name, program_json, timeout_seconds, throw_error, **kwargs)
+        with self._lock:
+            self._entries[digest] = {"name": name, "stored": stored_name}
+            self._save_index()
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """Забыть загруженные версии программы (или все программы, если name не задан)"""
+        with self._lock:
+            stale = [digest for digest, entry in self._entries.items() if name is None or entry["name"] == name]
+            for digest in stale:
+                del self._entries[digest]
+            self.invalidations += len(stale)
+            self._save_index()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "bytes_saved": self.bytes_saved,
+            }
+
+    def _load_index(self) -> None:
+        try:
+            loaded = json.loads(self.index_path.read_text(encoding="utf-8"))
+            if isinstance(loaded, dict):
+                # Индекс старого формата (имя -> производное имя) пропускается: программы загрузятся заново
+                self._entries = {str(k): {"name": str(v["name"]), "stored": str(v["stored"])}
+                                 for k, v in loaded.items() if isinstance(v, dict) and "stored" in v}
+        except Exception as e:
+            print(f"[PROGRAM CACHE] Не удалось прочитать индекс {self.index_path}: {e}")
+
+    def _save_index(self) -> None:
+        if self.index_path is None:
+            return
+        try:
+            self.index_path.write_text(json.dumps(self._entries, ensure_ascii=False, indent=2), encoding="utf-8")
+        except OSError as e:
+            print(f"[PROGRAM CACHE] Не удалось сохранить индекс {self.index_path}: {e}")
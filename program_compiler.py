@@ -0,0 +1,230 @@
+"""
+Компилятор последовательностей pick-and-place в одну JSON-программу контроллера.
+
+Вместо десятка отдельных команд (move_to_coordinates, manage_gripper), каждая
+из которых ждёт подтверждения, весь план отправляется одной командой
+run_program_json. Прогресс по узлам программы приходит через feedback
+(Manipulator._on_run_feedback) и пересылается в обработчик on_progress.
+
+Feedback по узлам есть только у hehe.Manipulator (add_run_feedback_handler).
+С MEdu из установленного SDK программа запускается без feedback, а узлы
+отмечаются выполненными после успешного завершения всей программы.
+
+Пример:
+
+    moves = plan_sort_with_one_buffer([0, 2, 3, 4, 1])      # из rab.py
+    program = compile_pick_and_place(moves, data, rotation_for=_target_rotation_for)
+    run_compiled_program(m, program)
+"""
+
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Типы узлов программы. Если прошивка контроллера ожидает другие имена —
+# достаточно поправить эти константы.
+NODE_SEQUENCE = "Sequence"
+NODE_MOVE_TO_POSE = "MoveToPose"
+NODE_GRIPPER = "ManageGripper"
+
+# Оценка длительности одного узла для вычисления общего таймаута программы
+MOVE_NODE_SECONDS = 10.0
+GRIPPER_NODE_SECONDS = 2.0
+PROGRAM_TIMEOUT_MARGIN_SECONDS = 30.0
+
+CoordinatesData = Dict[str, Dict[str, Dict[str, Any]]]
+Move = Tuple[str, str]
+
+
+@dataclass
+class CompiledProgram:
+    """Скомпилированная программа: имя, JSON и список имён узлов в порядке выполнения"""
+    name: str
+    json: Dict[str, Any]
+    node_names: List[str] = field(default_factory=list)
+    estimated_seconds: float = 0.0
+
+    @property
+    def timeout_seconds(self) -> float:
+        return self.estimated_seconds + PROGRAM_TIMEOUT_MARGIN_SECONDS
+
+
+class ProgramBuilder:
+    """Пошаговая сборка линейной программы из движений и команд захвата"""
+
+    def __init__(self, name: str, coords: CoordinatesData,
+                 velocity: float = 0.2, acceleration: float = 0.2):
+        self.name = name
+        self.coords = coords
+        self.velocity = velocity
+        self.acceleration = acceleration
+        self._children: List[Dict[str, Any]] = []
+        self._estimated_seconds = 0.0
+
+    def _node_name(self, label: str) -> str:
+        # Порядковый номер делает имена уникальными: по ним сопоставляется feedback
+        return f"n{len(self._children):03d}_{label}"
+
+    def move_pose(self, point: str, tool: str = "tool0",
+                  velocity: Optional[float] = None, acceleration: Optional[float] = None) -> "ProgramBuilder":
+        """Добавить движение в точку point/tool из файла координат"""
+        try:
+            pose = self.coords[point][tool]
+            position = pose["position"]
+            orientation = pose["orientation"]
+        except KeyError as exc:
+            raise KeyError(f"Нет точки '{point}' и/или инструмента '{tool}' в координатах") from exc
+
+        self._children.append({
+            "type": NODE_MOVE_TO_POSE,
+            "name": self._node_name(f"move_{point}_{tool}"),
+            "params": {
+                "position": {"x": position["x"], "y": position["y"], "z": position["z"]},
+                "orientation": {"x": orientation["x"], "y": orientation["y"],
+                                "z": orientation["z"], "w": orientation["w"]},
+                "velocity_factor": self.velocity if velocity is None else velocity,
+                "acceleration_factor": self.acceleration if acceleration is None else acceleration,
+            },
+        })
+        self._estimated_seconds += MOVE_NODE_SECONDS
+        return self
+
+    def gripper(self, rotation: float, angle: float) -> "ProgramBuilder":
+        """Добавить команду захвата (поворот кисти и сжатие)"""
+        self._children.append({
+            "type": NODE_GRIPPER,
+            "name": self._node_name(f"gripper_{angle:g}"),
+            "params": {"rotation": rotation, "gripper": angle},
+        })
+        self._estimated_seconds += GRIPPER_NODE_SECONDS
+        return self
+
+    def build(self) -> CompiledProgram:
+        program_json = {
+            "name": self.name,
+            "root": {
+                "type": NODE_SEQUENCE,
+                "name": f"{self.name}_root",
+                "children": list(self._children),
+            },
+        }
+        return CompiledProgram(
+            name=self.name,
+            json=program_json,
+            node_names=[child["name"] for child in self._children],
+            estimated_seconds=self._estimated_seconds,
+        )
+
+
+def compile_pick_and_place(moves: Sequence[Move],
+                           coords: CoordinatesData,
+                           *,
+                           rotation_for: Callable[[str], float],
+                           grip_open: float = 15,
+                           grip_close: float = 45,
+                           velocity: float = 0.2,
+                           acceleration: float = 0.2,
+                           name: str = "pick_and_place") -> CompiledProgram:
+    """
+    Скомпилировать список перемещений (откуда, куда) в одну программу.
+    Шаги повторяют rab.pick_from / rab.place_to: открыть захват с нужным поворотом,
+    над точкой (tool0), вниз (tool1), схватить, вверх; затем то же для укладки.
+    """
+    builder = ProgramBuilder(name, coords, velocity, acceleration)
+    for src, dst in moves:
+        rotation = rotation_for(src)
+        builder.gripper(rotation, grip_open)
+        builder.move_pose(src, "tool0")
+        builder.move_pose(src, "tool1")
+        builder.gripper(rotation, grip_close)
+        builder.move_pose(src, "tool0")
+
+        rotation = rotation_for(dst)
+        builder.gripper(rotation, grip_close)
+        builder.move_pose(dst, "tool0")
+        builder.move_pose(dst, "tool1")
+        builder.gripper(rotation, grip_open)
+        builder.move_pose(dst, "tool0")
+    return builder.build()
+
+
+class ProgramProgress:
+    """Отслеживание прогресса выполнения программы по feedback узлов"""
+
+    def __init__(self, program: CompiledProgram,
+                 on_progress: Optional[Callable[[int, int, str], None]] = None):
+        self.program = program
+        self.on_progress = on_progress
+        self.completed: List[str] = []
+        self.started_at = time.monotonic()
+        self._known_nodes = set(program.node_names)
+
+    def __call__(self, feedback: dict) -> None:
+        node = feedback.get('node_name')
+        if node not in self._known_nodes or feedback.get('current_status') != 'SUCCESS':
+            return
+        if node in self.completed:
+            return
+        self.completed.append(node)
+        done, total = len(self.completed), len(self.program.node_names)
+        if self.on_progress is not None:
+            self.on_progress(done, total, node)
+        else:
+            elapsed = time.monotonic() - self.started_at
+            print(f"[PROGRAM] {self.program.name}: {done}/{total} {node} ({elapsed:.1f} с)")
+
+    def complete_remaining(self) -> None:
+        """Отметить выполненными узлы, по которым не было feedback (программа завершилась успешно)"""
+        remaining = [node for node in self.program.node_names if node not in self.completed]
+        if not remaining:
+            return
+        total = len(self.program.node_names)
+        for node in remaining:
+            self.completed.append(node)
+            if self.on_progress is not None:
+                self.on_progress(len(self.completed), total, node)
+        if self.on_progress is None:
+            elapsed = time.monotonic() - self.started_at
+            print(f"[PROGRAM] {self.program.name}: {total}/{total} узлов выполнено ({elapsed:.1f} с)")
+
+
+def supports_run_feedback(manipulator: Any) -> bool:
+    """Есть ли у манипулятора подписка на feedback узлов (hehe.Manipulator)"""
+    return hasattr(manipulator, "add_run_feedback_handler")
+
+
+def run_compiled_program(manipulator: Any,
+                         program: CompiledProgram,
+                         on_progress: Optional[Callable[[int, int, str], None]] = None,
+                         timeout_seconds: Optional[float] = None,
+                         cache: Optional[Any] = None) -> ProgramProgress:
+    """
+    Выполнить программу одной командой run_program_json (один round trip)
+    и транслировать прогресс узлов в on_progress(done, total, node_name).
+    Если передан cache (program_cache.ProgramCache), повторные запуски того же
+    содержимого идут по имени, без передачи JSON.
+    Без feedback (MEdu из SDK) on_progress вызывается для всех узлов после завершения программы.
+    """
+    progress = ProgramProgress(program, on_progress)
+    timeout = program.timeout_seconds if timeout_seconds is None else timeout_seconds
+    feedback = supports_run_feedback(manipulator)
+    if feedback:
+        manipulator.add_run_feedback_handler(progress)
+    try:
+        if cache is not None:
+            cache.run(program.name, program.json, timeout, True, enable_feedback=feedback)
+        elif feedback:
+            manipulator.run_program_json(
+                program.name,
+                program.json,
+                timeout_seconds=timeout,
+                throw_error=True,
+                enable_feedback=True,
+            )
+        else:
+            manipulator.run_program_json(program.name, program.json, timeout_seconds=timeout, throw_error=True)
+    finally:
+        if feedback:
+            manipulator.remove_run_feedback_handler(progress)
+    progress.complete_remaining()
+    return progress
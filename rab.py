@@ -3,9 +3,8 @@
 
 import sys
 import time
-import json
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, List, Optional, Tuple
 
 from sdk.commands.move_coordinates_command import (
     MoveCoordinatesParamsPosition,
@@ -13,6 +12,10 @@ from sdk.commands.move_coordinates_command import (
 )
 from sdk.manipulators.medu import MEdu
 
+from point_db import open_points
+from program_cache import ProgramCache
+from program_compiler import compile_pick_and_place, run_compiled_program
+
 # ===================== ПОДКЛЮЧЕНИЕ =====================
 
 HOST = "10.5.0.2"
@@ -21,6 +24,8 @@ LOGIN = "user"
 PASSWORD = "pass"
 
 COORDS_FILE = Path("coords3.json")
+POINTS_DB = Path("points.db")
+STATION = "default"
 
 CELL_DESCENT_ROT = -5.0     # градусы, перед спуском в любую CELL_*
 BUFFER_DESCENT_ROT = -11.0  # градусы, перед спуском в BUFFER/BUFF
@@ -34,12 +39,12 @@ GRIP_ROTATION = 0
 VEL = 0.2
 ACC = 0.2
 
-# === КООРДИНАТЫ: ТЕПЕРЬ ИЗ coords3.json ===
+# === КООРДИНАТЫ: ИЗ БАЗЫ ТОЧЕК (points.db) ИЛИ coords3.json ===
+# Из базы точки читаются по мере обращения; без базы — JSON через бинарный кэш
 try:
-    with COORDS_FILE.open("r", encoding="utf-8") as f:
-        data: Dict[str, Dict[str, Dict[str, Any]]] = json.load(f)
+    data = open_points(POINTS_DB, STATION, COORDS_FILE)
 except Exception as e:
-    print(f"[!] Не удалось прочитать {COORDS_FILE}: {e}")
+    print(f"[!] Не удалось прочитать точки ({POINTS_DB} / {COORDS_FILE}): {e}")
     sys.exit(1)
 
 
@@ -50,9 +55,16 @@ def move(m: MEdu, x: float, y: float, z: float, ox: float, oy: float, oz: float,
     """
     Блокирующий move: ждём завершения траектории, чтобы следующая команда не «съела» промежуточную точку.
     """
+    move_to(m, MoveCoordinatesParamsPosition(x=x, y=y, z=z), MoveCoordinatesParamsOrientation(x=ox, y=oy, z=oz, w=ow),
+            velocity, acceleration, timeout=timeout)
+
+
+def move_to(m: MEdu, position: MoveCoordinatesParamsPosition, orientation: MoveCoordinatesParamsOrientation,
+            velocity: float = VEL, acceleration: float = ACC, *, timeout: float = 60.0) -> None:
+    """Блокирующий move по готовым объектам позиции/ориентации."""
     prom = m.move_to_coordinates(
-        MoveCoordinatesParamsPosition(x=x, y=y, z=z),
-        MoveCoordinatesParamsOrientation(x=ox, y=oy, z=oz, w=ow),
+        position,
+        orientation,
         velocity_scaling_factor=velocity,
         acceleration_scaling_factor=acceleration
     )
@@ -65,9 +77,8 @@ def move(m: MEdu, x: float, y: float, z: float, ox: float, oy: float, oz: float,
 
 
 def move_pose(m: MEdu, cell: str, tool: str = "tool0", v: float = VEL, a: float = ACC) -> None:
-    p = data[cell][tool]["position"]
-    o = data[cell][tool]["orientation"]
-    move(m, p["x"], p["y"], p["z"], o["x"], o["y"], o["z"], o["w"], v, a)
+    position, orientation = data.pose(cell, tool)
+    move_to(m, position, orientation, v, a)
 
 
 def go_via_home(m: MEdu, cell: str, tool: str = "tool0", v: float = VEL, a: float = ACC) -> None:
@@ -163,9 +174,10 @@ def end(m: MEdu) -> None:
 
 
 # ===================== СТАРЫЙ АЛГОРИТМ СОРТИРОВКИ (НЕ ИСПОЛЬЗУЕМ) =====================
-# Оставлен без изменений, но теперь не вызывается, чтобы соблюдать условие задачи.
+# Не вызывается из main, чтобы соблюдать условие задачи. План перемещений считается
+# отдельно и может выполняться как по шагам, так и одной JSON-программой.
 
-def sort_with_one_buffer_and_move(m: MEdu, A: List[int]) -> None:
+def plan_sort_cycles(A: List[int]) -> List[Tuple[int, List[Tuple[str, str]]]]:
     """
     A — 1-индексный список актуальной расстановки кубиков по клеткам 1..n.
     Цель: добиться A[i] == i. Доступны клетки CELL_1..CELL_n и BUFFER.
@@ -173,8 +185,11 @@ def sort_with_one_buffer_and_move(m: MEdu, A: List[int]) -> None:
     - из начала цикла переносим кубик в BUFFER,
     - протягиваем правильные кубики на их места по цепочке,
     - замыкаем цикл, забирая из BUFFER.
+    Возвращает циклы: (клетка начала цикла, перемещения (откуда, куда)); сам A не изменяется.
     """
+    A = list(A)
     n = len(A) - 1
+    cycles: List[Tuple[int, List[Tuple[str, str]]]] = []
     # Быстрый доступ: pos[val] = где стоит кубик с номером val
     pos = [0]*(n+1)
     for i in range(1, n+1):
@@ -184,11 +199,12 @@ def sort_with_one_buffer_and_move(m: MEdu, A: List[int]) -> None:
         if A[start] == start:
             continue
 
-        print(f"[ЦИКЛ] Начинаю цикл от клетки {start}: кубик {A[start]} не на месте")
+        moves: List[Tuple[str, str]] = []
+        cycles.append((start, moves))
 
         # 1) В BUFFER уводим кубик из клетки start
         buf_val = A[start]
-        move_cube(m, f"CELL_{start}", "BUFFER")
+        moves.append((f"CELL_{start}", "BUFFER"))
         A[start] = None          # дырка появилась в start
         hole = start
 
@@ -199,7 +215,7 @@ def sort_with_one_buffer_and_move(m: MEdu, A: List[int]) -> None:
                 break  # пора замыкать цикл
 
             p = pos[need]            # где сейчас нужный кубик
-            move_cube(m, f"CELL_{p}", f"CELL_{hole}")  # ставим его на место
+            moves.append((f"CELL_{p}", f"CELL_{hole}"))  # ставим его на место
 
             # Обновляем структуру данных
             pos[A[p]] = hole         # кубик need уехал в hole
@@ -208,11 +224,72 @@ def sort_with_one_buffer_and_move(m: MEdu, A: List[int]) -> None:
             hole = p
 
         # 3) Замыкаем цикл: ставим кубик из BUFFER на своё целевое место (в текущую дырку)
-        move_cube(m, "BUFFER", f"CELL_{hole}")
+        moves.append(("BUFFER", f"CELL_{hole}"))
         A[hole] = buf_val
         pos[buf_val] = hole
 
+    return cycles
+
+
+def plan_sort_with_one_buffer(A: List[int]) -> List[Tuple[str, str]]:
+    """Все перемещения сортировки подряд (откуда, куда)"""
+    return [move for _, moves in plan_sort_cycles(A) for move in moves]
+
+
+def sort_with_one_buffer_and_move(m: MEdu, A: List[int]) -> None:
+    """
+    Сортировка кубиков по плану plan_sort_cycles: каждое перемещение —
+    отдельные команды move/gripper с ожиданием подтверждения.
+    """
+    for start, moves in plan_sort_cycles(A):
+        print(f"[ЦИКЛ] Начинаю цикл от клетки {start}: кубик {A[start]} не на месте")
+        for src, dst in moves:
+            move_cube(m, src, dst)
         print(f"[ЦИКЛ] Готово: цикл, начинавшийся в {start}, закрыт")
+    A[1:] = range(1, len(A))
+
+    print("[✓] Сортировка завершена")
+
+
+def sort_with_one_buffer_as_program(m: MEdu, A: List[int], cache: Optional[ProgramCache] = None) -> None:
+    """
+    То же, что sort_with_one_buffer_and_move, но весь план компилируется
+    в одну JSON-программу и выполняется за один round trip к контроллеру.
+    С cache повторная сортировка той же расстановки запускается по имени программы.
+    """
+    cycles = plan_sort_cycles(A)
+    moves = [move for _, cycle_moves in cycles for move in cycle_moves]
+    if not moves:
+        print("[✓] Кубики уже на своих местах")
+        return
+
+    program = compile_pick_and_place(
+        moves,
+        data,
+        rotation_for=_target_rotation_for,
+        grip_open=GRIP_OPEN_ANGLE,
+        grip_close=GRIP_CLOSE_ANGLE,
+        velocity=VEL,
+        acceleration=ACC,
+        name="sort_with_one_buffer",
+    )
+    print(f"[PROGRAM] {len(moves)} перемещений → {len(program.node_names)} узлов в одной программе")
+
+    # Узел, после которого цикл закрыт -> клетка начала цикла
+    nodes_per_move = len(program.node_names) // len(moves)
+    cycle_ends: Dict[int, int] = {}
+    done_moves = 0
+    for start, cycle_moves in cycles:
+        print(f"[ЦИКЛ] Цикл от клетки {start}: кубик {A[start]} не на месте, перемещений: {len(cycle_moves)}")
+        done_moves += len(cycle_moves)
+        cycle_ends[done_moves * nodes_per_move] = start
+
+    def on_progress(done: int, total: int, node: str) -> None:
+        if done in cycle_ends:
+            print(f"[ЦИКЛ] Готово: цикл, начинавшийся в {cycle_ends[done]}, закрыт ({done}/{total} узлов)")
+
+    run_compiled_program(m, program, on_progress=on_progress, cache=cache)
+    A[1:] = range(1, len(A))
 
     print("[✓] Сортировка завершена")
 
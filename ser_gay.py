@@ -23,6 +23,10 @@ from sdk.commands.move_coordinates_command import (
 from sdk.utils.enums import  ServoControlType
 import time
 import threading
+from pathlib import Path
+
+from telemetry_recorder import TelemetryRecorder, TelemetryReader
+from state_history import RingBuffer
 
 # ============================================================================
 # ГЛОБАЛЬНЫЕ НАСТРОЙКИ
@@ -39,6 +43,10 @@ PASSWORD = "pass"           # Пароль
 # GPIO пин для светодиода
 GPIO_LED_PIN = "/dev/gpiochip4/e1_pin"
 
+# Сколько последних отсчётов хранить в истории суставов/координат
+HISTORY_CAPACITY = 1024
+JOINT_NAMES = ('povorot_osnovaniya', 'privod_plecha', 'privod_strely')
+
 
 # ============================================================================
 # ФУНКЦИИ ДЛЯ ВЫПОЛНЕНИЯ
@@ -357,17 +365,12 @@ def subscribe_joints_and_move(manipulator):
     print("=" * 60)
 
     update_count = [0]
-    joints_history = []
+    joints_history = RingBuffer(JOINT_NAMES, HISTORY_CAPACITY)
 
     def joints_callback(data):
         """Callback для подписки на суставы"""
         update_count[0] += 1
-        joints_history.append({
-            'povorot_osnovaniya': data.get('povorot_osnovaniya', 0),
-            'privod_plecha': data.get('privod_plecha', 0),
-            'privod_strely': data.get('privod_strely', 0),
-            'time': time.time()
-        })
+        joints_history.append(time.monotonic(), [data.get(name, 0) for name in JOINT_NAMES])
 
         if update_count[0] % 5 == 0:
             print(f"   🔧 Обновление {update_count[0]}: "
@@ -413,7 +416,10 @@ def subscribe_joints_and_move(manipulator):
     # Статистика
     print(f"\n4. Статистика:")
     print(f"   Всего обновлений: {update_count[0]}")
-    print(f"   Записано в историю: {len(joints_history)}")
+    print(f"   Записано в историю: {joints_history.total} (хранится последних: {len(joints_history)})")
+    window = joints_history.last()
+    if len(window) >= 2:
+        print(f"   Пиковая скорость суставов: {window.peak_speed():.3f} рад/с")
 
     print("\n✅ Тест подписки на суставы завершен!")
 
@@ -431,7 +437,7 @@ def track_coordinates_polling(manipulator):
     print("=" * 60)
     print("💡 Альтернатива подписке: опрос координат каждые 100 мс")
 
-    coords_history = []
+    coords_history = RingBuffer(('x', 'y', 'z'), HISTORY_CAPACITY)
     stop_tracking = [False]
 
     def tracking_thread():
@@ -439,15 +445,11 @@ def track_coordinates_polling(manipulator):
         while not stop_tracking[0]:
             try:
                 coords = manipulator.get_cartesian_coordinates()
-                coords_history.append({
-                    'x': coords.get('x', 0),
-                    'y': coords.get('y', 0),
-                    'z': coords.get('z', 0),
-                    'time': time.time()
-                })
-
-                if len(coords_history) % 10 == 0:
-                    print(f"   📍 Опрос {len(coords_history)}: "
+                coords_history.append(time.monotonic(),
+                                      [coords.get('x', 0), coords.get('y', 0), coords.get('z', 0)])
+
+                if coords_history.total % 10 == 0:
+                    print(f"   📍 Опрос {coords_history.total}: "
                           f"X={coords.get('x', 0):.3f}, "
                           f"Y={coords.get('y', 0):.3f}, "
                           f"Z={coords.get('z', 0):.3f}")
@@ -461,7 +463,7 @@ def track_coordinates_polling(manipulator):
     thread = threading.Thread(target=tracking_thread, daemon=True)
     thread.start()
     time.sleep(2)
-    print(f"   ✅ Отслеживание активно (записей: {len(coords_history)})")
+    print(f"   ✅ Отслеживание активно (записей: {coords_history.total})")
 
     # Выполняем движения
     print("\n2. Движение с отслеживанием координат...")
@@ -482,7 +484,7 @@ def track_coordinates_polling(manipulator):
             velocity_scaling_factor=0.15
         )
         time.sleep(4)
-        print(f"   ✅ Достигнута (записей: {len(coords_history)})")
+        print(f"   ✅ Достигнута (записей: {coords_history.total})")
 
     # Останавливаем отслеживание
     print("\n3. Остановка отслеживания...")
@@ -491,14 +493,15 @@ def track_coordinates_polling(manipulator):
 
     # Статистика
     print(f"\n4. Статистика отслеживания:")
-    print(f"   Всего записей: {len(coords_history)}")
+    print(f"   Всего записей: {coords_history.total} (хранится последних: {len(coords_history)})")
     print(f"   Частота опроса: ~10 Гц (каждые 100 мс)")
 
-    if len(coords_history) >= 2:
-        first = coords_history[0]
-        last = coords_history[-1]
-        print(f"\n   Первая запись: X={first['x']:.3f}, Y={first['y']:.3f}, Z={first['z']:.3f}")
-        print(f"   Последняя запись: X={last['x']:.3f}, Y={last['y']:.3f}, Z={last['z']:.3f}")
+    window = coords_history.last()
+    if len(window) >= 2:
+        x, y, z = (window.channel(axis) for axis in ('x', 'y', 'z'))
+        print(f"\n   Первая запись: X={x[0]:.3f}, Y={y[0]:.3f}, Z={z[0]:.3f}")
+        print(f"   Последняя запись: X={x[-1]:.3f}, Y={y[-1]:.3f}, Z={z[-1]:.3f}")
+        print(f"   Пиковая скорость TCP: {window.peak_vector_speed():.3f} м/с")
 
     print("\n✅ Отслеживание координат завершено!")
 
@@ -633,6 +636,47 @@ def play_audio_test(manipulator):
 # ГЛАВНАЯ ФУНКЦИЯ
 # ============================================================================
 
+def record_telemetry(manipulator):
+    """
+    Запись /joint_states и /coordinates в бинарные файлы во время движений.
+    В отличие от списков в subscribe_joints_and_move/track_coordinates_polling
+    запись сохраняется на диск и не растёт в памяти.
+    """
+    print("\n" + "=" * 60)
+    print("💾 ЗАПИСЬ ТЕЛЕМЕТРИИ")
+    print("=" * 60)
+
+    directory = Path("telemetry") / time.strftime("%Y%m%d_%H%M%S")
+    recorder = TelemetryRecorder(manipulator, directory, ["/joint_states", "/coordinates"])
+    recorder.start()
+
+    try:
+        movements = [
+            ("Движение 1", 0.5, -0.3, -0.5),
+            ("Движение 2", 0.0, 0.0, 0.0)
+        ]
+        for name, p1, p2, p3 in movements:
+            print(f"\n   {name}...")
+            manipulator.move_to_angles(
+                povorot_osnovaniya=p1,
+                privod_plecha=p2,
+                privod_strely=p3,
+                v_osnovaniya=0.0,
+                v_plecha=0.0,
+                v_strely=0.0,
+                velocity_factor=0.15,
+                acceleration_factor=0.15
+            )
+            time.sleep(4)
+    finally:
+        recorder.stop()
+
+    reader = TelemetryReader(directory)
+    for topic in reader.topics():
+        print(f"   {topic}: {reader.count(topic)} записей")
+    print(f"\n✅ Телеметрия сохранена в {directory}")
+
+
 def main():
     """
     Главная функция
@@ -719,6 +763,9 @@ def main():
         # 13. GPIO моргание
         # gpio_blink(manipulator)
 
+        # 14. Запись телеметрии в бинарные файлы
+        # record_telemetry(manipulator)
+
         print("\n⚠️  Ни одна функция не выбрана!")
         print("Раскомментируйте нужную функцию в main()")
         print("\n💡 НОВЫЕ в SDK 0.6.8:")
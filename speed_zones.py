@@ -0,0 +1,236 @@
+"""
+Карта скоростных зон: интервалы по суставам и декартовы области (параллелепипеды,
+цилиндры), у каждой зоны — ограничение скорости (velocity_factor).
+
+Поиск по суставам идёт по отсортированным границам (bisect): для каждого
+сустава заранее посчитано ограничение на каждом элементарном интервале между
+границами, поэтому запрос — O(log n) без перебора зон.
+
+Для декартовых зон используется такой же индекс по X: границы x_min/x_max всех
+зон делят ось на элементарные отрезки, для каждого заранее собраны зоны, которые
+его покрывают (от самой строгой к самой мягкой). Запрос — bisect по границам
+и точная проверка только этих кандидатов до первого попадания.
+
+evaluate() назначает ограничение скорости каждой точке траектории за один вызов:
+
+    zone_map = ZoneMap(default_speed=0.8)
+    zone_map.add(JointIntervalZone("yellow", 0, -1.95, -0.98, 0.5))
+    zone_map.add(CartesianCylinderZone("operator", 0.0, 0.35, 0.10, 0.0, 0.5, 0.1))
+    limits = zone_map.evaluate(joint_samples=trajectory)   # array('d') длиной len(trajectory)
+"""
+
+import math
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+
+@dataclass(frozen=True)
+class JointIntervalZone:
+    """Зона по одному суставу: lower <= q < upper"""
+    name: str
+    joint: int
+    lower: float
+    upper: float
+    speed_cap: float
+
+
+@dataclass(frozen=True)
+class CartesianBoxZone:
+    """Параллелепипед, выровненный по осям базы"""
+    name: str
+    x_min: float
+    y_min: float
+    z_min: float
+    x_max: float
+    y_max: float
+    z_max: float
+    speed_cap: float
+
+    @property
+    def x_range(self) -> Tuple[float, float]:
+        return self.x_min, self.x_max
+
+    def contains(self, x: float, y: float, z: float) -> bool:
+        return (self.x_min <= x <= self.x_max and self.y_min <= y <= self.y_max
+                and self.z_min <= z <= self.z_max)
+
+
+@dataclass(frozen=True)
+class CartesianCylinderZone:
+    """Вертикальный цилиндр с осью (center_x, center_y) и высотой z_min..z_max"""
+    name: str
+    center_x: float
+    center_y: float
+    radius: float
+    z_min: float
+    z_max: float
+    speed_cap: float
+
+    @property
+    def x_range(self) -> Tuple[float, float]:
+        return self.center_x - self.radius, self.center_x + self.radius
+
+    def contains(self, x: float, y: float, z: float) -> bool:
+        dx = x - self.center_x
+        dy = y - self.center_y
+        return self.z_min <= z <= self.z_max and dx * dx + dy * dy <= self.radius * self.radius
+
+
+CartesianZone = Union[CartesianBoxZone, CartesianCylinderZone]
+Zone = Union[JointIntervalZone, CartesianZone]
+
+
+class _JointIndex:
+    """Элементарные интервалы одного сустава с заранее посчитанной зоной"""
+
+    def __init__(self, zones: List[JointIntervalZone], default_name: str, default_speed: float):
+        self.breakpoints = sorted({bound for zone in zones for bound in (zone.lower, zone.upper)
+                                   if math.isfinite(bound)})
+        self.names: List[str] = []
+        caps: List[float] = []
+        # Представитель каждого элементарного интервала: (-inf, b0), [b0, b1), ..., [bn, +inf)
+        for i in range(len(self.breakpoints) + 1):
+            probe = self._probe(i)
+            name, cap = default_name, default_speed
+            for zone in zones:
+                if zone.lower <= probe < zone.upper and zone.speed_cap < cap:
+                    name, cap = zone.name, zone.speed_cap
+            self.names.append(name)
+            caps.append(cap)
+        self.caps = array('d', caps)
+
+    def _probe(self, i: int) -> float:
+        bp = self.breakpoints
+        if not bp:
+            return 0.0
+        if i == 0:
+            return bp[0] - 1.0
+        return bp[i - 1]
+
+    def lookup(self, value: float) -> int:
+        return bisect_right(self.breakpoints, value)
+
+
+class _CartesianIndex:
+    """
+    Элементарные отрезки оси X с заранее отобранными зонами-кандидатами.
+    Отрезок 2*i — открытый интервал перед границей i, 2*i+1 — сама граница i
+    (границы зон замкнутые, поэтому точка на границе — отдельный отрезок).
+    """
+
+    def __init__(self, zones: List[CartesianZone]):
+        self.breakpoints = sorted({bound for zone in zones for bound in zone.x_range})
+        # Строгие зоны первыми: первая содержащая точку зона и есть самая строгая
+        ordered = sorted(zones, key=lambda zone: zone.speed_cap)
+        bp = self.breakpoints
+        self.candidates: List[Tuple[CartesianZone, ...]] = []
+        for slab in range(2 * len(bp) + 1):
+            i = slab // 2
+            if slab % 2:
+                low = high = bp[i]
+            else:
+                low = bp[i - 1] if i > 0 else -math.inf
+                high = bp[i] if i < len(bp) else math.inf
+            self.candidates.append(tuple(zone for zone in ordered
+                                         if zone.x_range[0] <= low and high <= zone.x_range[1]))
+
+    def lookup(self, x: float) -> Tuple[CartesianZone, ...]:
+        i = bisect_left(self.breakpoints, x)
+        if i < len(self.breakpoints) and self.breakpoints[i] == x:
+            return self.candidates[2 * i + 1]
+        return self.candidates[2 * i]
+
+
+class ZoneMap:
+    """Набор скоростных зон с быстрым поиском и оценкой целых траекторий"""
+
+    def __init__(self, default_speed: float = 1.0, default_name: str = "free"):
+        self.default_speed = default_speed
+        self.default_name = default_name
+        self._joint_zones: List[JointIntervalZone] = []
+        self._cartesian_zones: List[CartesianZone] = []
+        self._joint_index: Optional[Dict[int, _JointIndex]] = None
+        self._cartesian_index: Optional[_CartesianIndex] = None
+
+    def add(self, zone: Zone) -> "ZoneMap":
+        if isinstance(zone, JointIntervalZone):
+            if zone.lower >= zone.upper:
+                raise ValueError(f"Пустой интервал зоны {zone.name}: {zone.lower} >= {zone.upper}")
+            self._joint_zones.append(zone)
+        else:
+            self._cartesian_zones.append(zone)
+        self._joint_index = None
+        return self
+
+    def _ensure_index(self) -> Dict[int, _JointIndex]:
+        if self._joint_index is None:
+            by_joint: Dict[int, List[JointIntervalZone]] = {}
+            for zone in self._joint_zones:
+                by_joint.setdefault(zone.joint, []).append(zone)
+            self._joint_index = {joint: _JointIndex(zones, self.default_name, self.default_speed)
+                                 for joint, zones in by_joint.items()}
+            self._cartesian_index = _CartesianIndex(self._cartesian_zones) if self._cartesian_zones else None
+        return self._joint_index
+
+    # --- Одиночные запросы ---
+
+    def zone_for_joint(self, joint: int, value: float) -> Tuple[str, float]:
+        """Зона и ограничение скорости для значения одного сустава"""
+        index = self._ensure_index().get(joint)
+        if index is None:
+            return self.default_name, self.default_speed
+        i = index.lookup(value)
+        return index.names[i], index.caps[i]
+
+    def zone_for_joints(self, joints: Sequence[float]) -> Tuple[str, float]:
+        """Самая строгая зона по всем суставам"""
+        name, cap = self.default_name, self.default_speed
+        for joint in self._ensure_index():
+            if joint < len(joints):
+                zone_name, zone_cap = self.zone_for_joint(joint, joints[joint])
+                if zone_cap < cap:
+                    name, cap = zone_name, zone_cap
+        return name, cap
+
+    def zone_for_point(self, x: float, y: float, z: float) -> Tuple[str, float]:
+        """Самая строгая декартова зона, содержащая точку"""
+        self._ensure_index()
+        if self._cartesian_index is None:
+            return self.default_name, self.default_speed
+        for zone in self._cartesian_index.lookup(x):
+            if zone.speed_cap >= self.default_speed:
+                break
+            if zone.contains(x, y, z):
+                return zone.name, zone.speed_cap
+        return self.default_name, self.default_speed
+
+    # --- Оценка траектории ---
+
+    def evaluate(self,
+                 joint_samples: Optional[Sequence[Sequence[float]]] = None,
+                 point_samples: Optional[Sequence[Sequence[float]]] = None) -> array:
+        """
+        Ограничение скорости для каждой точки траектории.
+        joint_samples — строки со значениями суставов, point_samples — строки (x, y, z).
+        Если заданы оба, длины должны совпадать; берётся минимум.
+        """
+        index = self._ensure_index()
+        count = len(joint_samples) if joint_samples is not None else len(point_samples or ())
+        if joint_samples is not None and point_samples is not None and len(point_samples) != count:
+            raise ValueError("joint_samples и point_samples должны быть одной длины")
+
+        limits = array('d', [self.default_speed]) * count
+
+        if joint_samples is not None:
+            for joint, joint_index in index.items():
+                lookup, caps = joint_index.lookup, joint_index.caps
+                column_caps = [caps[lookup(row[joint])] for row in joint_samples]
+                limits = array('d', map(min, limits, column_caps))
+
+        if point_samples is not None and self._cartesian_index is not None:
+            point_caps = [self.zone_for_point(row[0], row[1], row[2])[1] for row in point_samples]
+            limits = array('d', map(min, limits, point_caps))
+
+        return limits
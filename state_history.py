@@ -0,0 +1,211 @@
+"""
+История состояния манипулятора в кольцевых буферах фиксированного размера.
+
+RingBuffer хранит время и набор числовых каналов (углы суставов, x/y/z TCP и т.п.)
+в array('d'). Каждый отсчёт пишется дважды — в позицию i и i + capacity, поэтому
+любое окно «последние N отсчётов» непрерывно в памяти и отдаётся как memoryview
+без копирования. Добавление — O(1), память постоянна.
+
+Window (окно истории) даёт производные величины за один проход по memoryview:
+скорость и ускорение конечными разностями, пиковая скорость по каналам
+и по модулю вектора (для x/y/z).
+
+    m.enable_state_history(capacity=2048)
+    window = m.state_history("/joint_states").last_seconds(0.5)
+    window.peak_speed()                   # рад/с, по всем суставам
+    window.channel("privod_plecha")       # memoryview без копирования
+
+Окна — представления живого буфера: при долгом использовании из другого потока
+берите window.copy().
+"""
+
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_CAPACITY = 2048
+
+JOINT_STATES_TOPIC = "/joint_states"
+COORDINATES_TOPIC = "/coordinates"
+CARTESIAN_CHANNELS = ("x", "y", "z", "qx", "qy", "qz", "qw")
+
+
+def _differences(values: Sequence[float], timestamps: Sequence[float]) -> array:
+    """Конечные разности dv/dt между соседними отсчётами (длина n - 1)"""
+    return array('d', map(
+        lambda v1, v0, t1, t0: (v1 - v0) / (t1 - t0) if t1 > t0 else 0.0,
+        values[1:], values[:-1], timestamps[1:], timestamps[:-1],
+    ))
+
+
+class Window:
+    """Окно истории: время и каналы как memoryview над буфером"""
+
+    def __init__(self, channels: Sequence[str], timestamps: memoryview, columns: List[memoryview]):
+        self.channels = tuple(channels)
+        self.timestamps = timestamps
+        self._columns = columns
+        self._index = {name: i for i, name in enumerate(self.channels)}
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def channel(self, name: str) -> memoryview:
+        return self._columns[self._index[name]]
+
+    def copy(self) -> "Window":
+        """Независимая копия окна (не меняется при дальнейшей записи в буфер)"""
+        return Window(self.channels, memoryview(array('d', self.timestamps)),
+                      [memoryview(array('d', column)) for column in self._columns])
+
+    @property
+    def duration(self) -> float:
+        return self.timestamps[-1] - self.timestamps[0] if len(self.timestamps) > 1 else 0.0
+
+    def velocity(self, name: str) -> array:
+        """Скорость канала (ед./с) между соседними отсчётами"""
+        return _differences(self.channel(name), self.timestamps)
+
+    def acceleration(self, name: str) -> array:
+        """Ускорение канала (ед./с²); длина окна минус 2"""
+        velocity = self.velocity(name)
+        # Скорость относится к середине интервала между отсчётами
+        ts = self.timestamps
+        midpoints = array('d', map(lambda t1, t0: (t1 + t0) / 2.0, ts[1:], ts[:-1]))
+        return _differences(velocity, midpoints)
+
+    def peak_speed(self, names: Optional[Sequence[str]] = None) -> float:
+        """Максимальная |скорость| среди указанных каналов (по умолчанию — всех)"""
+        peak = 0.0
+        for name in names or self.channels:
+            velocity = self.velocity(name)
+            if velocity:
+                peak = max(peak, max(velocity), -min(velocity))
+        return peak
+
+    def vector_speed(self, names: Sequence[str] = ("x", "y", "z")) -> array:
+        """Модуль скорости вектора из каналов names (например, скорость TCP, м/с)"""
+        components = [self.velocity(name) for name in names]
+        return array('d', map(lambda *v: sum(c * c for c in v) ** 0.5, *components))
+
+    def peak_vector_speed(self, names: Sequence[str] = ("x", "y", "z")) -> float:
+        speeds = self.vector_speed(names)
+        return max(speeds) if speeds else 0.0
+
+
+class RingBuffer:
+    """Кольцевой буфер отсчётов (время + числовые каналы) с окнами без копирования"""
+
+    def __init__(self, channels: Sequence[str], capacity: int = DEFAULT_CAPACITY):
+        if capacity < 2:
+            raise ValueError("capacity должен быть не меньше 2")
+        self.channels = tuple(channels)
+        self.capacity = capacity
+        # Двойная длина: отсчёт пишется в i и i + capacity
+        self._timestamps = array('d', bytes(8 * 2 * capacity))
+        self._columns = [array('d', bytes(8 * 2 * capacity)) for _ in self.channels]
+        self._head = 0        # позиция следующей записи в [0, capacity)
+        self._count = 0
+        self.total = 0        # всего отсчётов за время жизни буфера
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, timestamp: float, values: Sequence[float]) -> None:
+        """Добавить отсчёт: значения в порядке self.channels"""
+        if len(values) != len(self._columns):
+            raise ValueError(f"Ожидалось {len(self._columns)} значений, получено {len(values)}")
+        with self._lock:
+            i = self._head
+            j = i + self.capacity
+            self._timestamps[i] = self._timestamps[j] = timestamp
+            for column, value in zip(self._columns, values):
+                column[i] = column[j] = value
+            self._head = i + 1 if i + 1 < self.capacity else 0
+            if self._count < self.capacity:
+                self._count += 1
+            self.total += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._head = 0
+            self._count = 0
+
+    def last(self, n: Optional[int] = None) -> Window:
+        """Окно из последних n отсчётов (по умолчанию — всех)"""
+        with self._lock:
+            n = self._count if n is None else max(0, min(n, self._count))
+            end = self._head + self.capacity
+            start = end - n
+            timestamps = memoryview(self._timestamps)[start:end]
+            columns = [memoryview(column)[start:end] for column in self._columns]
+        return Window(self.channels, timestamps, columns)
+
+    def last_seconds(self, seconds: float, now: Optional[float] = None) -> Window:
+        """Окно отсчётов за последние seconds секунд (относительно now или последнего отсчёта)"""
+        window = self.last()
+        if not len(window):
+            return window
+        reference = window.timestamps[-1] if now is None else now
+        first = bisect_left(window.timestamps, reference - seconds)
+        return self.last(len(window) - first)
+
+    def latest(self) -> Optional[Tuple[float, Tuple[float, ...]]]:
+        """Последний отсчёт (время, значения) или None"""
+        with self._lock:
+            if self._count == 0:
+                return None
+            i = self._head - 1 + self.capacity
+            return self._timestamps[i], tuple(column[i] for column in self._columns)
+
+
+# ===================== ИСТОРИЯ ТОПИКОВ =====================
+
+def joint_state_sample(data: Dict[str, Any]) -> Optional[Tuple[List[str], List[float]]]:
+    """/joint_states (sensor_msgs/JointState) → имена суставов и позиции"""
+    names = data.get("name")
+    positions = data.get("position")
+    if not isinstance(names, list) or not isinstance(positions, list) or len(names) != len(positions):
+        return None
+    return names, [float(value) for value in positions]
+
+
+def coordinates_sample(data: Dict[str, Any], tool: str = "tool0") -> Optional[Tuple[List[str], List[float]]]:
+    """/coordinates → x, y, z, qx, qy, qz, qw выбранного инструмента"""
+    pose = data.get(tool)
+    if not isinstance(pose, dict) or "position" not in pose or "orientation" not in pose:
+        return None
+    p, q = pose["position"], pose["orientation"]
+    return list(CARTESIAN_CHANNELS), [float(p["x"]), float(p["y"]), float(p["z"]),
+                                      float(q["x"]), float(q["y"]), float(q["z"]), float(q["w"])]
+
+
+EXTRACTORS: Dict[str, Callable[[Dict[str, Any]], Optional[Tuple[List[str], List[float]]]]] = {
+    JOINT_STATES_TOPIC: joint_state_sample,
+    COORDINATES_TOPIC: coordinates_sample,
+}
+
+
+class TopicHistory:
+    """Слушатель топика, складывающий отсчёты в RingBuffer (каналы — по первому сообщению)"""
+
+    def __init__(self, topic: str, capacity: int = DEFAULT_CAPACITY,
+                 extractor: Optional[Callable[[Dict[str, Any]], Any]] = None):
+        self.topic = topic
+        self.capacity = capacity
+        self.extractor = extractor or EXTRACTORS[topic]
+        self.buffer: Optional[RingBuffer] = None
+
+    def __call__(self, data: Dict[str, Any]) -> None:
+        sample = self.extractor(data)
+        if sample is None:
+            return
+        channels, values = sample
+        buffer = self.buffer
+        if buffer is None or len(channels) != len(buffer.channels) or tuple(channels) != buffer.channels:
+            # Первый отсчёт или сменился состав каналов — начинаем новый буфер
+            buffer = self.buffer = RingBuffer(channels, self.capacity)
+        buffer.append(time.monotonic(), values)
@@ -2,9 +2,15 @@
 Вращение J1 с адаптивной скоростью.
 """
 
+import math
+import threading
 import time
+from bisect import bisect_left, bisect_right
+
 from sdk.manipulators.medu import MEdu
 
+from speed_zones import JointIntervalZone, ZoneMap
+
 # === Подключение ===
 HOST = "10.5.0.2"
 LOGIN = "user"
@@ -23,6 +29,13 @@ SPEED_BY_ZONE = {
 }
 ZONE_BORDERS_DEGREES = [-90.0, -60.0, -30.0, 0.0, 30.0, 60.0, 90.0]  # Границы зон в градусах
 
+# === Потоковое исполнение плана ===
+JOINT_NAMES = ("povorot_osnovaniya", "privod_plecha", "privod_strely")
+J1_MAX_SPEED_RAD_S = 1.0  # Скорость J1 при velocity_factor = 1.0
+STREAM_RATE_HZ = 50  # Частота отправки уставок в режиме JOINT_JOG
+MONITOR_TOLERANCE_DEGREES = 3.0  # Отставание от уставки, о котором стоит предупредить
+SERVO_SWITCH_DELAY = 1.0  # Пауза после смены серво-режима, с
+
 
 # --- Вспомогательные функции ---
 
@@ -36,30 +49,231 @@ def deg2rad(degrees):
     return float(degrees) * 3.141592653589793 / 180.0
 
 
+def _above(value):
+    """Ближайшее число больше value: зоны полуоткрытые, а пороги |J1| > 56/112 строгие"""
+    return math.nextafter(value, math.inf)
+
+
+# Карта зон J1 (в градусах): |J1| > 112 — red, |J1| > 56 — yellow, остальное — green
+J1_ZONE_MAP = ZoneMap(default_speed=SPEED_BY_ZONE["green"], default_name="green")
+J1_ZONE_MAP.add(JointIntervalZone("red", 0, -math.inf, -112.0, SPEED_BY_ZONE["red"]))
+J1_ZONE_MAP.add(JointIntervalZone("red", 0, _above(112.0), math.inf, SPEED_BY_ZONE["red"]))
+J1_ZONE_MAP.add(JointIntervalZone("yellow", 0, -112.0, -56.0, SPEED_BY_ZONE["yellow"]))
+J1_ZONE_MAP.add(JointIntervalZone("yellow", 0, _above(56.0), _above(112.0), SPEED_BY_ZONE["yellow"]))
+
+_SORTED_BORDERS_DEGREES = sorted(ZONE_BORDERS_DEGREES)
+
+
 def zone_of_j1(j1_degrees):
     """Определение зоны безопасности по углу J1"""
-    if abs(j1_degrees) > 112:
-        return "red"  # Опасная зона
-    if abs(j1_degrees) > 56:
-        return "yellow"  # Промежуточная зона
-    return "green"  # Безопасная зона
+    return J1_ZONE_MAP.zone_for_joint(0, j1_degrees)[0]
 
 
 def nearest_border_between(angle_start, angle_end):
     """Поиск ближайшей границы зоны между двумя углами"""
-    lower_angle, upper_angle = (angle_start, angle_end) if angle_start < angle_end else (angle_end, angle_start)
-    borders_in_range = [border for border in ZONE_BORDERS_DEGREES if lower_angle < border < upper_angle]
-    return min(borders_in_range, key=lambda border: abs(border - angle_start)) if borders_in_range else None
+    if angle_start < angle_end:
+        i = bisect_right(_SORTED_BORDERS_DEGREES, angle_start)
+        if i < len(_SORTED_BORDERS_DEGREES) and _SORTED_BORDERS_DEGREES[i] < angle_end:
+            return _SORTED_BORDERS_DEGREES[i]
+    elif angle_start > angle_end:
+        i = bisect_left(_SORTED_BORDERS_DEGREES, angle_start) - 1
+        if i >= 0 and _SORTED_BORDERS_DEGREES[i] > angle_end:
+            return _SORTED_BORDERS_DEGREES[i]
+    return None
+
+
+def plan_j1_segments(angle_start, angle_end):
+    """
+    План движения J1: участки между границами зон со скоростью каждой зоны.
+    Скорость участка — по более медленной зоне из двух его концов.
+    Соседние участки с одинаковой скоростью объединяются.
+    Возвращает список (начало°, конец°, зона, velocity_factor).
+    """
+    direction = 1 if angle_end > angle_start else -1
+    lower_angle, upper_angle = min(angle_start, angle_end), max(angle_start, angle_end)
+    borders = sorted((border for border in ZONE_BORDERS_DEGREES if lower_angle < border < upper_angle),
+                     reverse=direction < 0)
+
+    segments = []
+    segment_start = angle_start
+    for segment_end in borders + [angle_end]:
+        if abs(segment_end - segment_start) < 1e-9:
+            continue
+        zone = min((zone_of_j1(segment_start), zone_of_j1(segment_end)), key=lambda z: SPEED_BY_ZONE[z])
+        velocity_factor = SPEED_BY_ZONE[zone]
+        if segments and segments[-1][3] == velocity_factor:
+            segments[-1] = (segments[-1][0], segment_end, zone, velocity_factor)
+        else:
+            segments.append((segment_start, segment_end, zone, velocity_factor))
+        segment_start = segment_end
+    return segments
 
 
 # --- Основной класс ---
 class SpeedGuard:
     """Класс для управления движением с адаптивной скоростью"""
 
-    def __init__(self, robot, safe_shoulder_angle, safe_elbow_angle):
+    def __init__(self, robot, safe_shoulder_angle, safe_elbow_angle, servo_mode=None):
+        """
+        :param servo_mode: Серво-режим (ServoControlType), в котором робот работает вне стриминга.
+                           Контроллер не сообщает текущий режим, поэтому его нужно передать,
+                           чтобы после стриминга он был восстановлен (None — не восстанавливать).
+        """
         self.robot = robot
         self.safe_shoulder_angle = safe_shoulder_angle
         self.safe_elbow_angle = safe_elbow_angle
+        self.servo_mode = servo_mode
+
+        # Кэш состояния суставов: только для мониторинга, в управлении не участвует
+        self._j1_measured_degrees = None
+        self._j1_lock = threading.Lock()
+        self._monitoring = False
+
+    # --- Мониторинг по подписке на суставы ---
+
+    def _on_joint_state(self, joint_data):
+        """Обновление кэша J1 из подписки на состояние суставов"""
+        positions = joint_data.get("positions") if isinstance(joint_data.get("positions"), dict) else joint_data
+        value = positions.get(JOINT_NAMES[0])
+        if isinstance(value, dict):
+            value = value.get("position")
+        if isinstance(value, (int, float)):
+            with self._j1_lock:
+                self._j1_measured_degrees = rad2deg(value)
+
+    def start_monitoring(self):
+        """Подписаться на состояние суставов (без опроса после каждого шага)"""
+        if not self._monitoring:
+            self.robot.subscribe_to_joint_state(self._on_joint_state)
+            self._monitoring = True
+
+    def stop_monitoring(self):
+        if self._monitoring:
+            try:
+                self.robot.unsubscribe_from_joint_state()
+            except Exception:
+                pass
+            self._monitoring = False
+
+    def measured_j1_degrees(self):
+        """Последний измеренный угол J1 из кэша (или None)"""
+        with self._j1_lock:
+            return self._j1_measured_degrees
+
+    def _read_j1_degrees(self):
+        """Текущий угол J1: из кэша, если он есть, иначе один запрос к роботу"""
+        cached = self.measured_j1_degrees()
+        if cached is not None:
+            return cached
+        return rad2deg(float(self.robot.get_joint_angles()[0]))
+
+    # --- Исполнение предрассчитанного плана ---
+
+    def plan_waypoints(self, j1_waypoints_degrees, j1_start_degrees=None):
+        """План всего маршрута: участки по зонам для каждого перехода между точками"""
+        current = self._read_j1_degrees() if j1_start_degrees is None else j1_start_degrees
+        plan = []
+        for target_degrees in j1_waypoints_degrees:
+            plan.extend(plan_j1_segments(current, target_degrees))
+            current = target_degrees
+        return plan
+
+    def _execute_batched(self, plan):
+        """Одна команда move_to_angles на участок зоны, без запросов состояния между ними"""
+        for segment_start, segment_end, zone, velocity_factor in plan:
+            print(f"[J1] {segment_start:.1f}° → {segment_end:.1f}° | зона: {zone} | vf={velocity_factor}")
+            self.robot.move_to_angles(
+                deg2rad(segment_end),
+                self.safe_shoulder_angle,
+                self.safe_elbow_angle,
+                velocity_factor=velocity_factor,
+                acceleration_factor=0.2
+            )
+            # move_to_angles блокирующий: к концу участка J1 должен быть на его границе
+            self._check_tracking(segment_end)
+
+    def _execute_streamed(self, plan):
+        """Потоковая траектория в режиме JOINT_JOG; после неё серво-режим восстанавливается"""
+        self.robot.set_servo_joint_jog_mode()
+        try:
+            time.sleep(SERVO_SWITCH_DELAY)
+            self._stream_plan(plan)
+        finally:
+            if self.servo_mode is not None:
+                try:
+                    self.robot.set_servo_control_type(self.servo_mode)
+                except Exception as error:
+                    print(f"[SERVO] Не удалось восстановить серво-режим: {error}")
+
+    def _stream_plan(self, plan):
+        """Уставки JOINT_JOG с частотой STREAM_RATE_HZ и ограничением скорости по зонам"""
+        period = 1.0 / STREAM_RATE_HZ
+        next_tick = time.monotonic()
+        for segment_start, segment_end, zone, velocity_factor in plan:
+            print(f"[J1 stream] {segment_start:.1f}° → {segment_end:.1f}° | зона: {zone} | vf={velocity_factor}")
+            speed_rad_s = velocity_factor * J1_MAX_SPEED_RAD_S
+            step_degrees = rad2deg(speed_rad_s * period)
+            direction = 1 if segment_end > segment_start else -1
+            setpoint = segment_start
+            lagging_ticks = 0
+            max_lag = 0.0
+            while setpoint != segment_end:
+                setpoint += direction * step_degrees
+                if (setpoint - segment_end) * direction > 0:
+                    setpoint = segment_end
+                self.robot.stream_joint_positions(
+                    {
+                        JOINT_NAMES[0]: deg2rad(setpoint),
+                        JOINT_NAMES[1]: self.safe_shoulder_angle,
+                        JOINT_NAMES[2]: self.safe_elbow_angle,
+                    },
+                    {
+                        JOINT_NAMES[0]: direction * speed_rad_s,
+                        JOINT_NAMES[1]: 0.0,
+                        JOINT_NAMES[2]: 0.0,
+                    },
+                )
+                lag = self._tracking_lag(setpoint)
+                if lag is not None:
+                    # Об отставании — одна строка на участок, а не на каждую уставку
+                    if lagging_ticks == 0:
+                        self._report_lag(setpoint, lag)
+                    lagging_ticks += 1
+                    max_lag = max(max_lag, lag)
+                next_tick += period
+                delay = next_tick - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            if lagging_ticks > 1:
+                print(f"[MONITOR] Участок {segment_start:.1f}° → {segment_end:.1f}°: отставание на "
+                      f"{lagging_ticks} уставках, максимум {max_lag:.1f}°")
+
+    def _tracking_lag(self, setpoint_degrees):
+        """Отставание J1 от уставки в градусах, если оно больше допуска (иначе None)"""
+        measured = self.measured_j1_degrees()
+        if measured is not None and abs(measured - setpoint_degrees) > MONITOR_TOLERANCE_DEGREES:
+            return abs(measured - setpoint_degrees)
+        return None
+
+    def _report_lag(self, setpoint_degrees, lag_degrees):
+        print(f"[MONITOR] J1 отстаёт: уставка {setpoint_degrees:.1f}°, отставание {lag_degrees:.1f}°")
+
+    def _check_tracking(self, setpoint_degrees):
+        lag = self._tracking_lag(setpoint_degrees)
+        if lag is not None:
+            self._report_lag(setpoint_degrees, lag)
+
+    def move_waypoints_planned(self, j1_waypoints_degrees, streamed=False):
+        """
+        Маршрут по предрассчитанному плану зон: без get_joint_angles() после каждого шага.
+        streamed=False — одна команда на участок зоны, streamed=True — поток уставок JOINT_JOG.
+        """
+        plan = self.plan_waypoints(j1_waypoints_degrees)
+        print(f"[PLAN] {len(plan)} участков для маршрута {list(j1_waypoints_degrees)}")
+        if streamed:
+            self._execute_streamed(plan)
+        else:
+            self._execute_batched(plan)
 
     def move_j1_guarded(self, j1_target_degrees, max_step_degrees=5.0):
         """Безопасное движение J1 к целевому углу с адаптивной скоростью"""
@@ -123,6 +337,7 @@ def main():
     print("[INFO] Подключение...")
     manipulator = MEdu(HOST, CLIENT_ID, LOGIN, PASSWORD)
     manipulator.connect()
+    speed_guard = None
 
     try:
         print("[INFO] Захват управления...")
@@ -139,7 +354,8 @@ def main():
         waypoints = [90, -90, 0]
 
         print("\n[GO] Начало движения с адаптивной скоростью...")
-        speed_guard.move_waypoints_guarded(waypoints)
+        speed_guard.start_monitoring()
+        speed_guard.move_waypoints_planned(waypoints)
 
         print("\nГотово!")
 
@@ -148,6 +364,8 @@ def main():
     except Exception as error:
         print(f"\nОшибка: {error}")
     finally:
+        if speed_guard is not None:
+            speed_guard.stop_monitoring()
         try:
             manipulator.release_control()
         except:
@@ -11,6 +11,8 @@ from typing import Dict, Optional
 
 from sdk.manipulators.medu import MEdu
 
+from state_history import RingBuffer
+
 # --- Настройки ---
 HOST = "10.5.0.2"
 LOGIN = "user"
@@ -18,6 +20,8 @@ PASSWORD = "pass"
 CLIENT_ID = "cells-calib-001"
 GPIO_LED_PATH = "/dev/gpiochip4/e1_pin"
 VELOCITY_THRESHOLD = 0.01  # Порог скорости в рад/с для определения движения
+SPEED_WINDOW_SECONDS = 0.2  # Окно истории для оценки скорости по позициям
+HISTORY_CAPACITY = 256  # Отсчётов в истории суставов
 
 # --- Константы для мигания светодиода ---
 BLINK_FREQUENCY_HZ = 2  # Частота мигания 2 Гц
@@ -87,29 +91,33 @@ class GpioLedController:
 class MotionWatcher:
     """Наблюдатель за движением манипулятора"""
 
-    def __init__(self, velocity_threshold: float):
+    def __init__(self, velocity_threshold: float, window_seconds: float = SPEED_WINDOW_SECONDS):
         self.velocity_threshold = velocity_threshold
-        self.last_timestamp: Optional[float] = None
-        self.last_positions: Optional[Dict[str, float]] = None
+        self.window_seconds = window_seconds
+        self.history: Optional[RingBuffer] = None
         self.is_moving_flag = False
         self._lock = threading.Lock()
 
-    def _compute_max_joint_speed(
-            self,
-            positions_previous: Dict[str, float],
-            positions_current: Dict[str, float],
-            time_delta: float
-    ) -> float:
-        """Вычисление максимальной скорости среди всех суставов"""
-        joint_speeds = []
-
-        for joint_name in positions_current:
-            if joint_name in positions_previous:
-                # Вычисляем скорость как изменение позиции за время
-                speed = abs((positions_current[joint_name] - positions_previous[joint_name]) / max(time_delta, 1e-6))
-                joint_speeds.append(speed)
+    def _record_positions(self, positions: Dict[str, float], timestamp: float) -> RingBuffer:
+        """Добавить позиции в историю; при смене набора суставов история начинается заново"""
+        names = tuple(sorted(positions))
+        if self.history is None or self.history.channels != names:
+            self.history = RingBuffer(names, HISTORY_CAPACITY)
+        self.history.append(timestamp, [positions[name] for name in names])
+        return self.history
 
-        return max(joint_speeds) if joint_speeds else 0.0
+    def _compute_max_joint_speed(self, history: RingBuffer) -> float:
+        """
+        Максимальная скорость среди суставов: смещение за последнее окно времени,
+        делённое на его длительность (сглаживает шум одиночных отсчётов)
+        """
+        window = history.last_seconds(self.window_seconds)
+        if len(window) < 2:
+            window = history.last(2)
+        if len(window) < 2 or window.duration <= 0:
+            return 0.0
+        return max(abs(window.channel(name)[-1] - window.channel(name)[0]) / window.duration
+                   for name in window.channels)
 
     def on_joint_state(self, joint_data: Dict) -> bool:
         """
@@ -137,17 +145,10 @@ class MotionWatcher:
                 movement_detected = any(
                     abs(velocity) > self.velocity_threshold for velocity in current_velocities.values())
 
-            # Способ 2: вычисляем скорость по изменению позиций
-            else:
-                if self.last_timestamp is not None and self.last_positions is not None:
-                    time_delta = current_time - self.last_timestamp
-                    if time_delta > 0:
-                        max_speed = self._compute_max_joint_speed(self.last_positions, current_positions, time_delta)
-                        movement_detected = max_speed > self.velocity_threshold
-
-            # Обновляем последние известные значения
-            self.last_timestamp = current_time
-            self.last_positions = current_positions
+            # Способ 2: вычисляем скорость по истории позиций
+            history = self._record_positions(current_positions, current_time)
+            if not current_velocities:
+                movement_detected = self._compute_max_joint_speed(history) > self.velocity_threshold
 
             # Потокобезопасное обновление флага движения
             with self._lock:
@@ -1,8 +1,9 @@
 import json
+import sqlite3
 import sys
 import time
 from pathlib import Path
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Union
 
 from sdk.commands.move_coordinates_command import (
     MoveCoordinatesParamsPosition,
@@ -10,6 +11,9 @@ from sdk.commands.move_coordinates_command import (
 )
 from sdk.manipulators.medu import MEdu
 
+from coords_store import PointStore
+from point_db import StationPoints, open_points
+
 # ===================== КОНФИГУРАЦИЯ =====================
 
 HOST = "192.168.0.183"
@@ -18,6 +22,8 @@ LOGIN = "user"
 PASSWORD = "pass"
 
 COORDS_FILE = Path("coords3.json")
+POINTS_DB = Path("points.db")
+STATION = "default"
 
 CELL_DESCENT_ROT = -5.0  # градусы, перед спуском в любую CELL_*
 BUFFER_DESCENT_ROT = -11.0  # градусы, перед спуском в BUFFER/BUFF
@@ -38,8 +44,6 @@ SEQUENCE_GRIP_ACTIONS: Dict[str, Dict[str, float]] = {
     "B": {"rotation": -10.0, "angle": 10.0},
 }
 
-CoordinatesData = Dict[str, Dict[str, Dict[str, Any]]]
-
 
 # ===================== УТИЛИТЫ =====================
 
@@ -60,48 +64,33 @@ def safe_sdk_call(
         raise
 
 
-def load_coordinates(path: Path) -> CoordinatesData:
+def load_coordinates(path: Path) -> Union[StationPoints, PointStore]:
     """
-    Читает и валидирует JSON с координатами.
+    Открывает базу точек POINTS_DB (точки читаются по мере обращения),
+    а если её нет — читает и валидирует JSON с координатами.
+    Повторные запуски берут уже проверенные точки из бинарного кэша.
     """
-    if not path.exists():
+    if not POINTS_DB.exists() and not path.exists():
         print(f"[!] Файл с координатами не найден: {path}")
         sys.exit(1)
 
     try:
-        with path.open("r", encoding="utf-8") as file:
-            data = json.load(file)
+        return open_points(POINTS_DB, STATION, path)
+    except sqlite3.Error as exc:
+        print(f"[!] Не удалось открыть базу точек {POINTS_DB}: {exc}")
+        sys.exit(1)
     except json.JSONDecodeError as exc:
         print(f"[!] Некорректный JSON в {path}: {exc}")
         sys.exit(1)
     except OSError as exc:
         print(f"[!] Не удалось прочитать {path}: {exc}")
         sys.exit(1)
-
-    if not isinstance(data, dict):
-        print(f"[!] Ожидался словарь верхнего уровня в {path}")
+    except ValueError as exc:
+        print(f"[!] Некорректная структура координат в {path}: {exc}")
         sys.exit(1)
 
-    return data
 
-
-COORDS: CoordinatesData = load_coordinates(COORDS_FILE)
-
-
-def _get_pose_from_coords(point_name: str, tool: str) -> Dict[str, Dict[str, float]]:
-    """
-    Достаёт позицию и ориентацию из COORDS.
-    """
-    try:
-        point_data = COORDS[point_name][tool]
-        position = point_data["position"]
-        orientation = point_data["orientation"]
-    except KeyError as exc:
-        raise KeyError(
-            f"В файле {COORDS_FILE} нет точки '{point_name}' и/или инструмента '{tool}'"
-        ) from exc
-
-    return {"position": position, "orientation": orientation}
+COORDS = load_coordinates(COORDS_FILE)
 
 
 # ===================== НИЗКОУРОВНЕВЫЕ ДВИЖЕНИЯ =====================
@@ -124,11 +113,33 @@ def move(
     Блокирующий move: ждём завершения траектории, чтобы
     следующая команда не «съела» промежуточную точку.
     """
+    move_to(
+        manipulator,
+        MoveCoordinatesParamsPosition(x=x, y=y, z=z),
+        MoveCoordinatesParamsOrientation(x=ox, y=oy, z=oz, w=ow),
+        velocity,
+        acceleration,
+        timeout=timeout,
+    )
+
+
+def move_to(
+        manipulator: MEdu,
+        position: MoveCoordinatesParamsPosition,
+        orientation: MoveCoordinatesParamsOrientation,
+        velocity: float = VEL,
+        acceleration: float = ACC,
+        *,
+        timeout: float = 60.0,
+) -> None:
+    """
+    Блокирующий move по готовым объектам позиции и ориентации.
+    """
     promise = safe_sdk_call(
         "при отправке команды move_to_coordinates",
         manipulator.move_to_coordinates,
-        MoveCoordinatesParamsPosition(x=x, y=y, z=z),
-        MoveCoordinatesParamsOrientation(x=ox, y=oy, z=oz, w=ow),
+        position,
+        orientation,
         velocity_scaling_factor=velocity,
         acceleration_scaling_factor=acceleration,
     )
@@ -153,22 +164,8 @@ def move_pose(
     """
     Перемещает манипулятор в точку из COORDS.
     """
-    pose = _get_pose_from_coords(point_name, tool)
-    position = pose["position"]
-    orientation = pose["orientation"]
-
-    move(
-        manipulator,
-        x=position["x"],
-        y=position["y"],
-        z=position["z"],
-        ox=orientation["x"],
-        oy=orientation["y"],
-        oz=orientation["z"],
-        ow=orientation["w"],
-        velocity=velocity,
-        acceleration=acceleration,
-    )
+    position, orientation = COORDS.pose(point_name, tool)
+    move_to(manipulator, position, orientation, velocity, acceleration)
 
 
 def _set_gripper(manipulator: MEdu, rotation: float, angle: int) -> None:
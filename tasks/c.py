@@ -6,9 +6,19 @@ from sdk.commands.move_coordinates_command import (
 )
 
 from sdk.utils.enums import  ServoControlType
+import sys
 import time
 import threading
 import json
+from pathlib import Path
+
+# Модули проекта лежат в корне репозитория
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from audio_queue import AudioPlayer
+from conveyor_stream import ConveyorSensorStream
+from distance_zones import DistanceZone, DistanceZoneTracker
+from poll_scheduler import PollScheduler
 
 # ============================================================================
 # ГЛОБАЛЬНЫЕ НАСТРОЙКИ
@@ -26,6 +36,29 @@ PASSWORD = "pass"           # Пароль
 GPIO_LED_PIN = "/dev/gpiochip4/e1_pin"
 GPIO_BUTTON_PIN = "/dev/gpiochip4/e2_pin"
 
+# Зоны расстояния до объекта (показания DistanceSensor)
+DISTANCE_ZONES = [
+    DistanceZone("4", lower=282),
+    DistanceZone("3", lower=215, upper=282),
+    DistanceZone("2", lower=136, upper=215),
+    DistanceZone("1", upper=136),
+]
+# Зона -> (угол поворота основания [рад], число предупреждений, приоритет предупреждения)
+ZONE_ACTIONS = {
+    "4": (0.0, 0, 0),
+    "3": (-0.52, 1, 1),
+    "2": (-1.05, 3, 2),
+    "1": (-1.57, 1, 3),
+}
+WARNING_CLIP = "warning.wav"
+ZONE_HYSTERESIS = 5.0         # полоса гистерезиса у границ зон (единицы датчика)
+ZONE_MIN_DWELL = 0.15         # минимальное время в новой зоне до переключения, с
+SENSOR_POLL_INTERVAL = 0.05   # период запроса датчиков, пока расстояние меняется, с
+SENSOR_IDLE_INTERVAL = 0.2    # период запроса, пока показания стоят на месте (не дольше — свежесть), с
+POLL_BUDGET = 20.0            # запросов к контроллеру в секунду на все опросы
+SENSOR_TIMEOUT = 2.0          # предупреждение, если датчик молчит дольше, с
+ZONE_RETRY_DELAY = 1.0        # пауза перед повтором поворота в позу зоны после ошибки, с
+
 
 def parse_joint_state(json_str):
     """
@@ -80,74 +113,77 @@ def parse_tool0(json_str):
         }
     }
 
+def move_to_zone_pose(manipulator, base_angle):
+    manipulator.move_to_angles(
+        povorot_osnovaniya=base_angle,  # угол поворота основания [рад]
+        privod_plecha=-0.35,  # угол плеча [рад]
+        privod_strely=-0.75,  # угол стрелы [рад]
+        v_osnovaniya=0.0,  # скорость основания [рад/с]
+        v_plecha=0.0,  # скорость плеча [рад/с]
+        v_strely=0.0,  # скорость стрелы [рад/с]
+        velocity_factor=0.3,  # коэффициент скорости
+        acceleration_factor=0.1,  # коэффициент ускорения
+    )
+
+
 def get_dist_move(manipulator):
-    curr_pos = "None"
-    while True:
-        try:
-            value = manipulator.mgbot_conveyer.get_sensors_data(True)
-            parsed = json.loads(value)
-            distance = parsed["DistanceSensor"]
-            if distance >= 282:
-                if curr_pos != "4":
-                    manipulator.move_to_angles(
-                        povorot_osnovaniya=0.0,  # угол поворота основания [рад]
-                        privod_plecha=-0.35,  # угол плеча [рад]
-                        privod_strely=-0.75,  # угол стрелы [рад]
-                        v_osnovaniya=0.0,  # скорость основания [рад/с]
-                        v_plecha=0.0,  # скорость плеча [рад/с]
-                        v_strely=0.0,  # скорость стрелы [рад/с]
-                        velocity_factor=0.3,  # коэффициент скорости
-                        acceleration_factor=0.1,  # коэффициент ускорения
-                    )
-                    curr_pos = "4"
-            elif distance > 215 and distance < 282:
-                if curr_pos != "3":
-                    manipulator.move_to_angles(
-                        povorot_osnovaniya=-0.52,  # угол поворота основания [рад]
-                        privod_plecha=-0.35,  # угол плеча [рад]
-                        privod_strely=-0.75,  # угол стрелы [рад]
-                        v_osnovaniya=0.0,  # скорость основания [рад/с]
-                        v_plecha=0.0,  # скорость плеча [рад/с]
-                        v_strely=0.0,  # скорость стрелы [рад/с]
-                        velocity_factor=0.3,  # коэффициент скорости
-                        acceleration_factor=0.1,  # коэффициент ускорения
-                    )
-                    curr_pos = "3"
-                    manipulator.play_audio(file_name="warning.wav", timeout_seconds=5.0)
-            elif distance < 215 and distance > 136:
-                if curr_pos != "2":
-                    manipulator.move_to_angles(
-                        povorot_osnovaniya=-1.05,  # угол поворота основания [рад]
-                        privod_plecha=-0.35,  # угол плеча [рад]
-                        privod_strely=-0.75,  # угол стрелы [рад]
-                        v_osnovaniya=0.0,  # скорость основания [рад/с]
-                        v_plecha=0.0,  # скорость плеча [рад/с]
-                        v_strely=0.0,  # скорость стрелы [рад/с]
-                        velocity_factor=0.3,  # коэффициент скорости
-                        acceleration_factor=0.1,  # коэффициент ускорения
-                    )
-                    curr_pos = "2"
-                    manipulator.play_audio(file_name="warning.wav", timeout_seconds=5.0)
-                    manipulator.play_audio(file_name="warning.wav", timeout_seconds=5.0)
-                    manipulator.play_audio(file_name="warning.wav", timeout_seconds=5.0)
-            elif distance < 136:
-                if curr_pos != "1":
-                    manipulator.move_to_angles(
-                        povorot_osnovaniya=-1.57,  # угол поворота основания [рад]
-                        privod_plecha=-0.35,  # угол плеча [рад]
-                        privod_strely=-0.75,  # угол стрелы [рад]
-                        v_osnovaniya=0.0,  # скорость основания [рад/с]
-                        v_plecha=0.0,  # скорость плеча [рад/с]
-                        v_strely=0.0,  # скорость стрелы [рад/с]
-                        velocity_factor=0.3,  # коэффициент скорости
-                        acceleration_factor=0.1,  # коэффициент ускорения
-                    )
-                    curr_pos = "1"
-                manipulator.play_audio(file_name="warning.wav", timeout_seconds=5.0)
-        except Exception as e:
-            print(f"   ❌ Ошибка чтения: {e}")
-            manipulator.nozzle_power(False)
+    """
+    Поворот основания по зоне расстояния до объекта на конвейере.
+    Показания приходят потоком, манипулятор двигается только при смене зоны.
+    """
+    stream = ConveyorSensorStream(manipulator)
+    tracker = DistanceZoneTracker(DISTANCE_ZONES, hysteresis=ZONE_HYSTERESIS, min_dwell=ZONE_MIN_DWELL)
+    tracker.attach(stream)
+    # Пока лента пуста, датчик опрашивается редко; при движении объекта — с SENSOR_POLL_INTERVAL
+    scheduler = PollScheduler(budget=POLL_BUDGET)
+    stream.start(poll_interval=SENSOR_POLL_INTERVAL, scheduler=scheduler,
+                 max_poll_interval=SENSOR_IDLE_INTERVAL)
+    audio = AudioPlayer(manipulator, timeout_seconds=5.0)
 
+    curr_pos = "None"
+    desired = None   # зона, в позу которой нужно повернуться; после ошибки движение повторяется
+    try:
+        while True:
+            pending = desired is not None and desired != curr_pos
+            change = tracker.next_change(timeout=ZONE_RETRY_DELAY if pending else SENSOR_TIMEOUT)
+            if change is None:
+                if not pending:
+                    age = stream.age()
+                    if age is None or age > SENSOR_TIMEOUT:
+                        print(f"   ⚠️ Нет данных датчика расстояния {SENSOR_TIMEOUT:.0f} с")
+                    continue
+            else:
+                desired = change.zone.name
+                if desired == curr_pos:
+                    continue
+                _, warnings, priority = ZONE_ACTIONS[desired]
+                # Предупреждение звучит в фоне, пока манипулятор поворачивается;
+                # при приближении объекта более важное предупреждение вытесняет менее важное
+                if warnings:
+                    audio.play(WARNING_CLIP, priority=priority, repeat=warnings, interrupt=True)
+                else:
+                    audio.clear()
+
+            try:
+                move_to_zone_pose(manipulator, ZONE_ACTIONS[desired][0])
+                curr_pos = desired
+            except Exception as e:
+                print(f"   ❌ Ошибка выполнения: {e} — повтор через {ZONE_RETRY_DELAY:.1f} с")
+                manipulator.nozzle_power(False)
+    finally:
+        tracker.detach()
+        stream.stop()
+        poll_stats = scheduler.stats()
+        scheduler.close()
+        audio.close()
+        print(f"   Показаний: {tracker.samples}, смен зоны: {tracker.changes}, "
+              f"подавлено колебаний: {tracker.suppressed}")
+        audio_stats = audio.stats()
+        print(f"   Звук: воспроизведено {audio_stats['played']}, объединено {audio_stats['coalesced']}, "
+              f"вытеснено {audio_stats['dropped']}, "
+              f"ожидание в очереди p50 {audio_stats['queue_latency']['p50_ms']:.0f} мс")
+        print(f"   Опрос датчиков: {poll_stats['polls_per_s']:.1f} запросов/с "
+              f"(бюджет {poll_stats['budget_per_s']:.0f}), отложено: {poll_stats['deferred']}")
 
 
 def main():
@@ -0,0 +1,422 @@
+"""
+Архивный кодек телеметрии: квантование, дельта-кодирование и сжатие по чанкам.
+
+Запись telemetry_recorder хранит каждое поле как double (8 байт на значение).
+Для долгого хранения каналы перекладываются по столбцам, значения квантуются
+с фиксированным шагом (по умолчанию 1e-5 рад для суставов, 10 мкм для координат),
+разности соседних отсчётов пишутся самым узким целым типом array ('b'/'h'/'i'/'q'),
+и каждый чанк сжимается zlib или lzma.
+
+Формат файла (.tca):
+
+    MAGIC | чанк 0 | чанк 1 | ... | индекс (JSON) | <Q длина индекса> | MAGIC
+
+Индекс содержит каналы (топик, поля, шаблон, шаги квантования, максимальную
+ошибку квантования), таблицу строк записи и по каждому чанку смещение, длину и интервал времени,
+поэтому выборка по времени распаковывает только нужные чанки.
+
+    compress_recording(Path("telemetry/run1"), Path("telemetry/run1.tca"))
+    archive = TelemetryArchive(Path("telemetry/run1.tca"))
+    timestamps, columns = archive.columns("/joint_states", start=t0, end=t0 + 60)
+    columns["position[1]"]      # array('d'); numpy.frombuffer(...) — без копирования
+
+Запуск из консоли: python telemetry_codec.py <каталог записи> [файл.tca] [zlib|lzma]
+"""
+
+import bisect
+import fnmatch
+import heapq
+import json
+import lzma
+import math
+import operator
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from itertools import accumulate
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from telemetry_recorder import ARRAY_MARKER, FIELD_MARKER, TelemetryReader, fill_template
+
+FORMAT_VERSION = 1
+MAGIC = b"MEDUTCA1"
+FOOTER = struct.Struct("<Q8s")
+COLUMN_HEADER = struct.Struct("<cqI")     # тип array, первое значение, длина данных в байтах
+CHUNK_HEADER = struct.Struct("<IH")       # число записей, число столбцов (время + поля)
+
+ARCHIVE_SUFFIX = ".tca"
+CHUNK_RECORDS = 4096
+COMPRESSOR = "zlib"
+TIME_QUANTUM = 1e-6                       # 1 мкс
+
+# (топик, шаблон имени поля, шаг квантования); первое совпадение побеждает.
+# None — хранить значения без потерь (double, без дельт).
+DEFAULT_QUANTA: List[Tuple[str, str, Optional[float]]] = [
+    ("/joint_states", "position*", 1e-5),      # рад
+    ("/joint_states", "velocity*", 1e-4),      # рад/с
+    ("/joint_states", "effort*", 1e-3),
+    ("/coordinates", "*.position.*", 1e-5),    # м (10 мкм)
+    ("/coordinates", "*.orientation.*", 1e-6),
+    ("*", "*", 1e-6),
+]
+
+_INT_TYPECODES = ("b", "h", "i", "q")
+_INT_LIMITS = {code: 2 ** (8 * array(code).itemsize - 1) for code in _INT_TYPECODES}
+
+
+# ===================== КОДИРОВАНИЕ СТОЛБЦОВ =====================
+
+def quantum_for(topic: str, field: str, kind: str,
+                quanta: Sequence[Tuple[str, str, Optional[float]]] = DEFAULT_QUANTA) -> Optional[float]:
+    """
+    Шаг квантования поля; целые, логические поля, индексы строк и длины списков
+    всегда хранятся точно (шаг 1)
+    """
+    if kind in ("i", "b", "s", "n"):
+        return 1.0
+    for topic_pattern, field_pattern, quantum in quanta:
+        if fnmatch.fnmatchcase(topic, topic_pattern) and fnmatch.fnmatchcase(field, field_pattern):
+            return quantum
+    return None
+
+
+def _narrowest_typecode(values: Sequence[int]) -> str:
+    if not values:
+        return "b"
+    low, high = min(values), max(values)
+    for code in _INT_TYPECODES:
+        limit = _INT_LIMITS[code]
+        if -limit <= low and high < limit:
+            return code
+    raise OverflowError("Разность не помещается в int64 — уменьшите точность квантования")
+
+
+def _to_le_bytes(column: array) -> bytes:
+    if sys.byteorder == "big":
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+def _from_le_bytes(typecode: str, data: bytes) -> array:
+    column = array(typecode)
+    column.frombytes(data)
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column
+
+
+def _encode_raw(values: Sequence[float]) -> bytes:
+    data = _to_le_bytes(array("d", values))
+    return COLUMN_HEADER.pack(b"d", 0, len(data)) + data
+
+
+def encode_column(values: Sequence[float], quantum: Optional[float]) -> Tuple[bytes, float]:
+    """
+    Закодировать столбец: (байты с заголовком, максимальная ошибка квантования).
+    Квантованные значения пишутся как первое значение + разности соседних.
+    Столбец с NaN/inf или с разностями шире int64 пишется без потерь (как quantum=None):
+    decode_column различает такие столбцы по типу в заголовке.
+    """
+    if quantum is None or not all(map(math.isfinite, values)):
+        return _encode_raw(values), 0.0
+
+    scale = 1.0 / quantum
+    quantised = [round(value * scale) for value in values]
+    error = max(map(lambda v, q: abs(v - q * quantum), values, quantised), default=0.0)
+    deltas = list(map(operator.sub, quantised[1:], quantised[:-1]))
+    try:
+        typecode = _narrowest_typecode(deltas)
+    except OverflowError:
+        return _encode_raw(values), 0.0
+    data = _to_le_bytes(array(typecode, deltas))
+    base = quantised[0] if quantised else 0
+    return COLUMN_HEADER.pack(typecode.encode(), base, len(data)) + data, error
+
+
+def decode_column(buffer: bytes, offset: int, quantum: Optional[float]) -> Tuple[array, int]:
+    """Раскодировать столбец, начиная с offset: (array('d'), смещение следующего столбца)"""
+    typecode, base, length = COLUMN_HEADER.unpack_from(buffer, offset)
+    offset += COLUMN_HEADER.size
+    data = buffer[offset:offset + length]
+    offset += length
+    if typecode == b"d":
+        return _from_le_bytes("d", data), offset
+    deltas = _from_le_bytes(typecode.decode(), data)
+    values = accumulate(deltas, initial=base)
+    if quantum == 1.0:
+        return array("d", values), offset
+    return array("d", map(quantum.__mul__, values)), offset
+
+
+# ===================== ЧАНКИ =====================
+
+def _compress(data: bytes, compressor: str) -> bytes:
+    if compressor == "zlib":
+        return zlib.compress(data, 6)
+    if compressor == "lzma":
+        return lzma.compress(data, preset=6)
+    if compressor == "none":
+        return data
+    raise ValueError(f"Неизвестный компрессор: {compressor}")
+
+
+def _decompress(data: bytes, compressor: str) -> bytes:
+    if compressor == "zlib":
+        return zlib.decompress(data)
+    if compressor == "lzma":
+        return lzma.decompress(data)
+    if compressor == "none":
+        return data
+    raise ValueError(f"Неизвестный компрессор: {compressor}")
+
+
+def encode_chunk(timestamps: Sequence[float], columns: Sequence[Sequence[float]],
+                 quanta: Sequence[Optional[float]], compressor: str = COMPRESSOR) -> Tuple[bytes, List[float]]:
+    """Сжатый чанк и максимальная ошибка квантования по каждому полю"""
+    parts = [CHUNK_HEADER.pack(len(timestamps), len(columns) + 1)]
+    encoded, _ = encode_column(timestamps, TIME_QUANTUM)
+    parts.append(encoded)
+    errors = []
+    for values, quantum in zip(columns, quanta):
+        encoded, error = encode_column(values, quantum)
+        parts.append(encoded)
+        errors.append(error)
+    return _compress(b"".join(parts), compressor), errors
+
+
+def decode_chunk(blob: bytes, quanta: Sequence[Optional[float]],
+                 compressor: str = COMPRESSOR) -> Tuple[array, List[array]]:
+    """(время, столбцы полей) из сжатого чанка"""
+    buffer = _decompress(blob, compressor)
+    count, column_count = CHUNK_HEADER.unpack_from(buffer, 0)
+    if column_count != len(quanta) + 1:
+        raise ValueError(f"Чанк содержит {column_count - 1} полей, ожидалось {len(quanta)}")
+    offset = CHUNK_HEADER.size
+    timestamps, offset = decode_column(buffer, offset, TIME_QUANTUM)
+    columns = []
+    for quantum in quanta:
+        column, offset = decode_column(buffer, offset, quantum)
+        columns.append(column)
+    return timestamps, columns
+
+
+# ===================== АРХИВ =====================
+
+def _field_kinds(template: Any, kinds: Dict[int, str]) -> Dict[int, str]:
+    """Тип каждого поля ("f"/"i"/"b"/"s", "n" — длина списка) по шаблону сообщения"""
+    if isinstance(template, dict):
+        if FIELD_MARKER in template:
+            kinds[template[FIELD_MARKER]] = template.get("type", "f")
+        elif ARRAY_MARKER in template:
+            kinds[template[ARRAY_MARKER]] = "n"
+            _field_kinds(template["items"], kinds)
+        else:
+            for child in template.values():
+                _field_kinds(child, kinds)
+    elif isinstance(template, list):
+        for child in template:
+            _field_kinds(child, kinds)
+    return kinds
+
+
+def compress_recording(source: Path, archive_path: Path,
+                       quanta: Sequence[Tuple[str, str, Optional[float]]] = DEFAULT_QUANTA,
+                       compressor: str = COMPRESSOR,
+                       chunk_records: int = CHUNK_RECORDS) -> Dict[str, Any]:
+    """
+    Упаковать запись telemetry_recorder в архив .tca.
+    :return: Статистика: размер исходных чанков и архива, степень сжатия, время, ошибки квантования
+    """
+    _compress(b"", compressor)  # проверка имени компрессора до начала работы
+    reader = TelemetryReader(source)
+    started = time.perf_counter()
+    raw_bytes = 0
+    channels_index: Dict[str, Any] = {}
+    chunks_index: List[Dict[str, Any]] = []
+
+    tmp_path = archive_path.with_name(archive_path.name + ".tmp")
+    archive_path.parent.mkdir(parents=True, exist_ok=True)
+    with tmp_path.open("wb") as file:
+        file.write(MAGIC)
+        for cid, info in sorted(reader.channels.items()):
+            kinds = _field_kinds(info["template"], {})
+            field_quanta = [quantum_for(info["topic"], field, kinds.get(i, "f"), quanta)
+                            for i, field in enumerate(info["fields"])]
+            max_errors = [0.0] * len(field_quanta)
+            records = 0
+
+            def flush(timestamps: List[float], rows: List[Tuple[float, ...]]) -> None:
+                nonlocal records
+                columns = list(zip(*rows)) if rows[0] else [() for _ in field_quanta]
+                blob, errors = encode_chunk(timestamps, columns, field_quanta, compressor)
+                for i, error in enumerate(errors):
+                    max_errors[i] = max(max_errors[i], error)
+                chunks_index.append({"channel": cid, "offset": file.tell(), "length": len(blob),
+                                     "first_ts": timestamps[0], "last_ts": timestamps[-1],
+                                     "count": len(timestamps)})
+                file.write(blob)
+                records += len(timestamps)
+
+            timestamps: List[float] = []
+            rows: List[Tuple[float, ...]] = []
+            for ts, values in reader.records(cid):
+                timestamps.append(ts)
+                rows.append(values)
+                if len(timestamps) == chunk_records:
+                    flush(timestamps, rows)
+                    timestamps, rows = [], []
+            if timestamps:
+                flush(timestamps, rows)
+
+            raw_bytes += records * info["record_size"]
+            channels_index[str(cid)] = {
+                "topic": info["topic"], "fields": info["fields"], "template": info["template"],
+                "quanta": field_quanta, "max_error": max_errors, "count": records,
+            }
+
+        index = json.dumps({
+            "version": FORMAT_VERSION, "compressor": compressor, "time_quantum": TIME_QUANTUM,
+            "started_at": reader.started_at, "channels": channels_index, "chunks": chunks_index,
+            "strings": reader.strings,
+        }, ensure_ascii=False).encode("utf-8")
+        file.write(index)
+        file.write(FOOTER.pack(len(index), MAGIC))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, archive_path)
+
+    archive_bytes = archive_path.stat().st_size
+    return {
+        "records": sum(channel["count"] for channel in channels_index.values()),
+        "raw_bytes": raw_bytes,
+        "archive_bytes": archive_bytes,
+        "ratio": raw_bytes / archive_bytes if archive_bytes else 0.0,
+        "seconds": time.perf_counter() - started,
+        "max_error": {f"{c['topic']}:{field}": error
+                      for c in channels_index.values()
+                      for field, error in zip(c["fields"], c["max_error"]) if error > 0},
+    }
+
+
+class TelemetryArchive:
+    """Чтение архива .tca с распаковкой только чанков из нужного интервала времени"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        with path.open("rb") as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} не является архивом телеметрии")
+            file.seek(-FOOTER.size, os.SEEK_END)
+            index_length, magic = FOOTER.unpack(file.read(FOOTER.size))
+            if magic != MAGIC:
+                raise ValueError(f"Архив {path} повреждён или не дописан")
+            file.seek(-FOOTER.size - index_length, os.SEEK_END)
+            index = json.loads(file.read(index_length).decode("utf-8"))
+        if index.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Неподдерживаемая версия архива: {index.get('version')}")
+
+        self.compressor = index["compressor"]
+        self.started_at = index.get("started_at", 0.0)
+        self.strings: List[str] = index.get("strings", [])
+        self.channels: Dict[int, Dict[str, Any]] = {int(cid): info for cid, info in index["channels"].items()}
+        self.chunks: Dict[int, List[Dict[str, Any]]] = {}
+        for chunk in index["chunks"]:
+            self.chunks.setdefault(chunk["channel"], []).append(chunk)
+        for chunks in self.chunks.values():
+            chunks.sort(key=lambda chunk: chunk["first_ts"])
+
+    def topics(self) -> List[str]:
+        return sorted({info["topic"] for info in self.channels.values()})
+
+    def _channel_ids(self, topic: Optional[str]) -> List[int]:
+        return [cid for cid, info in self.channels.items() if topic is None or info["topic"] == topic]
+
+    def count(self, topic: Optional[str] = None) -> int:
+        return sum(self.channels[cid]["count"] for cid in self._channel_ids(topic))
+
+    def decode(self, channel_id: int, start: Optional[float] = None,
+               end: Optional[float] = None) -> Iterator[Tuple[array, List[array]]]:
+        """Раскодированные чанки канала (время, столбцы), обрезанные по [start, end]"""
+        quanta = self.channels[channel_id]["quanta"]
+        chunks = self.chunks.get(channel_id, [])
+        first = bisect.bisect_left([chunk["last_ts"] for chunk in chunks], start) if start is not None else 0
+        with self.path.open("rb") as file:
+            for chunk in chunks[first:]:
+                if end is not None and chunk["first_ts"] > end:
+                    break
+                file.seek(chunk["offset"])
+                timestamps, columns = decode_chunk(file.read(chunk["length"]), quanta, self.compressor)
+                lo = bisect.bisect_left(timestamps, start) if start is not None else 0
+                hi = bisect.bisect_right(timestamps, end) if end is not None else len(timestamps)
+                if lo > 0 or hi < len(timestamps):
+                    timestamps = timestamps[lo:hi]
+                    columns = [column[lo:hi] for column in columns]
+                if len(timestamps):
+                    yield timestamps, columns
+
+    def columns(self, topic: str, start: Optional[float] = None,
+                end: Optional[float] = None) -> Tuple[array, Dict[str, array]]:
+        """
+        Время и столбцы всех полей топика в интервале [start, end].
+        Если у топика несколько каналов (менялась форма сообщения), берётся самый длинный.
+        """
+        channel_ids = self._channel_ids(topic)
+        if not channel_ids:
+            raise KeyError(f"В архиве нет топика {topic}")
+        cid = max(channel_ids, key=lambda c: self.channels[c]["count"])
+        fields = self.channels[cid]["fields"]
+        timestamps = array("d")
+        result = {field: array("d") for field in fields}
+        for chunk_ts, chunk_columns in self.decode(cid, start, end):
+            timestamps.extend(chunk_ts)
+            for field, column in zip(fields, chunk_columns):
+                result[field].extend(column)
+        return timestamps, result
+
+    def records(self, channel_id: int, start: Optional[float] = None,
+                end: Optional[float] = None) -> Iterator[Tuple[float, Tuple[float, ...]]]:
+        """(время, значения полей) — тот же интерфейс, что у TelemetryReader.records"""
+        for timestamps, columns in self.decode(channel_id, start, end):
+            yield from zip(timestamps, zip(*columns)) if columns else ((ts, ()) for ts in timestamps)
+
+    def messages(self, topic: Optional[str] = None, start: Optional[float] = None,
+                 end: Optional[float] = None) -> Iterator[Tuple[float, str, Any]]:
+        """(время, топик, восстановленное сообщение) по всем каналам в порядке времени"""
+        def stream(cid: int) -> Iterator[Tuple[float, str, Any, Tuple[float, ...]]]:
+            info = self.channels[cid]
+            for ts, values in self.records(cid, start, end):
+                yield ts, info["topic"], info["template"], values
+
+        streams = [stream(cid) for cid in self._channel_ids(topic)]
+        for ts, topic_name, template, values in heapq.merge(*streams, key=lambda item: item[0]):
+            yield ts, topic_name, fill_template(template, values, self.strings)
+
+
+def main() -> None:
+    if len(sys.argv) < 2:
+        print("Использование: python telemetry_codec.py <каталог записи> [файл.tca] [zlib|lzma]")
+        sys.exit(1)
+
+    source = Path(sys.argv[1])
+    archive_path = Path(sys.argv[2]) if len(sys.argv) > 2 else source.with_name(source.name + ARCHIVE_SUFFIX)
+    compressor = sys.argv[3] if len(sys.argv) > 3 else COMPRESSOR
+
+    stats = compress_recording(source, archive_path, compressor=compressor)
+    print(f"[CODEC] {stats['records']} записей: {stats['raw_bytes']} → {stats['archive_bytes']} байт "
+          f"(в {stats['ratio']:.1f} раз, {stats['seconds']:.2f} с) → {archive_path}")
+    for field, error in sorted(stats["max_error"].items()):
+        print(f"   {field}: макс. ошибка {error:.2e}")
+
+    started = time.perf_counter()
+    archive = TelemetryArchive(archive_path)
+    decoded = sum(len(timestamps) for cid in archive.channels for timestamps, _ in archive.decode(cid))
+    print(f"[CODEC] Полная распаковка: {decoded} записей за {time.perf_counter() - started:.2f} с")
+
+
+if __name__ == "__main__":
+    main()
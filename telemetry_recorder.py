@@ -0,0 +1,534 @@
+"""
+Запись телеметрии топиков манипулятора в компактные бинарные файлы.
+
+Каждое сообщение раскладывается на поля (по порядку обхода JSON) и шаблон.
+Форма сообщения — только ключи и типы листьев: строки (имена суставов,
+frame_id и т.п.) пишутся полем-индексом в таблицу строк strings.jsonl, а у
+однородного списка (все элементы одной формы) длина — отдельное поле, и
+элементы дополняются до ёмкости канала. Поэтому новые каналы появляются только
+при новой структуре сообщения или при росте списка сверх ёмкости (ёмкость
+удваивается), а не от его содержимого. Для каждой пары (топик, форма) заводится
+канал с записью фиксированной длины:
+
+    <d H H> + N x <d>    — время приёма, id канала, число полей, значения полей
+
+Записи копятся в буфере канала и блоками уходят в фоновый поток записи,
+файлы режутся на чанки по CHUNK_RECORDS записей. Индекс времени
+(первое/последнее время и число записей каждого чанка) и описание каналов
+лежат в meta.json. Память писателя постоянна: буфер на канал плюс
+ограниченная очередь блоков; если диск не успевает, блоки отбрасываются
+и учитываются в dropped.
+
+    recorder = TelemetryRecorder(m, Path("telemetry/run1"), ["/joint_states", "/coordinates"])
+    recorder.start()
+    ...
+    recorder.stop()
+
+    reader = TelemetryReader(Path("telemetry/run1"))
+    for ts, topic, message in reader.messages(topic="/coordinates", start=t0, end=t0 + 5):
+        ...
+"""
+
+import bisect
+import heapq
+import json
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from topic_listeners import add_listener, remove_listener
+
+FORMAT_VERSION = 2
+READABLE_VERSIONS = (1, 2)     # в версии 1 строки лежали прямо в шаблоне канала
+META_FILE = "meta.json"
+STRINGS_FILE = "strings.jsonl"
+
+RECORD_HEADER = struct.Struct("<dHH")
+FIELD_FORMAT = "d"
+
+CHUNK_RECORDS = 65536          # записей в одном файле-чанке
+BUFFER_RECORDS = 1024          # записей в буфере канала перед передачей в поток записи
+WRITE_QUEUE_BLOCKS = 16        # максимум блоков, ожидающих записи
+MAX_CHANNELS = 1 << 16         # id канала в заголовке записи — H
+MAX_FIELDS = (1 << 16) - 1     # число полей в заголовке записи — H
+
+FIELD_MARKER = "__field__"
+ARRAY_MARKER = "__array__"
+
+Template = Any
+
+
+# ===================== РАЗБОР СООБЩЕНИЙ =====================
+
+_SCALAR_TYPES = (bool, int, float, str)
+
+
+def _shape(node: Any, fixed: bool) -> Any:
+    """
+    Форма узла: ключи и типы листьев. Список, все элементы которого одной формы,
+    — ("array", форма элемента) без длины; остальные списки и списки внутри
+    элементов однородного списка (fixed) — ("list", формы элементов).
+    """
+    if isinstance(node, (bool, int, float, str)):
+        return type(node)
+    if isinstance(node, dict):
+        return (dict,) + tuple((key, _shape(value, fixed)) for key, value in node.items())
+    if isinstance(node, list):
+        items = [_shape(value, True) for value in node]
+        if not fixed and all(item == items[0] for item in items[1:]):
+            return ("array", items[0] if items else None)
+        return ("list",) + tuple(items)
+    return node
+
+
+def split_message(message: Any, capacities: Sequence[int] = ()) -> Tuple[Template, List[str]]:
+    """
+    Шаблон сообщения и имена полей записи. В шаблоне листья заменены на
+    {"__field__": индекс, "type": "f"|"i"|"b"|"s"}, однородный список — на
+    {"__array__": индекс поля длины, "items": [шаблоны элементов]}.
+    capacities — ёмкость однородных списков по порядку обхода (по умолчанию их длина).
+    """
+    names: List[str] = []
+    remaining = iter(capacities)
+
+    def leaf(path: str, kind: str) -> Template:
+        names.append(path)
+        return {FIELD_MARKER: len(names) - 1, "type": kind}
+
+    def walk(node: Any, path: str, fixed: bool) -> Template:
+        if isinstance(node, bool):
+            return leaf(path, "b")
+        if isinstance(node, int):
+            return leaf(path, "i")
+        if isinstance(node, float):
+            return leaf(path, "f")
+        if isinstance(node, str):
+            return leaf(path, "s")
+        if isinstance(node, dict):
+            return {key: walk(value, f"{path}.{key}" if path else str(key), fixed) for key, value in node.items()}
+        if isinstance(node, list):
+            if not fixed and _shape(node, False)[0] == "array":
+                length_field = leaf(f"len({path})", "n")[FIELD_MARKER]
+                capacity = next(remaining, len(node))
+                # Элементы сверх длины сообщения — той же формы, что и последний
+                items = [walk(node[min(i, len(node) - 1)], f"{path}[{i}]", True) for i in range(capacity)]
+                return {ARRAY_MARKER: length_field, "items": items}
+            return [walk(value, f"{path}[{i}]", True) for i, value in enumerate(node)]
+        return node
+
+    return walk(message, "", False), names
+
+
+def extract_values(message: Any,
+                   intern: Callable[[str], int]) -> Tuple[List[float], Tuple[Any, ...], List[Tuple[int, int, int]]]:
+    """
+    Быстрый путь: значения полей, форма сообщения (как _shape) и однородные списки
+    за один обход. Строки заменяются индексом intern(строка). Однородный список
+    даёт поле длины и (индекс поля длины, длина, полей на элемент) в третьем значении.
+    """
+    values: List[float] = []
+    arrays: List[Tuple[int, int, int]] = []
+
+    def walk(node: Any, fixed: bool) -> Any:
+        if isinstance(node, bool):
+            values.append(float(node))
+            return bool
+        if isinstance(node, (int, float)):
+            values.append(float(node))
+            return type(node)
+        if isinstance(node, str):
+            values.append(float(intern(node)))
+            return str
+        if isinstance(node, dict):
+            return (dict,) + tuple((key, walk(value, fixed)) for key, value in node.items())
+        if isinstance(node, list):
+            if fixed:
+                return ("list",) + tuple(walk(value, True) for value in node)
+            start = len(values)
+            values.append(float(len(node)))
+            kind = type(node[0]) if node else None
+            if kind in _SCALAR_TYPES and all(type(value) is kind for value in node):
+                # Частый случай (position, velocity, name): список скаляров одного типа
+                values.extend(map(float, map(intern, node) if kind is str else node))
+                arrays.append((start, len(node), 1))
+                return ("array", kind)
+            items = [walk(value, True) for value in node]
+            if all(item == items[0] for item in items[1:]):
+                per_item = (len(values) - start - 1) // len(node) if node else 0
+                arrays.append((start, len(node), per_item))
+                return ("array", items[0] if items else None)
+            del values[start]
+            return ("list",) + tuple(items)
+        return node
+
+    signature = walk(message, False)
+    return values, signature if isinstance(signature, tuple) else (signature,), arrays
+
+
+def _pad_arrays(values: List[float], arrays: Sequence[Tuple[int, int, int]], capacities: Sequence[int]) -> None:
+    """Дополнить однородные списки нулями до ёмкости канала (с конца, чтобы индексы не сдвигались)"""
+    for (start, length, per_item), capacity in zip(reversed(arrays), reversed(capacities)):
+        if capacity > length:
+            end = start + 1 + length * per_item
+            values[end:end] = [0.0] * ((capacity - length) * per_item)
+
+
+def fill_template(template: Template, values: Sequence[float], strings: Sequence[str] = ()) -> Any:
+    """Собрать сообщение обратно из шаблона, значений полей и таблицы строк"""
+    if isinstance(template, dict):
+        if FIELD_MARKER in template:
+            value = values[template[FIELD_MARKER]]
+            kind = template.get("type")
+            if kind == "b":
+                return bool(value)
+            if kind == "i":
+                return int(value)
+            if kind == "s":
+                return strings[int(value)]
+            return value
+        if ARRAY_MARKER in template:
+            length = int(values[template[ARRAY_MARKER]])
+            return [fill_template(child, values, strings) for child in template["items"][:length]]
+        return {key: fill_template(child, values, strings) for key, child in template.items()}
+    if isinstance(template, list):
+        return [fill_template(child, values, strings) for child in template]
+    return template
+
+
+# ===================== ЗАПИСЬ =====================
+
+class _Channel:
+    """Канал записи: один топик с одной формой сообщения"""
+
+    def __init__(self, channel_id: int, topic: str, template: Template, fields: List[str],
+                 capacities: List[int]):
+        self.id = channel_id
+        self.topic = topic
+        self.template = template
+        self.fields = fields
+        self.capacities = capacities
+        self.record = struct.Struct(RECORD_HEADER.format + FIELD_FORMAT * len(fields))
+        self.buffer = bytearray(self.record.size * BUFFER_RECORDS)
+        self.buffered = 0
+        self.first_ts: Optional[float] = None
+        self.last_ts = 0.0
+
+        self.chunk_index = 0
+        self.chunk_records = 0
+
+    def describe(self) -> Dict[str, Any]:
+        return {"topic": self.topic, "fields": self.fields, "template": self.template,
+                "record_size": self.record.size, "record_format": self.record.format}
+
+
+class TelemetryRecorder:
+    """Подписка на топики и запись сообщений в чанкованные бинарные файлы"""
+
+    def __init__(self, manip: Any, directory: Path, topics: Sequence[str],
+                 chunk_records: int = CHUNK_RECORDS):
+        self.manip = manip
+        self.directory = directory
+        self.topics = list(topics)
+        self.chunk_records = chunk_records
+
+        self._channels: Dict[int, _Channel] = {}
+        self._by_shape: Dict[Tuple[str, Tuple[Any, ...]], _Channel] = {}
+        self._chunks: List[Dict[str, Any]] = []
+        self._listeners: Dict[str, Any] = {}
+        self._string_ids: Dict[str, int] = {}
+        self._strings_file: Optional[Any] = None
+        self._overflow_reported = False
+
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[Tuple[_Channel, int, bytes, float, float, int]]]" = \
+            queue.Queue(maxsize=WRITE_QUEUE_BLOCKS)
+        self._writer: Optional[threading.Thread] = None
+        self._files: Dict[Tuple[int, int], Any] = {}
+
+        self.received = 0
+        self.dropped = 0
+        self.started_at = 0.0
+
+    # --- Управление ---
+
+    def start(self) -> None:
+        if (self.directory / META_FILE).exists():
+            raise FileExistsError(f"В {self.directory} уже есть запись телеметрии")
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.started_at = time.time()
+        self._strings_file = (self.directory / STRINGS_FILE).open("a", encoding="utf-8")
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+        for topic in self.topics:
+            listener = self._make_listener(topic)
+            self._listeners[topic] = listener
+            add_listener(self.manip, topic, listener)
+        print(f"[RECORDER] Запись {', '.join(self.topics)} → {self.directory}")
+
+    def stop(self) -> None:
+        for topic, listener in self._listeners.items():
+            try:
+                remove_listener(self.manip, topic, listener)
+            except Exception as e:
+                print(f"[RECORDER] Ошибка при отписке от {topic}: {e}")
+        self._listeners.clear()
+
+        with self._lock:
+            items = [self._take_block(channel) for channel in self._channels.values()]
+        if self._writer is not None:
+            # Ждём место в очереди вне блокировки: поток записи сам берёт self._lock
+            for item in items:
+                if item is not None:
+                    self._queue.put(item)
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+        for file in self._files.values():
+            file.close()
+        self._files.clear()
+        if self._strings_file is not None:
+            self._strings_file.close()
+            self._strings_file = None
+        self._write_meta()
+        print(f"[RECORDER] Остановлено: принято {self.received}, потеряно {self.dropped}")
+
+    def _make_listener(self, topic: str):
+        def listener(data: Dict[str, Any]) -> None:
+            self.record(topic, data, time.time())
+        return listener
+
+    # --- Приём сообщений ---
+
+    def record(self, topic: str, message: Any, timestamp: float) -> None:
+        """Записать одно сообщение (вызывается из потока MQTT)"""
+        with self._lock:
+            self.received += 1
+            values, signature, arrays = extract_values(message, self._intern)
+            channel = self._by_shape.get((topic, signature))
+            if channel is None or any(length > capacity for (_, length, _), capacity
+                                      in zip(arrays, channel.capacities)):
+                channel = self._new_channel(topic, message, signature, arrays, channel)
+                if channel is None:
+                    self.dropped += 1
+                    return
+            if arrays:
+                _pad_arrays(values, arrays, channel.capacities)
+
+            channel.record.pack_into(channel.buffer, channel.buffered * channel.record.size,
+                                     timestamp, channel.id, len(values), *values)
+            channel.buffered += 1
+            if channel.first_ts is None:
+                channel.first_ts = timestamp
+            channel.last_ts = timestamp
+
+            if channel.buffered == BUFFER_RECORDS or \
+                    channel.chunk_records + channel.buffered >= self.chunk_records:
+                self._flush_channel(channel)
+
+    def _new_channel(self, topic: str, message: Any, signature: Tuple[Any, ...],
+                     arrays: List[Tuple[int, int, int]], previous: Optional[_Channel]) -> Optional[_Channel]:
+        """
+        Канал для новой формы сообщения или замена канала, у которого однородный список
+        перерос ёмкость (ёмкость удваивается). None — канал не помещается в формат записи.
+        """
+        if previous is None:
+            capacities = [length for _, length, _ in arrays]
+        else:
+            capacities = [max(length, 2 * capacity)
+                          for (_, length, _), capacity in zip(arrays, previous.capacities)]
+        template, fields = split_message(message, capacities)
+        if len(self._channels) >= MAX_CHANNELS or len(fields) > MAX_FIELDS:
+            if not self._overflow_reported:
+                print(f"[RECORDER] {topic}: канал не помещается в формат записи "
+                      f"(каналов {len(self._channels)}, полей {len(fields)}), сообщения отбрасываются")
+                self._overflow_reported = True
+            return None
+        channel = _Channel(len(self._channels), topic, template, fields, capacities)
+        self._channels[channel.id] = channel
+        self._by_shape[(topic, signature)] = channel
+        return channel
+
+    def _intern(self, text: str) -> int:
+        """Индекс строки в таблице strings.jsonl (вызывается под self._lock)"""
+        index = self._string_ids.get(text)
+        if index is None:
+            index = len(self._string_ids)
+            self._string_ids[text] = index
+            if self._strings_file is not None:
+                # Сразу на диск: записи ссылаются на строку, даже если запись оборвётся
+                self._strings_file.write(json.dumps(text, ensure_ascii=False) + "\n")
+                self._strings_file.flush()
+        return index
+
+    def _take_block(self, channel: _Channel) -> Optional[Tuple[_Channel, int, bytes, float, float, int]]:
+        """Забрать накопленные записи канала блоком для потока записи (под self._lock)"""
+        if channel.buffered == 0:
+            return None
+        item = (channel, channel.chunk_index, bytes(channel.buffer[:channel.buffered * channel.record.size]),
+                channel.first_ts, channel.last_ts, channel.buffered)
+        channel.chunk_records += channel.buffered
+        if channel.chunk_records >= self.chunk_records:
+            channel.chunk_index += 1
+            channel.chunk_records = 0
+        channel.buffered = 0
+        channel.first_ts = None
+        return item
+
+    def _flush_channel(self, channel: _Channel) -> None:
+        """Передать буфер в поток записи без ожидания; если очередь полна — блок теряется"""
+        item = self._take_block(channel)
+        if item is None:
+            return
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += item[5]
+
+    # --- Поток записи ---
+
+    def _chunk_name(self, channel_id: int, chunk_index: int) -> str:
+        return f"ch{channel_id:03d}_{chunk_index:05d}.bin"
+
+    def _write_loop(self) -> None:
+        chunk_meta: Dict[Tuple[int, int], Dict[str, Any]] = {}
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            channel, chunk_index, block_bytes, first_ts, last_ts, count = item
+            key = (channel.id, chunk_index)
+            try:
+                file = self._files.get(key)
+                if file is None:
+                    # Предыдущий чанк канала закрыт — файл больше не нужен открытым
+                    previous = self._files.pop((channel.id, chunk_index - 1), None)
+                    if previous is not None:
+                        previous.close()
+                    file = (self.directory / self._chunk_name(channel.id, chunk_index)).open("ab")
+                    self._files[key] = file
+                file.write(block_bytes)
+                file.flush()
+            except OSError as e:
+                print(f"[RECORDER] Ошибка записи {self._chunk_name(channel.id, chunk_index)}: {e}")
+                with self._lock:
+                    self.dropped += count
+                continue
+
+            with self._lock:
+                meta = chunk_meta.get(key)
+                if meta is None:
+                    meta = {"channel": channel.id, "file": self._chunk_name(channel.id, chunk_index),
+                            "first_ts": first_ts, "last_ts": last_ts, "count": 0}
+                    chunk_meta[key] = meta
+                    self._chunks.append(meta)
+                    new_chunk = True
+                else:
+                    new_chunk = False
+                meta["last_ts"] = last_ts
+                meta["count"] += count
+            if new_chunk:
+                self._write_meta()
+
+    def _write_meta(self) -> None:
+        with self._lock:
+            meta = {
+                "version": FORMAT_VERSION,
+                "record_header": RECORD_HEADER.format,
+                "started_at": self.started_at,
+                "channels": {str(cid): channel.describe() for cid, channel in self._channels.items()},
+                "chunks": [dict(chunk) for chunk in self._chunks],
+            }
+        tmp_path = self.directory / (META_FILE + ".tmp")
+        tmp_path.write_text(json.dumps(meta, ensure_ascii=False, indent=1), encoding="utf-8")
+        os.replace(tmp_path, self.directory / META_FILE)
+
+
+# ===================== ЧТЕНИЕ =====================
+
+class TelemetryReader:
+    """Чтение записи через mmap с выборкой по топику и интервалу времени"""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        meta = json.loads((directory / META_FILE).read_text(encoding="utf-8"))
+        if meta.get("version") not in READABLE_VERSIONS:
+            raise ValueError(f"Неподдерживаемая версия записи: {meta.get('version')}")
+        self.started_at = meta.get("started_at", 0.0)
+        strings_path = directory / STRINGS_FILE
+        self.strings: List[str] = []
+        if strings_path.exists():
+            with strings_path.open(encoding="utf-8") as file:
+                self.strings = [json.loads(line) for line in file if line.strip()]
+        self.channels: Dict[int, Dict[str, Any]] = {int(cid): info for cid, info in meta["channels"].items()}
+        self._structs = {cid: struct.Struct(info["record_format"]) for cid, info in self.channels.items()}
+
+        # Чанки каждого канала по времени; фактическое число записей берём из размера файла
+        self.chunks: Dict[int, List[Dict[str, Any]]] = {}
+        for chunk in meta["chunks"]:
+            self.chunks.setdefault(chunk["channel"], []).append(chunk)
+        for chunks in self.chunks.values():
+            chunks.sort(key=lambda chunk: chunk["first_ts"])
+
+    def topics(self) -> List[str]:
+        return sorted({info["topic"] for info in self.channels.values()})
+
+    def _channel_ids(self, topic: Optional[str]) -> List[int]:
+        return [cid for cid, info in self.channels.items() if topic is None or info["topic"] == topic]
+
+    def records(self, channel_id: int, start: Optional[float] = None,
+                end: Optional[float] = None) -> Iterator[Tuple[float, Tuple[float, ...]]]:
+        """(время, значения полей) канала в интервале [start, end]"""
+        record = self._structs[channel_id]
+        chunks = self.chunks.get(channel_id, [])
+        # Последний чанк мог дописываться после сохранения meta.json — его конец не ограничиваем
+        last_ts = [chunk["last_ts"] for chunk in chunks[:-1]] + [float("inf")] * bool(chunks)
+        first = bisect.bisect_left(last_ts, start) if start is not None else 0
+
+        for chunk in chunks[first:]:
+            if end is not None and chunk["first_ts"] > end:
+                break
+            path = self.directory / chunk["file"]
+            size = path.stat().st_size
+            count = size // record.size
+            if count == 0:
+                continue
+            with path.open("rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                # Двоичный поиск первой записи >= start по фиксированным смещениям
+                lo, hi = 0, count
+                if start is not None:
+                    while lo < hi:
+                        mid = (lo + hi) // 2
+                        if record.unpack_from(mapped, mid * record.size)[0] < start:
+                            lo = mid + 1
+                        else:
+                            hi = mid
+                for i in range(lo, count):
+                    row = record.unpack_from(mapped, i * record.size)
+                    if end is not None and row[0] > end:
+                        return
+                    yield row[0], row[3:]
+
+    def messages(self, topic: Optional[str] = None, start: Optional[float] = None,
+                 end: Optional[float] = None) -> Iterator[Tuple[float, str, Any]]:
+        """(время, топик, восстановленное сообщение) по всем каналам в порядке времени"""
+        def stream(cid: int) -> Iterator[Tuple[float, str, Any, Tuple[float, ...]]]:
+            info = self.channels[cid]
+            for ts, values in self.records(cid, start, end):
+                yield ts, info["topic"], info["template"], values
+
+        streams = [stream(cid) for cid in self._channel_ids(topic)]
+        for ts, topic_name, template, values in heapq.merge(*streams, key=lambda item: item[0]):
+            yield ts, topic_name, fill_template(template, values, self.strings)
+
+    def count(self, topic: Optional[str] = None) -> int:
+        total = 0
+        for cid in self._channel_ids(topic):
+            size = self._structs[cid].size
+            total += sum((self.directory / chunk["file"]).stat().st_size // size
+                         for chunk in self.chunks.get(cid, []))
+        return total
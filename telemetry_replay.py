@@ -0,0 +1,232 @@
+"""
+Воспроизведение записанного трафика топиков в Manipulator.process_message без манипулятора.
+
+Источники записи:
+    - каталог telemetry_recorder (meta.json + чанки);
+    - архив telemetry_codec (.tca);
+    - JSONL: по строке {"ts": ..., "topic": "...", "payload": <строка или JSON>}.
+
+Сообщения подаются в process_message (или в OfflineConnection.inject — тот же путь,
+что у MQTT-колбэка) в реальном времени, в N раз быстрее или без пауз.
+По итогам печатается пропускная способность и задержка обработчиков (p50/p99/max).
+
+    m = make_offline_manipulator()
+    m.set_coordinates_handler(my_handler)
+    report = replay(m.message_bus.inject, load_recording(Path("telemetry/run1")), speed=None)
+    print_report(report)
+
+Запуск из консоли: python telemetry_replay.py <запись> [скорость|max]
+"""
+
+import contextlib
+import json
+import os
+import sys
+import time
+from collections import Counter, deque
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from telemetry_codec import ARCHIVE_SUFFIX, TelemetryArchive
+from telemetry_recorder import META_FILE, TelemetryReader
+
+# Скорость по умолчанию: None — без пауз, 1.0 — реальное время, 10.0 — в 10 раз быстрее
+SPEED: Optional[float] = None
+PUBLISHED_HISTORY = 1000
+
+Message = Tuple[float, str, str]
+
+
+class OfflineConnection:
+    """
+    Замена ManipulatorConnection без сети: та же сигнатура конструктора,
+    публикации складываются в published, входящие сообщения подаются через inject().
+    """
+
+    def __init__(self, host: str, client_id: str, login: str, password: str,
+                 on_message: Callable[[str, str], None]):
+        self.host = host
+        self.client_id = client_id
+        self.login = login
+        self.password = password
+        self.on_message = on_message
+        self.is_connected = False
+        self.subscriptions: Set[str] = set()
+        self.published: Deque[Tuple[str, str]] = deque(maxlen=PUBLISHED_HISTORY)
+        self.published_count = 0
+
+    def connect(self) -> None:
+        self.is_connected = True
+
+    async def connect_async(self) -> None:
+        self.connect()
+
+    def disconnect(self) -> None:
+        self.is_connected = False
+
+    def subscribe(self, topic: str) -> None:
+        self.subscriptions.add(topic)
+
+    def unsubscribe(self, topic: str) -> None:
+        self.subscriptions.discard(topic)
+
+    def publish(self, topic: str, payload: Any, *args: Any, **kwargs: Any) -> None:
+        self.published_count += 1
+        self.published.append((topic, payload if isinstance(payload, str) else str(payload)))
+
+    def inject(self, topic: str, payload: str) -> None:
+        """Доставить сообщение так же, как это делает MQTT-колбэк"""
+        self.on_message(topic, payload)
+
+
+def make_offline_manipulator(manipulator_class: Any = None) -> Any:
+    """Manipulator (по умолчанию hehe.Manipulator) поверх OfflineConnection"""
+    if manipulator_class is None:
+        from hehe import Manipulator as manipulator_class
+    manipulator = manipulator_class("offline", "replay", "", "", connection_factory=OfflineConnection)
+    manipulator.connect()
+    return manipulator
+
+
+# ===================== ИСТОЧНИКИ =====================
+
+def _read_jsonl(path: Path) -> Iterator[Message]:
+    with path.open("r", encoding="utf-8") as file:
+        for line_no, line in enumerate(file, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+                payload = entry["payload"]
+                yield (float(entry["ts"]), str(entry["topic"]),
+                       payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False))
+            except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+                print(f"[REPLAY] Пропущена строка {path}:{line_no}: {e}", file=sys.stderr)
+
+
+def _read_recording(reader: Any, topics: Optional[Iterable[str]]) -> Iterator[Message]:
+    wanted = set(topics) if topics is not None else None
+    for ts, topic, message in reader.messages():
+        if wanted is None or topic in wanted:
+            yield ts, topic, json.dumps(message, ensure_ascii=False)
+
+
+def load_recording(path: Path, topics: Optional[Iterable[str]] = None) -> Iterator[Message]:
+    """(время, топик, payload-строка) из каталога записи, архива .tca или JSONL-файла"""
+    if path.is_dir() and (path / META_FILE).exists():
+        return _read_recording(TelemetryReader(path), topics)
+    if path.suffix == ARCHIVE_SUFFIX:
+        return _read_recording(TelemetryArchive(path), topics)
+    wanted = set(topics) if topics is not None else None
+    return (m for m in _read_jsonl(path) if wanted is None or m[1] in wanted)
+
+
+# ===================== ВОСПРОИЗВЕДЕНИЕ =====================
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def replay(target: Callable[[str, str], None],
+           messages: Iterable[Message],
+           speed: Optional[float] = SPEED,
+           quiet: bool = True) -> Dict[str, Any]:
+    """
+    Подать сообщения в target(topic, payload).
+    :param speed: None — без пауз; 1.0 — реальное время; N — в N раз быстрее
+    :param quiet: Подавить вывод обработчиков (process_message много печатает)
+    :return: Отчёт: число сообщений, время, пропускная способность, задержки (мкс), отставание
+    """
+    if speed is not None and speed <= 0:
+        raise ValueError("speed должен быть положительным или None")
+
+    latencies: List[float] = []
+    per_topic: Counter = Counter()
+    errors = 0
+    max_lag = 0.0
+    first_ts: Optional[float] = None
+
+    sink = open(os.devnull, "w") if quiet else None
+    redirect = contextlib.redirect_stdout(sink) if sink is not None else contextlib.nullcontext()
+    started = time.perf_counter()
+    try:
+        with redirect:
+            for ts, topic, payload in messages:
+                if speed is not None:
+                    if first_ts is None:
+                        first_ts = ts
+                    due = started + (ts - first_ts) / speed
+                    delay = due - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    else:
+                        max_lag = max(max_lag, -delay)
+
+                call_started = time.perf_counter_ns()
+                try:
+                    target(topic, payload)
+                except Exception:
+                    errors += 1
+                latencies.append((time.perf_counter_ns() - call_started) / 1000.0)
+                per_topic[topic] += 1
+    finally:
+        if sink is not None:
+            sink.close()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    count = len(latencies)
+    busy = sum(latencies) / 1e6
+    return {
+        "messages": count,
+        "errors": errors,
+        "speed": "max" if speed is None else speed,
+        "wall_seconds": elapsed,
+        "throughput_msgs_per_s": count / elapsed if elapsed > 0 else 0.0,
+        "handler_capacity_msgs_per_s": count / busy if busy > 0 else 0.0,
+        "latency_us": {
+            "p50": _percentile(latencies, 0.50),
+            "p99": _percentile(latencies, 0.99),
+            "max": latencies[-1] if latencies else 0.0,
+            "mean": (sum(latencies) / count) if count else 0.0,
+        },
+        "max_lag_ms": max_lag * 1000.0,
+        "per_topic": dict(per_topic),
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    latency = report["latency_us"]
+    print(f"[REPLAY] Сообщений: {report['messages']} (ошибок: {report['errors']}), "
+          f"скорость: {report['speed']}, время: {report['wall_seconds']:.3f} с")
+    print(f"[REPLAY] Пропускная способность: {report['throughput_msgs_per_s']:.0f} сообщ/с, "
+          f"предел обработчиков: {report['handler_capacity_msgs_per_s']:.0f} сообщ/с")
+    print(f"[REPLAY] Задержка обработки, мкс: p50={latency['p50']:.1f} p99={latency['p99']:.1f} "
+          f"max={latency['max']:.1f}")
+    if report["speed"] != "max":
+        print(f"[REPLAY] Максимальное отставание от расписания: {report['max_lag_ms']:.1f} мс")
+    for topic, count in sorted(report["per_topic"].items()):
+        print(f"   {topic}: {count}")
+
+
+def main() -> None:
+    if len(sys.argv) < 2:
+        print("Использование: python telemetry_replay.py <каталог записи | файл.tca | файл.jsonl> [скорость|max]")
+        sys.exit(1)
+
+    path = Path(sys.argv[1])
+    speed = SPEED
+    if len(sys.argv) > 2:
+        speed = None if sys.argv[2] == "max" else float(sys.argv[2])
+
+    manipulator = make_offline_manipulator()
+    report = replay(manipulator.message_bus.inject, load_recording(path), speed=speed)
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()
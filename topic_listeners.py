@@ -0,0 +1,26 @@
+"""
+Подписка нескольких слушателей на топик манипулятора.
+
+hehe.Manipulator поддерживает add_topic_listener/remove_topic_listener
+(несколько слушателей, JSON разбирается один раз). У MEdu из установленного
+SDK этого может не быть — тогда слушатель ставится единственным обработчиком
+топика через _set_topic_handler и при снятии топик отписывается целиком.
+"""
+
+from typing import Any, Callable, Dict
+
+Listener = Callable[[Dict[str, Any]], None]
+
+
+def add_listener(manip: Any, topic: str, listener: Listener) -> None:
+    if hasattr(manip, "add_topic_listener"):
+        manip.add_topic_listener(topic, listener)
+    else:
+        manip._set_topic_handler(topic, listener)
+
+
+def remove_listener(manip: Any, topic: str, listener: Listener) -> None:
+    if hasattr(manip, "remove_topic_listener"):
+        manip.remove_topic_listener(topic, listener)
+    else:
+        manip.unsubscribe_from_topic(topic)
@@ -7,15 +7,26 @@ conveyor_control.py — удобные обёртки для работы с к
 а вся необходимая подготовка (подключение к манипулятору, проверка конвейера)
 делается внутри.
 
+Подключение одно на процесс (ConveyorSession): первый вызов подключается и
+захватывает управление, следующие переиспользуют ту же сессию MQTT. При ошибке
+сессия пересоздаётся и команда повторяется один раз; при выходе из программы
+конвейер останавливается и соединение закрывается (atexit).
+
+    session_stats()     # задержки по каждой операции, число переподключений
+    close_session()     # закрыть явно (например, перед сменой HOST)
+
 Требования:
     - Установлен SDK, работает импорт:
           from sdk.manipulators.medu import MEdu
     - Заполнены параметры подключения HOST / CLIENT_ID / LOGIN / PASSWORD
 """
 
+import atexit
 import json
+import threading
 import time
-from typing import Any, Dict, List, Optional
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, TypeVar
 
 from sdk.manipulators.medu import MEdu
 
@@ -28,6 +39,11 @@ CLIENT_ID = "test-client"         # ID клиента
 LOGIN = "user"              # Логин
 PASSWORD = "pass"           # Пароль
 
+RETRIES = 1                 # повторов команды после переподключения
+LATENCY_HISTORY = 256       # последних замеров на операцию
+
+T = TypeVar("T")
+
 
 # ================== БАЗОВЫЕ ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ ==================
 
@@ -61,7 +77,7 @@ def _safe_cleanup(manipulator: Optional[MEdu]) -> None:
     """
     Пытается корректно остановить конвейер и движение манипулятора.
 
-    Вызывается в блоке finally всех публичных функций.
+    Вызывается при закрытии сессии (ConveyorSession.close).
     """
     if manipulator is None:
         return
@@ -80,13 +96,152 @@ def _safe_cleanup(manipulator: Optional[MEdu]) -> None:
         print(f"[CLEANUP] Ошибка при stop_movement: {e}")
 
 
+# ================== ПОСТОЯННАЯ СЕССИЯ ==================
+
+class _OperationStats:
+    """Счётчики и задержки одной операции"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.latency: Deque[float] = deque(maxlen=LATENCY_HISTORY)
+
+    def summary(self) -> Dict[str, Any]:
+        ordered = sorted(self.latency)
+        result: Dict[str, Any] = {"calls": self.calls, "errors": self.errors}
+        if ordered:
+            result["p50_ms"] = ordered[len(ordered) // 2] * 1000.0
+            result["p95_ms"] = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000.0
+            result["max_ms"] = ordered[-1] * 1000.0
+        return result
+
+
+class ConveyorSession:
+    """
+    Одно авторизованное подключение к манипулятору на все вызовы.
+
+    Подключение ленивое (при первой команде), команды выполняются по очереди под
+    блокировкой. Если команда упала, сессия считается испорченной: соединение
+    закрывается, создаётся новое, и команда повторяется до retries раз.
+    """
+
+    def __init__(self, factory: Callable[[], MEdu] = _create_manipulator, retries: int = RETRIES):
+        self.factory = factory
+        self.retries = retries
+        self.manip: Optional[MEdu] = None
+        self._lock = threading.RLock()
+        self._atexit_registered = False
+
+        self.connects = 0
+        self.reconnects = 0
+        self.connect_time = 0.0          # длительность последнего подключения, с
+        self._operations: Dict[str, _OperationStats] = {}
+
+    @property
+    def connected(self) -> bool:
+        return self.manip is not None
+
+    def connect(self) -> MEdu:
+        """Подключиться, если ещё не подключены; возвращает манипулятор"""
+        with self._lock:
+            if self.manip is None:
+                started = time.monotonic()
+                self.manip = self.factory()
+                self.connect_time = time.monotonic() - started
+                self.connects += 1
+                print(f"[SESSION] Сессия открыта за {self.connect_time * 1000.0:.0f} мс.")
+                if not self._atexit_registered:
+                    atexit.register(self.close)
+                    self._atexit_registered = True
+            return self.manip
+
+    def _drop(self) -> None:
+        """Бросить испорченное соединение без остановки конвейера (он может быть недоступен)"""
+        manip, self.manip = self.manip, None
+        if manip is None:
+            return
+        try:
+            manip.disconnect()
+        except Exception as e:
+            print(f"[SESSION] Ошибка при отключении: {e}")
+
+    def call(self, name: str, action: Callable[[Any], T]) -> T:
+        """
+        Выполнить action(manipulator.mgbot_conveyer) в общей сессии.
+        Команды конвейера идемпотентны, поэтому после переподключения их можно повторить.
+        """
+        stats = self._operations.setdefault(name, _OperationStats())
+        with self._lock:
+            attempt = 0
+            while True:
+                started = time.monotonic()
+                try:
+                    conveyor = self.connect().mgbot_conveyer
+                    result = action(conveyor)
+                except Exception as e:
+                    stats.errors += 1
+                    self._drop()
+                    if attempt >= self.retries:
+                        raise
+                    attempt += 1
+                    self.reconnects += 1
+                    print(f"[SESSION] {name}: {e}; переподключаюсь (попытка {attempt}/{self.retries})...")
+                    continue
+                stats.calls += 1
+                stats.latency.append(time.monotonic() - started)
+                return result
+
+    def close(self) -> None:
+        """Остановить конвейер и движение, отключиться"""
+        with self._lock:
+            if self.manip is None:
+                return
+            _safe_cleanup(self.manip)
+            self._drop()
+            print("[SESSION] Сессия закрыта.")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "connected": self.connected,
+                "connects": self.connects,
+                "reconnects": self.reconnects,
+                "connect_ms": self.connect_time * 1000.0,
+                "operations": {name: op.summary() for name, op in self._operations.items()},
+            }
+
+
+_session: Optional[ConveyorSession] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> ConveyorSession:
+    """Общая сессия модуля (создаётся при первом обращении)"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = ConveyorSession()
+        return _session
+
+
+def close_session() -> None:
+    """Закрыть общую сессию; следующий вызов подключится заново"""
+    if _session is not None:
+        _session.close()
+
+
+def session_stats() -> Dict[str, Any]:
+    """Статистика общей сессии: подключения и задержки по операциям"""
+    return get_session().stats()
+
+
 # ================== ВЫСОКОУРОВНЕВЫЕ ОБЁРТКИ ДЛЯ ЛОГИКИ ==================
 # Каждую из этих функций удобно вызывать из вашей логики напрямую.
 # Внутри они сами:
-#   * создают и настраивают manipulator (MEdu)
+#   * берут общую сессию (при первом вызове — подключаются)
 #   * получают доступ к manipulator.mgbot_conveyer
 #   * выполняют нужное действие
-#   * выполняют безопасную остановку в finally
+# Безопасная остановка выполняется при закрытии сессии (или при выходе из программы).
 
 
 def run_conveyor_speed(speed_percent: int,
@@ -118,26 +273,21 @@ def run_conveyor_speed(speed_percent: int,
         # Просто установить скорость 50% и не трогать дальше:
         run_conveyor_speed(50)
     """
-    manip: Optional[MEdu] = None
+    session = get_session()
     try:
-        manip = _create_manipulator()
-        conveyor = manip.mgbot_conveyer
-
         speed = _clamp_int(speed_percent, 0, 100)
         print(f"[ACTION] Устанавливаю скорость конвейера: {speed}%")
-        conveyor.set_speed_motors(speed)
+        session.call("set_speed_motors", lambda conveyor: conveyor.set_speed_motors(speed))
 
         if duration_sec is not None and speed > 0:
             print(f"[INFO] Конвейер будет работать ~{duration_sec} секунд...")
             time.sleep(duration_sec)
             print("[ACTION] Останавливаю конвейер (скорость 0) после таймера.")
-            conveyor.set_speed_motors(0)
+            session.call("set_speed_motors", lambda conveyor: conveyor.set_speed_motors(0))
 
     except Exception as e:
         print(f"[ERROR] run_conveyor_speed: {e}")
         raise
-    finally:
-        _safe_cleanup(manip)
 
 
 def set_conveyor_led_color(r: int, g: int, b: int) -> None:
@@ -162,24 +312,18 @@ def set_conveyor_led_color(r: int, g: int, b: int) -> None:
         set_conveyor_led_color(0, 255, 0)     # зелёный
         set_conveyor_led_color(0, 0, 255)     # синий
     """
-    manip: Optional[MEdu] = None
     try:
-        manip = _create_manipulator()
-        conveyor = manip.mgbot_conveyer
-
         r = _clamp_int(r, 0, 255)
         g = _clamp_int(g, 0, 255)
         b = _clamp_int(b, 0, 255)
 
         print(f"[ACTION] Устанавливаю цвет LED конвейера: R={r}, G={g}, B={b}")
-        conveyor.set_led_color(r, g, b)
+        get_session().call("set_led_color", lambda conveyor: conveyor.set_led_color(r, g, b))
         print("[INFO] Цвет LED установлен.")
 
     except Exception as e:
         print(f"[ERROR] set_conveyor_led_color: {e}")
         raise
-    finally:
-        _safe_cleanup(manip)
 
 
 def display_text_on_conveyor(text: str) -> None:
@@ -198,20 +342,14 @@ def display_text_on_conveyor(text: str) -> None:
         display_text_on_conveyor("Hello MGbot")
         display_text_on_conveyor("Box #12")
     """
-    manip: Optional[MEdu] = None
     try:
-        manip = _create_manipulator()
-        conveyor = manip.mgbot_conveyer
-
         print(f"[ACTION] Отправляю текст на дисплей конвейера: {text!r}")
-        conveyor.display_text(text)
+        get_session().call("display_text", lambda conveyor: conveyor.display_text(text))
         print("[INFO] Текст отправлен.")
 
     except Exception as e:
         print(f"[ERROR] display_text_on_conveyor: {e}")
         raise
-    finally:
-        _safe_cleanup(manip)
 
 
 def read_conveyor_sensors(iterations: int = 1,
@@ -263,7 +401,6 @@ def read_conveyor_sensors(iterations: int = 1,
         # Пять опросов с интервалом 0.5 сек:
         history = read_conveyor_sensors(iterations=5, delay_sec=0.5)
     """
-    manip: Optional[MEdu] = None
     results: List[Dict[str, Any]] = []
 
     def _pretty_print(data: Dict[str, Any]) -> None:
@@ -291,8 +428,7 @@ def read_conveyor_sensors(iterations: int = 1,
             print(f"    Prox (top-level): {prox}")
 
     try:
-        manip = _create_manipulator()
-        conveyor = manip.mgbot_conveyer
+        session = get_session()
 
         iterations = max(1, int(iterations))
         delay_sec = float(delay_sec)
@@ -301,7 +437,7 @@ def read_conveyor_sensors(iterations: int = 1,
             if verbose:
                 print(f"[ACTION] Опрос датчиков #{i + 1}/{iterations}...")
 
-            raw_data = conveyor.get_sensors_data(True)
+            raw_data = session.call("get_sensors_data", lambda conveyor: conveyor.get_sensors_data(True))
             parsed: Optional[Dict[str, Any]] = None
 
             if isinstance(raw_data, dict):
@@ -331,8 +467,6 @@ def read_conveyor_sensors(iterations: int = 1,
     except Exception as e:
         print(f"[ERROR] read_conveyor_sensors: {e}")
         raise
-    finally:
-        _safe_cleanup(manip)
 
 
 # ================== ПРИМЕР ИСПОЛЬЗОВАНИЯ ==================
@@ -352,4 +486,7 @@ if __name__ == "__main__":
     # data = read_conveyor_sensors(iterations=5, delay_sec=0.5, verbose=True)
     # print("Последние данные:", data[-1] if data else None)
 
+    # 5. Задержки команд в общей сессии:
+    print("[INFO] Статистика сессии:", session_stats())
+
     pass
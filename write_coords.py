@@ -1,6 +1,9 @@
 import json
 from pathlib import Path
 
+from calib_journal import CalibrationJournal
+from point_db import PointDatabase
+from pose_capture import ArmMovingError, PoseCaptureError, capture_pose
 from sdk.manipulators.medu import MEdu  # если другой манипулятор — замените
 from sdk.utils.constants import CARTESIAN_COORDINATES_TOPIC  # просто для справки
 
@@ -10,6 +13,8 @@ PASSWORD = "pass"
 CLIENT_ID = "cells-calib-001"
 
 OUTPUT_FILE = Path("coords3.json")
+POINTS_DB = Path("points.db")
+STATION = "default"
 
 
 def safe_get_pose(manip: MEdu, timeout_seconds: float = 5.0):
@@ -25,21 +30,56 @@ def safe_get_pose(manip: MEdu, timeout_seconds: float = 5.0):
     return payload
 
 
+def capture_averaged_pose(manip: MEdu):
+    """
+    Усреднённая поза по потоку /coordinates (медиана позиции, среднее кватернионов).
+    Если поток не дал отсчётов — откатываемся к одиночному чтению.
+    """
+    stats = {}
+    try:
+        pose = capture_pose(manip, stats=stats)
+        print(f"   [*] Усреднено отсчётов: {stats['samples']} за {stats['seconds']:.2f} с")
+        return pose
+    except ArmMovingError:
+        raise
+    except PoseCaptureError as e:
+        print(f"   [!] {e} — берём одиночное чтение.")
+    return safe_get_pose(manip, timeout_seconds=5.0)
+
+
 def main():
     print("=== Калибровка: введите имя точки → наведите TCP → Enter для сохранения. Пустое имя — выход. ===")
 
-    # Подгружаем существующие точки (если файл уже есть)
-    saved = {}
-    if OUTPUT_FILE.exists():
-        try:
-            saved = json.loads(OUTPUT_FILE.read_text(encoding="utf-8"))
-            if not isinstance(saved, dict):
-                print("[!] Файл координат повреждён, начнём заново.")
-                saved = {}
-            else:
-                print(f"[*] Загружено существующих точек: {len(saved)}")
-        except Exception:
+    # Подгружаем существующие точки: снимок + журнал незавершённой сессии
+    journal = CalibrationJournal(OUTPUT_FILE)
+    try:
+        if journal.load():
+            print(f"[*] Загружено существующих точек: {len(journal.points)}")
+    except Exception as e:
+        if isinstance(e, ValueError):
+            print("[!] Файл координат повреждён, начнём заново.")
+        else:
             print("[!] Не удалось прочитать существующий файл, начнём заново.")
+        # Повреждённый снимок откладываем в сторону, иначе компактизация журнала
+        # и coords_store.load_point_store будут падать на нём при каждом запуске
+        try:
+            aside = journal.set_aside_snapshot()
+            if aside is not None:
+                print(f"[!] Старый файл сохранён как {aside}, точек из журнала: {len(journal.points)}")
+        except Exception as aside_error:
+            print(f"[!] Не удалось отложить повреждённый файл {OUTPUT_FILE}: {aside_error}")
+            journal.points = {}
+    saved = journal.points
+
+    # База точек: каждая калибровка — новая версия точки.
+    # Уже имеющиеся точки (снимок + журнал) переносим, пока в базе нет пометки о переносе:
+    # если перенос упал, он повторится при следующем запуске.
+    db = PointDatabase(POINTS_DB)
+    if saved and not db.is_imported(STATION):
+        try:
+            print(f"[*] Перенесено точек в {POINTS_DB}: {db.import_points(saved, STATION)}")
+        except Exception as e:
+            print(f"[!] Не удалось перенести точки в {POINTS_DB}: {e}")
 
     manip = MEdu(HOST, CLIENT_ID, LOGIN, PASSWORD)
     print("[*] Подключаемся…")
@@ -58,19 +98,30 @@ def main():
             input(f"Наведите TCP в целевую позицию для «{name}» и нажмите Enter для сохранения…")
 
             try:
-                pose = safe_get_pose(manip, timeout_seconds=5.0)
+                pose = capture_averaged_pose(manip)
+            except ArmMovingError as e:
+                print(f"   [!] Манипулятор ещё движется ({e}). Пропускаем точку «{name}».")
+                continue
             except Exception as e:
                 print(f"   [!] Ошибка чтения координат: {e}. Пропускаем точку «{name}».")
                 continue
 
-            saved[name] = pose
-            OUTPUT_FILE.write_text(json.dumps(saved, ensure_ascii=False, indent=2), encoding="utf-8")
+            journal.record(name, pose)
+            try:
+                db.save_point(name, pose, STATION)
+            except Exception as e:
+                print(f"   [!] Не удалось записать «{name}» в {POINTS_DB}: {e}")
             print(f"   [✓] Сохранено «{name}»: {pose}")
             print(f"   [*] Всего точек: {len(saved)} → файл: {OUTPUT_FILE.resolve()}")
 
         print(f"\n[✓] Готово. Сохранено {len(saved)} точек в {OUTPUT_FILE.resolve()}")
 
     finally:
+        try:
+            journal.close()
+        except Exception as e:
+            print(f"[!] Не удалось свернуть журнал в {OUTPUT_FILE}: {e}")
+        db.close()
         try:
             manip.disconnect()
             print("[*] Отключено.")